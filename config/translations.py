@@ -36,6 +36,9 @@ TRANSLATIONS = {
         "menu_products": "Gestión de Productos",
         "menu_sales": "Módulo de Ventas",
         "menu_reports": "Módulo de Reportes",
+        "menu_sales_history": "Historial de Ventas",
+        "menu_dashboard": "Ventas en Vivo",
+        "menu_day_close": "Cierre del Día",
         "menu_settings": "Configuración",
         "menu_language": "Idioma",
         "menu_language_es": "Español",
@@ -162,6 +165,8 @@ TRANSLATIONS = {
         "btn_checkout": "Cerrar Venta",
         "btn_clear_order": "Limpiar Pedido",
         "lbl_total": "Total:",
+        "lbl_discount": "Descuento:",
+        "lbl_tax": "Impuestos:",
         "tree_col_item": "Artículo",
         "tree_col_item_quantity": "Cant.",
         "tree_col_item_price": "Precio Unit.",
@@ -202,6 +207,93 @@ TRANSLATIONS = {
         "report_col_modifier_name": "Modificador",
         "msg_invalid_date_range": "La fecha de inicio no puede ser posterior a la fecha de fin.",
         "msg_no_sales_found": "No se encontraron ventas para el rango de fechas seleccionado.",
+        "report_sales_by_day": "Ventas por día",
+        "report_sales_by_hour": "Ventas por hora",
+        "report_sales_by_category": "Ventas por categoría",
+        "report_sales_by_product": "Ventas por producto",
+        "report_sales_by_variant": "Ventas por variante",
+        "report_sales_by_modifier": "Ventas por modificador",
+        "report_basket_pairs": "Productos y modificadores comprados juntos",
+        "report_year_over_year": "Comparación con el año anterior",
+        "report_demand_forecast": "Pronóstico de demanda por hora",
+        "report_sales_by_category_hour": "Ventas por categoría y hora",
+        "report_col_hour": "Hora",
+        "report_col_tickets": "Tickets",
+        "report_col_tax": "Impuestos",
+        "report_col_category": "Categoría",
+        "report_col_variant_name": "Variante",
+        "report_col_lines": "Líneas",
+        "report_col_item_a": "Artículo A",
+        "report_col_item_b": "Artículo B",
+        "report_col_support": "Soporte",
+        "report_col_confidence_ab": "Confianza A→B",
+        "report_col_confidence_ba": "Confianza B→A",
+        "report_col_lift": "Lift",
+        "report_col_month": "Mes",
+        "report_col_previous_total": "Total año anterior",
+        "report_col_change": "Variación",
+        "report_col_forecast_qty": "Cantidad esperada",
+        "btn_previous_page": "< Anterior",
+        "btn_next_page": "Siguiente >",
+        "lbl_page": "Página {page} de {pages}",
+        "msg_report_running": "Generando reporte...",
+        "msg_report_progress": "Generando reporte: {done} de {total} tramos...",
+        "msg_report_cancelled": "Reporte cancelado.",
+        "msg_invalid_date": "Fecha inválida. Usa el formato AAAA-MM-DD.",
+        "btn_export_sales": "Exportar Ventas",
+        "msg_export_progress": "Exportando ventas: {done} de {total}...",
+        "msg_export_done": "Se exportaron {count} ventas a {path}.",
+
+        # Sales History
+        "sales_history_title": "Historial de Ventas",
+        "btn_search": "Buscar",
+        "lbl_sales_count": "{count} ventas",
+        "msg_loading": "Cargando...",
+
+        # Dashboard
+        "dashboard_title": "Ventas en Vivo",
+        "lbl_revenue_today": "Ventas de hoy",
+        "lbl_tickets_today": "Tickets",
+        "lbl_average_ticket": "Ticket promedio",
+        "lbl_ticket_median": "Ticket mediano",
+        "lbl_ticket_p95": "Ticket p95",
+        "lbl_top_sellers": "Más vendidos hoy",
+        "lbl_last_update": "Actualizado a las {time}",
+
+        # Day Close
+        "day_close_title": "Cierre del Día",
+        "lbl_close_day": "Día:",
+        "btn_close_day": "Cerrar día",
+        "col_close_step": "Paso",
+        "col_close_status": "Estado",
+        "col_close_seconds": "Segundos",
+        "col_close_detail": "Detalle",
+        "close_status_pending": "Pendiente",
+        "close_status_running": "En curso...",
+        "close_status_done": "Terminado",
+        "close_status_skipped": "Ya hecho",
+        "close_step_rollups": "Resúmenes de ventas",
+        "close_step_z_report": "Reporte Z",
+        "close_step_analytics": "Pronóstico, cubo y canasta",
+        "close_step_archive": "Archivo de meses cerrados",
+        "close_step_compress": "Compresión de meses antiguos",
+        "close_step_statistics": "Estadísticas de la base",
+        "close_step_vacuum": "Compactación",
+        "close_detail_rollups": "{hours} horas con ventas",
+        "close_detail_z_report": "Z n.º {z_number}, {tickets} tickets",
+        "close_detail_analytics": "{products} productos pronosticados, cubo de {days} días",
+        "close_detail_archive": "{months} meses archivados, {sales} ventas movidas",
+        "close_detail_compress": "{months} meses comprimidos, {saved_mb} MB liberados",
+        "close_detail_statistics": "{indexes} índices analizados",
+        "close_detail_vacuum": "{pages} páginas liberadas, base de {size_mb} MB",
+        "lbl_z_report": "Reporte Z n.º {z_number} — {day}",
+        "lbl_z_tickets": "Tickets:    {tickets}",
+        "lbl_z_total": "Total:      {amount}",
+        "lbl_z_discounts": "Descuentos: {amount}",
+        "lbl_z_tax": "Impuestos:  {amount}",
+        "lbl_z_tax_rate": "  Tasa {rate}%: base {taxable}, impuesto {tax}",
+        "msg_confirm_day_close": "¿Cerrar el día {day}? Conviene hacerlo sin ventas en curso.",
+        "msg_day_closed": "Día {day} cerrado: reporte Z n.º {z_number}, {tickets} tickets.",
 
         # Settings Module
         "settings_title": "Configuración",
@@ -245,6 +337,9 @@ TRANSLATIONS = {
         "menu_products": "Product Management",
         "menu_sales": "Sales Module",
         "menu_reports": "Reports Module",
+        "menu_sales_history": "Sales History",
+        "menu_dashboard": "Live Sales",
+        "menu_day_close": "Day Close",
         "menu_settings": "Settings",
         "menu_language": "Language",
         "menu_language_es": "Spanish",
@@ -369,6 +464,8 @@ TRANSLATIONS = {
         "btn_checkout": "Checkout",
         "btn_clear_order": "Clear Order",
         "lbl_total": "Total:",
+        "lbl_discount": "Discount:",
+        "lbl_tax": "Tax:",
         "tree_col_item": "Item",
         "tree_col_item_quantity": "Qty.",
         "tree_col_item_price": "Unit Price",
@@ -409,6 +506,93 @@ TRANSLATIONS = {
         "report_col_modifier_name": "Modifier",
         "msg_invalid_date_range": "Start date cannot be after end date.",
         "msg_no_sales_found": "No sales found for the selected date range.",
+        "report_sales_by_day": "Sales by day",
+        "report_sales_by_hour": "Sales by hour",
+        "report_sales_by_category": "Sales by category",
+        "report_sales_by_product": "Sales by product",
+        "report_sales_by_variant": "Sales by variant",
+        "report_sales_by_modifier": "Sales by modifier",
+        "report_basket_pairs": "Products and modifiers bought together",
+        "report_year_over_year": "Year over year",
+        "report_demand_forecast": "Hourly demand forecast",
+        "report_sales_by_category_hour": "Sales by category and hour",
+        "report_col_hour": "Hour",
+        "report_col_tickets": "Tickets",
+        "report_col_tax": "Tax",
+        "report_col_category": "Category",
+        "report_col_variant_name": "Variant",
+        "report_col_lines": "Lines",
+        "report_col_item_a": "Item A",
+        "report_col_item_b": "Item B",
+        "report_col_support": "Support",
+        "report_col_confidence_ab": "Confidence A→B",
+        "report_col_confidence_ba": "Confidence B→A",
+        "report_col_lift": "Lift",
+        "report_col_month": "Month",
+        "report_col_previous_total": "Previous year total",
+        "report_col_change": "Change",
+        "report_col_forecast_qty": "Expected quantity",
+        "btn_previous_page": "< Previous",
+        "btn_next_page": "Next >",
+        "lbl_page": "Page {page} of {pages}",
+        "msg_report_running": "Generating report...",
+        "msg_report_progress": "Generating report: {done} of {total} parts...",
+        "msg_report_cancelled": "Report cancelled.",
+        "msg_invalid_date": "Invalid date. Use the YYYY-MM-DD format.",
+        "btn_export_sales": "Export Sales",
+        "msg_export_progress": "Exporting sales: {done} of {total}...",
+        "msg_export_done": "Exported {count} sales to {path}.",
+
+        # Sales History
+        "sales_history_title": "Sales History",
+        "btn_search": "Search",
+        "lbl_sales_count": "{count} sales",
+        "msg_loading": "Loading...",
+
+        # Dashboard
+        "dashboard_title": "Live Sales",
+        "lbl_revenue_today": "Sales today",
+        "lbl_tickets_today": "Tickets",
+        "lbl_average_ticket": "Average ticket",
+        "lbl_ticket_median": "Median ticket",
+        "lbl_ticket_p95": "Ticket p95",
+        "lbl_top_sellers": "Top sellers today",
+        "lbl_last_update": "Updated at {time}",
+
+        # Day Close
+        "day_close_title": "Day Close",
+        "lbl_close_day": "Day:",
+        "btn_close_day": "Close day",
+        "col_close_step": "Step",
+        "col_close_status": "Status",
+        "col_close_seconds": "Seconds",
+        "col_close_detail": "Detail",
+        "close_status_pending": "Pending",
+        "close_status_running": "Running...",
+        "close_status_done": "Done",
+        "close_status_skipped": "Already done",
+        "close_step_rollups": "Sales rollups",
+        "close_step_z_report": "Z-report",
+        "close_step_analytics": "Forecast, cube and basket",
+        "close_step_archive": "Closed months archive",
+        "close_step_compress": "Old months compression",
+        "close_step_statistics": "Database statistics",
+        "close_step_vacuum": "Compaction",
+        "close_detail_rollups": "{hours} hours with sales",
+        "close_detail_z_report": "Z #{z_number}, {tickets} tickets",
+        "close_detail_analytics": "{products} products forecast, {days}-day cube",
+        "close_detail_archive": "{months} months archived, {sales} sales moved",
+        "close_detail_compress": "{months} months compressed, {saved_mb} MB freed",
+        "close_detail_statistics": "{indexes} indexes analyzed",
+        "close_detail_vacuum": "{pages} pages freed, database is {size_mb} MB",
+        "lbl_z_report": "Z-report #{z_number} — {day}",
+        "lbl_z_tickets": "Tickets:    {tickets}",
+        "lbl_z_total": "Total:      {amount}",
+        "lbl_z_discounts": "Discounts:  {amount}",
+        "lbl_z_tax": "Taxes:      {amount}",
+        "lbl_z_tax_rate": "  Rate {rate}%: taxable {taxable}, tax {tax}",
+        "msg_confirm_day_close": "Close day {day}? Best done with no sales in progress.",
+        "msg_day_closed": "Day {day} closed: Z-report #{z_number}, {tickets} tickets.",
 
         # Settings Module
         "settings_title": "Settings",
@@ -1,15 +1,50 @@
 import sqlite3
 import os
+import contextlib
+import datetime
+import json
+import sys
+import threading
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
 
 DB_FILE = "data/sales_db.db"
 DB_DIR = "data"
 
+# Optional in-memory mode for terminals with slow storage (SD cards), enabled with SALES_DB_IN_MEMORY=1.
+# The live database is a shared in-memory database (memdb VFS) loaded from DB_FILE at startup: the
+# global connection and open_connection() use it, so commits run at memory speed. Every model write
+# is appended to a journal file (fsynced) before it returns, and MemoryFlusher (utils/backup.py) copies
+# the whole database to DB_FILE periodically with the backup API. A flush replaces DB_FILE in a single
+# transaction and records which journal files it includes, so after a crash DB_FILE is always a
+# consistent flush, and loading it and replaying the newer journal files gives back every acknowledged
+# write. Read-only connections keep reading DB_FILE (up to one flush behind) unless they ask for live data.
+# Only the app should run in this mode, and nothing else may write DB_FILE while it runs (the next flush
+# would overwrite it): the app holds DB_LOCK_FILE, and command-line tools that write call claim_database_file().
+IN_MEMORY_DB = os.environ.get("SALES_DB_IN_MEMORY") == "1"
+MEMORY_DB_URI = "file:/sales_db?vfs=memdb" # Shared by every connection of the process
+JOURNAL_DIR = os.path.join(DB_DIR, "journal")
+DB_LOCK_FILE = os.path.join(DB_DIR, "sales_db.lock")
+
 # Global variable to hold the database connection and cursor
 # It's generally better to pass these around, but for simplicity in a small app,
 # a global approach with proper open/close can work if managed carefully.
 conn = None
 cursor = None
 
+# In-memory mode state. journal_lock is held while a write is applied and journaled, so a flush
+# snapshot always contains exactly the journal files before the one in use.
+journal_lock = threading.RLock()
+_memory_keeper = None # Keeps the shared in-memory database alive for the whole process
+_journal_file = None
+_journal_seq = 1 # Number of the journal file being written
+_transaction_writes = None # Writes of the current write_transaction(), or None outside one
+_lock_handle = None # Open DB_LOCK_FILE while this process holds its lock
+
 def get_db_connection():
     """
     Establishes and returns a database connection and cursor.
@@ -19,10 +54,235 @@ def get_db_connection():
     if conn is None:
         if not os.path.exists(DB_DIR):
             os.makedirs(DB_DIR)
-        conn = sqlite3.connect(DB_FILE)
+        conn = connect_live()
+        # Lets the day close give free pages back to the file a few at a time (PRAGMA incremental_vacuum).
+        # It only takes effect on a new database; existing ones are converted by their first day close.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # WAL lets long reads (reports, exports) run on other connections while a checkout
+        # commits; in the default rollback journal, an open reader blocks every write.
+        # The in-memory database can't use WAL, which is why its readers use DB_FILE instead.
+        if not IN_MEMORY_DB:
+            conn.execute("PRAGMA journal_mode = WAL")
         cursor = conn.cursor()
     return conn, cursor
 
+def connect_live(timeout=5.0, check_same_thread=True):
+    """Opens a connection to the live database: DB_FILE, or the shared in-memory copy in in-memory mode."""
+    if IN_MEMORY_DB:
+        load_memory_database()
+        return sqlite3.connect(MEMORY_DB_URI, uri=True, timeout=timeout, check_same_thread=check_same_thread)
+    return sqlite3.connect(DB_FILE, timeout=timeout, check_same_thread=check_same_thread)
+
+def open_read_only_connection(check_same_thread=True, live=False):
+    """
+    Opens a new read-only connection to the database file.
+    Use it from background threads (report queries): the global connection belongs to the UI thread,
+    and a read-only connection can never take the write lock away from a checkout.
+    Pass check_same_thread=False to open it in a worker thread and hand it over to the UI thread.
+    In in-memory mode the file is up to one flush behind; live=True reads the in-memory database
+    instead, for short queries only (there an open read delays the next commit).
+    """
+    if live and IN_MEMORY_DB:
+        live_conn = connect_live(check_same_thread=check_same_thread)
+        live_conn.execute("PRAGMA query_only = ON")
+        return live_conn
+    db_uri = "file:" + os.path.abspath(DB_FILE).replace("\\", "/") + "?mode=ro"
+    return sqlite3.connect(db_uri, uri=True, check_same_thread=check_same_thread)
+
+def open_connection():
+    """
+    Opens a new read-write connection to the live database, for maintenance jobs that run
+    outside the UI thread (day close). It waits up to 10 seconds for the write lock.
+    """
+    return connect_live(timeout=10)
+
+def lock_database_file():
+    """
+    Takes the exclusive lock on DB_LOCK_FILE for the rest of the process; the OS releases it when the
+    process exits, even after a crash. Raises RuntimeError if another process holds it.
+    """
+    global _lock_handle
+    if _lock_handle is not None:
+        return
+    os.makedirs(DB_DIR, exist_ok=True)
+    handle = open(DB_LOCK_FILE, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        raise RuntimeError(f"{DB_LOCK_FILE} is locked by another process (the app running with SALES_DB_IN_MEMORY=1 "
+                           "or another maintenance command). Close it and try again.")
+    _lock_handle = handle
+
+def claim_database_file():
+    """
+    For command-line tools that write to DB_FILE: refuses to run while the app runs in in-memory mode
+    (its next flush would overwrite their changes) and keeps it from starting until they finish.
+    They can't run in in-memory mode themselves either: their writes would never reach DB_FILE.
+    Raises RuntimeError in both cases.
+    """
+    if IN_MEMORY_DB:
+        raise RuntimeError("Maintenance commands write to DB_FILE directly: run them without SALES_DB_IN_MEMORY=1.")
+    lock_database_file()
+
+def journal_path(seq):
+    return os.path.join(JOURNAL_DIR, f"{seq:08d}.jsonl")
+
+def journal_files():
+    """[(seq, path)] of the journal files on disk, oldest first."""
+    if not os.path.isdir(JOURNAL_DIR):
+        return []
+    return sorted((int(name.split(".")[0]), os.path.join(JOURNAL_DIR, name))
+                  for name in os.listdir(JOURNAL_DIR) if name.endswith(".jsonl"))
+
+def load_memory_database():
+    """
+    Loads DB_FILE into the shared in-memory database, once per process, and replays the journal
+    files written after the flush it contains.
+    """
+    global _memory_keeper, _journal_seq
+    with journal_lock:
+        if _memory_keeper is not None:
+            return
+        lock_database_file() # Every flush overwrites DB_FILE: no other process may write to it meanwhile
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        keeper = sqlite3.connect(MEMORY_DB_URI, uri=True, check_same_thread=False)
+        if os.path.exists(DB_FILE) and os.path.getsize(DB_FILE) > 0:
+            disk = sqlite3.connect("file:" + os.path.abspath(DB_FILE).replace("\\", "/") + "?mode=ro", uri=True)
+            try:
+                data = bytearray(disk.serialize())
+            finally:
+                disk.close()
+            # Header bytes 18-19 are the file format versions; 2 (WAL) can't be opened by the memdb VFS
+            data[18:20] = b"\x01\x01"
+            staging = sqlite3.connect(":memory:")
+            staging.deserialize(bytes(data))
+            staging.backup(keeper)
+            staging.close()
+        keeper.execute(TABLE_DEFINITIONS["memory_journal_state"])
+        keeper.execute("INSERT OR IGNORE INTO memory_journal_state (id, flushed_seq) VALUES (1, 0)")
+        keeper.commit()
+        flushed_seq = keeper.execute("SELECT flushed_seq FROM memory_journal_state").fetchone()[0]
+        _journal_seq = flushed_seq + 1 # New files must sort after the ones the flush already includes
+        has_sales = keeper.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sales'").fetchone()
+        last_sale_id = keeper.execute("SELECT COALESCE(MAX(id), 0) FROM sales").fetchone()[0] if has_sales else 0
+        replayed = 0
+        for seq, path in journal_files():
+            if seq > flushed_seq:
+                replayed += replay_journal_file(keeper, path)
+            _journal_seq = max(_journal_seq, seq + 1)
+        if replayed:
+            print(f"Replayed {replayed} journaled writes.")
+            rebuild_replayed_sketches(keeper, last_sale_id)
+        _memory_keeper = keeper
+
+def rebuild_replayed_sketches(target, last_sale_id):
+    """
+    The rollups follow replayed sales through their triggers, but the sketches are written by
+    utils.sketches.record_sale() outside the journal: recompute them for the days of the replayed sales.
+    """
+    from utils.sketches import rebuild_sketches # utils.sketches imports this module
+    first_day, last_day = target.execute(
+        "SELECT MIN(substr(sale_date, 1, 10)), MAX(substr(sale_date, 1, 10)) FROM sales WHERE id > ?", (last_sale_id,)
+    ).fetchone()
+    if first_day is not None:
+        rebuild_sketches(target, first_day, last_day)
+
+def replay_journal_file(target, path):
+    """Applies the records of a journal file in order. A torn last line (crash while writing) is skipped."""
+    count = 0
+    with open(path, "r", encoding="utf-8") as journal:
+        for line in journal:
+            try:
+                entries = json.loads(line)
+            except ValueError:
+                break
+            for query, params in entries:
+                target.execute(query, params)
+            target.commit()
+            count += len(entries)
+    return count
+
+def journal_param(value):
+    """JSON form of a query parameter with a registered sqlite3 adapter (e.g. models.Money)."""
+    return sqlite3.adapters[(type(value), sqlite3.PrepareProtocol)](value)
+
+def append_journal(entries):
+    global _journal_file
+    if _journal_file is None:
+        _journal_file = open(journal_path(_journal_seq), "a", encoding="utf-8")
+    _journal_file.write(json.dumps(entries, default=journal_param) + "\n")
+    _journal_file.flush()
+    os.fsync(_journal_file.fileno())
+
+def record_write(query, params):
+    """
+    Journals a write already applied to the in-memory database; call it holding journal_lock.
+    Inside write_transaction() the write is kept until the transaction commits.
+    Does nothing outside in-memory mode.
+    """
+    if not IN_MEMORY_DB:
+        return
+    entry = [query, list(params)]
+    if _transaction_writes is not None:
+        _transaction_writes.append(entry)
+    else:
+        append_journal([entry])
+
+def in_write_transaction():
+    return _transaction_writes is not None
+
+@contextlib.contextmanager
+def write_transaction():
+    """
+    Runs the model writes inside it (e.g. a whole checkout) as one transaction of the global
+    connection: they commit together at the end, or roll back together if anything inside raises.
+    Inside it, BaseModel writes don't commit and raise sqlite3.Error instead of returning None.
+    In in-memory mode the writes become one journal record, written and fsynced once the commit
+    succeeds: one disk sync per checkout, and a crash never replays part of one or a rolled back one.
+    Flushes wait for the transaction to finish. Nested calls join the outer transaction.
+    """
+    global _transaction_writes
+    with journal_lock:
+        if _transaction_writes is not None:
+            yield
+            return
+        conn, _ = get_db_connection()
+        if conn.in_transaction:
+            conn.commit()
+        _transaction_writes = []
+        try:
+            conn.execute("BEGIN")
+            yield
+            conn.commit()
+            entries = _transaction_writes
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            _transaction_writes = None
+        if IN_MEMORY_DB and entries:
+            append_journal(entries)
+
+def rotate_journal():
+    """Closes the journal file in use and starts the next one. Call it holding journal_lock. Returns the closed seq."""
+    global _journal_file, _journal_seq
+    if _journal_file is not None:
+        _journal_file.close()
+        _journal_file = None
+    _journal_seq += 1
+    return _journal_seq - 1
+
+def discard_journal(up_to_seq):
+    """Deletes the journal files already included in a flush of DB_FILE."""
+    for seq, path in journal_files():
+        if seq <= up_to_seq:
+            os.remove(path)
+
 def close_db_connection():
     """Closes the database connection if it's open."""
     global conn, cursor
@@ -33,26 +293,24 @@ def close_db_connection():
     print("Database connection closed.")
 
 
-def create_tables():
-    """
-    Creates the necessary tables if they don't already exist.
-    This function should be called once at application startup.
-    """
-    conn, cursor = get_db_connection() # Get an active connection
-
+# Table definitions, in creation order. Money columns are INTEGER amounts in cents
+# (see models.Money); percentages and rates stay REAL.
+TABLE_DEFINITIONS = {
     # Table for Categories
-    cursor.execute("""
+    "categories": """
         CREATE TABLE IF NOT EXISTS categories (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name_es TEXT NOT NULL UNIQUE,
             name_en TEXT NOT NULL UNIQUE,
+            tax_rate_id INTEGER, -- NULL to use the default tax rate
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (tax_rate_id) REFERENCES tax_rates (id) ON DELETE SET NULL
         )
-    """)
+    """,
 
     # Table for Products
-    cursor.execute("""
+    "products": """
         CREATE TABLE IF NOT EXISTS products (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             category_id INTEGER,
@@ -60,36 +318,38 @@ def create_tables():
             name_en TEXT NOT NULL,
             description_es TEXT,
             description_en TEXT,
-            base_price REAL NOT NULL,
+            base_price INTEGER NOT NULL, -- Cents
             image_path TEXT,
             is_available INTEGER DEFAULT 1, -- 1 for true, 0 for false
+            tax_rate_id INTEGER, -- NULL to use the category's tax rate
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE SET NULL
+            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE SET NULL,
+            FOREIGN KEY (tax_rate_id) REFERENCES tax_rates (id) ON DELETE SET NULL
         )
-    """)
+    """,
 
     # Table for Variants (e.g., Small, Medium, Large for a coffee)
-    cursor.execute("""
+    "variants": """
         CREATE TABLE IF NOT EXISTS variants (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             product_id INTEGER,
             name_es TEXT NOT NULL,
             name_en TEXT NOT NULL,
-            price_adjustment REAL NOT NULL DEFAULT 0.0, -- How much to add/subtract from product base price
+            price_adjustment INTEGER NOT NULL DEFAULT 0, -- Cents to add/subtract from product base price
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (product_id) REFERENCES products (id) ON DELETE CASCADE
         )
-    """)
+    """,
 
     # Table for Modifiers (e.g., Extra Cheese, No Onion, Add Sugar)
-    cursor.execute("""
+    "modifiers": """
         CREATE TABLE IF NOT EXISTS modifiers (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name_es TEXT NOT NULL,
             name_en TEXT NOT NULL,
-            price REAL NOT NULL,
+            price INTEGER NOT NULL, -- Cents
             product_id INTEGER, -- NULL for global modifier, otherwise specific to a product
             variant_id INTEGER, -- NULL for global or product-specific modifier, otherwise specific to a variant
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -97,48 +357,249 @@ def create_tables():
             FOREIGN KEY (product_id) REFERENCES products (id) ON DELETE CASCADE,
             FOREIGN KEY (variant_id) REFERENCES variants (id) ON DELETE CASCADE
         )
-    """)
+    """,
 
     # Table for Sales (main transaction)
-    cursor.execute("""
+    "sales": """
         CREATE TABLE IF NOT EXISTS sales (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            total_amount REAL NOT NULL,
-            sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            sale_date TEXT NOT NULL, -- YYYY-MM-DD HH:MM:SS
+            total_amount INTEGER NOT NULL, -- Cents
+            tax_amount INTEGER NOT NULL DEFAULT 0, -- Cents, per-rate detail in sale_taxes
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-    """)
+    """,
 
     # Table for Sale Items (products and their variants in a sale)
-    cursor.execute("""
+    "sale_items": """
         CREATE TABLE IF NOT EXISTS sale_items (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             sale_id INTEGER NOT NULL,
             product_id INTEGER NOT NULL,
             variant_id INTEGER, -- NULL if no variant selected
             quantity INTEGER NOT NULL,
-            item_price REAL NOT NULL, -- Price of the product/variant at time of sale
+            price_at_sale INTEGER NOT NULL, -- Cents, unit price of the product/variant at time of sale
+            discount_amount INTEGER NOT NULL DEFAULT 0, -- Cents, discount of the whole line
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (sale_id) REFERENCES sales (id) ON DELETE CASCADE,
             FOREIGN KEY (product_id) REFERENCES products (id) ON DELETE RESTRICT, -- Don't delete product if in old sale
             FOREIGN KEY (variant_id) REFERENCES variants (id) ON DELETE RESTRICT
         )
-    """)
+    """,
 
     # Table for Sale Item Modifiers (modifiers applied to a specific sale item)
-    cursor.execute("""
+    "sale_item_modifiers": """
         CREATE TABLE IF NOT EXISTS sale_item_modifiers (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             sale_item_id INTEGER NOT NULL,
             modifier_id INTEGER NOT NULL,
-            modifier_price REAL NOT NULL, -- Price of the modifier at time of sale
+            quantity INTEGER NOT NULL DEFAULT 1, -- Per unit of the sale item
+            price_at_sale INTEGER NOT NULL, -- Cents, price of the modifier at time of sale
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (sale_item_id) REFERENCES sale_items (id) ON DELETE CASCADE,
             FOREIGN KEY (modifier_id) REFERENCES modifiers (id) ON DELETE RESTRICT
         )
-    """)
+    """,
+
+    # Table for Tax Rates (tax classes assigned to categories and products)
+    "tax_rates": """
+        CREATE TABLE IF NOT EXISTS tax_rates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            rate REAL NOT NULL, -- Percentage, e.g. 16.0
+            is_inclusive INTEGER DEFAULT 1, -- 1 if prices already include the tax, 0 if it is added on top
+            is_default INTEGER DEFAULT 0, -- Rate used when neither the product nor its category has one
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+
+    # Table for Sale Taxes (per-rate totals of each sale, written at checkout)
+    "sale_taxes": """
+        CREATE TABLE IF NOT EXISTS sale_taxes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER NOT NULL,
+            tax_rate_id INTEGER NOT NULL,
+            sale_date TEXT NOT NULL, -- Copied from sales so tax reports need no join
+            rate REAL NOT NULL, -- Rate at time of sale
+            taxable_amount INTEGER NOT NULL, -- Cents, amount before tax
+            tax_amount INTEGER NOT NULL, -- Cents
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (sale_id) REFERENCES sales (id) ON DELETE CASCADE,
+            FOREIGN KEY (tax_rate_id) REFERENCES tax_rates (id) ON DELETE RESTRICT
+        )
+    """,
+
+    # Table for Pricing Rules (discounts, happy hours, quantity breaks and combos)
+    "pricing_rules": """
+        CREATE TABLE IF NOT EXISTS pricing_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            rule_type TEXT NOT NULL, -- 'percent_off', 'quantity_break' or 'combo'
+            category_id INTEGER, -- percent_off: NULL for all categories
+            product_id INTEGER, -- percent_off / quantity_break: NULL for all products
+            percent REAL NOT NULL DEFAULT 0.0, -- Discount percentage (percent_off / quantity_break)
+            min_quantity INTEGER NOT NULL DEFAULT 1, -- quantity_break: units needed for the discount
+            combo_items TEXT, -- combo: "product_id:qty,product_id:qty"
+            combo_price INTEGER, -- combo: cents for the whole bundle
+            start_time TEXT, -- 'HH:MM', NULL for all day
+            end_time TEXT, -- 'HH:MM', may be earlier than start_time for windows past midnight
+            days_of_week TEXT, -- Digits 0-6 (Monday=0), NULL for every day
+            is_active INTEGER DEFAULT 1, -- 1 for true, 0 for false
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (category_id) REFERENCES categories (id) ON DELETE CASCADE,
+            FOREIGN KEY (product_id) REFERENCES products (id) ON DELETE CASCADE
+        )
+    """,
+
+    # Rollup tables: sales pre-aggregated by day/hour, kept up to date by the triggers in
+    # TRIGGER_DEFINITIONS and rebuilt from the sale tables with rebuild_rollups().
+    # Amounts are cents; revenue is net of line discounts and includes modifiers.
+    "rollup_sales_hourly": """
+        CREATE TABLE IF NOT EXISTS rollup_sales_hourly (
+            day TEXT NOT NULL, -- YYYY-MM-DD
+            hour INTEGER NOT NULL, -- 0-23
+            tickets INTEGER NOT NULL DEFAULT 0,
+            tax_amount INTEGER NOT NULL DEFAULT 0, -- Cents
+            total_amount INTEGER NOT NULL DEFAULT 0, -- Cents
+            PRIMARY KEY (day, hour)
+        ) WITHOUT ROWID
+    """,
+
+    "rollup_product_hourly": """
+        CREATE TABLE IF NOT EXISTS rollup_product_hourly (
+            day TEXT NOT NULL,
+            hour INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            variant_id INTEGER NOT NULL DEFAULT 0, -- 0 if no variant (NULL can't be part of the key)
+            quantity INTEGER NOT NULL DEFAULT 0,
+            lines INTEGER NOT NULL DEFAULT 0, -- Number of sale_items rows
+            discount_amount INTEGER NOT NULL DEFAULT 0, -- Cents
+            revenue INTEGER NOT NULL DEFAULT 0, -- Cents
+            PRIMARY KEY (day, hour, product_id, variant_id)
+        ) WITHOUT ROWID
+    """,
+
+    "rollup_product_daily": """
+        CREATE TABLE IF NOT EXISTS rollup_product_daily (
+            day TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            variant_id INTEGER NOT NULL DEFAULT 0,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            lines INTEGER NOT NULL DEFAULT 0,
+            discount_amount INTEGER NOT NULL DEFAULT 0, -- Cents
+            revenue INTEGER NOT NULL DEFAULT 0, -- Cents
+            PRIMARY KEY (day, product_id, variant_id)
+        ) WITHOUT ROWID
+    """,
+
+    "rollup_category_daily": """
+        CREATE TABLE IF NOT EXISTS rollup_category_daily (
+            day TEXT NOT NULL,
+            category_id INTEGER NOT NULL, -- Category of the product when it was sold, 0 if none
+            quantity INTEGER NOT NULL DEFAULT 0,
+            revenue INTEGER NOT NULL DEFAULT 0, -- Cents
+            PRIMARY KEY (day, category_id)
+        ) WITHOUT ROWID
+    """,
+
+    "rollup_modifier_daily": """
+        CREATE TABLE IF NOT EXISTS rollup_modifier_daily (
+            day TEXT NOT NULL,
+            modifier_id INTEGER NOT NULL,
+            attach_count INTEGER NOT NULL DEFAULT 0, -- Sale items the modifier was attached to
+            quantity INTEGER NOT NULL DEFAULT 0, -- Units (item quantity * modifier quantity)
+            revenue INTEGER NOT NULL DEFAULT 0, -- Cents
+            PRIMARY KEY (day, modifier_id)
+        ) WITHOUT ROWID
+    """,
+
+    # Mergeable sketches of the sales of one hour, one row per terminal (see utils/sketches.py).
+    # Each terminal only ever writes its own rows; dashboards merge the rows of a time window.
+    "sketch_hourly": """
+        CREATE TABLE IF NOT EXISTS sketch_hourly (
+            day TEXT NOT NULL, -- YYYY-MM-DD
+            hour INTEGER NOT NULL, -- 0-23
+            terminal TEXT NOT NULL,
+            ticket_ids BLOB NOT NULL, -- HyperLogLog of sale ids
+            ticket_totals BLOB NOT NULL, -- Quantile sketch of total_amount (cents)
+            ticket_items BLOB NOT NULL, -- Quantile sketch of items per ticket
+            PRIMARY KEY (day, hour, terminal)
+        ) WITHOUT ROWID
+    """,
+
+    # End-of-day close (see utils/day_close.py). A Z-report is written once per business day and
+    # never changed afterwards; z_number is its sequential number.
+    "z_reports": """
+        CREATE TABLE IF NOT EXISTS z_reports (
+            day TEXT PRIMARY KEY, -- YYYY-MM-DD
+            z_number INTEGER NOT NULL UNIQUE,
+            tickets INTEGER NOT NULL,
+            total_amount INTEGER NOT NULL, -- Cents
+            tax_amount INTEGER NOT NULL, -- Cents
+            discount_amount INTEGER NOT NULL, -- Cents, line discounts
+            first_sale_id INTEGER, -- NULL if the day had no sales
+            last_sale_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+
+    "z_report_taxes": """
+        CREATE TABLE IF NOT EXISTS z_report_taxes (
+            day TEXT NOT NULL,
+            tax_rate_id INTEGER NOT NULL,
+            rate REAL NOT NULL, -- Rate at time of sale
+            taxable_amount INTEGER NOT NULL, -- Cents
+            tax_amount INTEGER NOT NULL, -- Cents
+            PRIMARY KEY (day, tax_rate_id, rate),
+            FOREIGN KEY (day) REFERENCES z_reports (day)
+        ) WITHOUT ROWID
+    """,
+
+    # Last journal file included in DB_FILE by an in-memory mode flush (see load_memory_database)
+    "memory_journal_state": """
+        CREATE TABLE IF NOT EXISTS memory_journal_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            flushed_seq INTEGER NOT NULL DEFAULT 0,
+            flushed_at TIMESTAMP
+        )
+    """,
+
+    # Completed steps of each day close, so an interrupted close resumes where it stopped
+    "day_close_steps": """
+        CREATE TABLE IF NOT EXISTS day_close_steps (
+            day TEXT NOT NULL,
+            step TEXT NOT NULL,
+            seconds REAL NOT NULL, -- Duration of the step
+            detail TEXT, -- JSON with the step's figures
+            finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (day, step)
+        ) WITHOUT ROWID
+    """,
+
+    # Monthly partitions of the sale tables (see utils/partitions.py): one file per closed month under
+    # data/archive, with its date range. Sales with id <= moved_until_id are in the partition and no longer here.
+    "sales_partitions": """
+        CREATE TABLE IF NOT EXISTS sales_partitions (
+            month TEXT PRIMARY KEY, -- YYYY-MM
+            file_name TEXT NOT NULL, -- Relative to data/archive
+            status TEXT NOT NULL DEFAULT 'moving', -- 'moving' while sales are being moved, then 'archived'
+            storage TEXT NOT NULL DEFAULT 'db', -- 'db' (SQLite file) or 'cold' (compressed, see utils/cold_storage.py)
+            size_bytes INTEGER, -- Size of file_name on disk
+            moved_until_id INTEGER NOT NULL DEFAULT 0,
+            sales INTEGER NOT NULL DEFAULT 0,
+            first_sale_date TEXT,
+            last_sale_date TEXT,
+            archived_at TIMESTAMP
+        )
+    """,
 
     # Table for Users (for login)
-    cursor.execute("""
+    "users": """
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT NOT NULL UNIQUE,
@@ -147,12 +608,310 @@ def create_tables():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-    """)
+    """,
+}
+
+# Indexes are created after the tables have been migrated (rebuilding a table drops its indexes).
+INDEX_DEFINITIONS = [
+    "CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales (sale_date)",
+    "CREATE INDEX IF NOT EXISTS idx_sale_items_sale ON sale_items (sale_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sale_item_modifiers_item ON sale_item_modifiers (sale_item_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sale_taxes_date_rate ON sale_taxes (sale_date, tax_rate_id)",
+]
+
+# Rollup tables: {table: (key columns, summed columns)}
+ROLLUP_TABLES = {
+    "rollup_sales_hourly": (("day", "hour"), ("tickets", "tax_amount", "total_amount")),
+    "rollup_product_hourly": (("day", "hour", "product_id", "variant_id"), ("quantity", "lines", "discount_amount", "revenue")),
+    "rollup_product_daily": (("day", "product_id", "variant_id"), ("quantity", "lines", "discount_amount", "revenue")),
+    "rollup_category_daily": (("day", "category_id"), ("quantity", "revenue")),
+    "rollup_modifier_daily": (("day", "modifier_id"), ("attach_count", "quantity", "revenue")),
+}
+
+
+def rollup_upsert(table_name):
+    """Builds the ON CONFLICT clause that adds a new row's amounts to an existing rollup row."""
+    key_columns, sum_columns = ROLLUP_TABLES[table_name]
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in sum_columns)
+    return f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}"
+
+
+# Day and hour of a sale_date ('YYYY-MM-DD HH:MM:SS') as stored in the rollup tables
+SALE_DAY = "substr(s.sale_date, 1, 10)"
+SALE_HOUR = "CAST(substr(s.sale_date, 12, 2) AS INTEGER)"
+
+# Triggers that keep the rollup tables current on every checkout. They only handle inserts:
+# sales are never edited by the app, so after fixing or deleting old sales by hand, run
+# rebuild_rollups() for the affected days. Rebuilding a table drops its triggers, so they
+# are created after migrate_tables().
+TRIGGER_DEFINITIONS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_sales_rollup AFTER INSERT ON sales
+    BEGIN
+        INSERT INTO rollup_sales_hourly (day, hour, tickets, tax_amount, total_amount)
+        SELECT {SALE_DAY}, {SALE_HOUR}, 1, s.tax_amount, s.total_amount
+        FROM sales s WHERE s.id = NEW.id
+        {rollup_upsert("rollup_sales_hourly")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_sale_items_rollup AFTER INSERT ON sale_items
+    BEGIN
+        INSERT INTO rollup_product_hourly (day, hour, product_id, variant_id, quantity, lines, discount_amount, revenue)
+        SELECT {SALE_DAY}, {SALE_HOUR}, NEW.product_id, COALESCE(NEW.variant_id, 0), NEW.quantity, 1,
+               NEW.discount_amount, NEW.quantity * NEW.price_at_sale - NEW.discount_amount
+        FROM sales s WHERE s.id = NEW.sale_id
+        {rollup_upsert("rollup_product_hourly")};
+
+        INSERT INTO rollup_product_daily (day, product_id, variant_id, quantity, lines, discount_amount, revenue)
+        SELECT {SALE_DAY}, NEW.product_id, COALESCE(NEW.variant_id, 0), NEW.quantity, 1,
+               NEW.discount_amount, NEW.quantity * NEW.price_at_sale - NEW.discount_amount
+        FROM sales s WHERE s.id = NEW.sale_id
+        {rollup_upsert("rollup_product_daily")};
+
+        INSERT INTO rollup_category_daily (day, category_id, quantity, revenue)
+        SELECT {SALE_DAY}, COALESCE(p.category_id, 0), NEW.quantity, NEW.quantity * NEW.price_at_sale - NEW.discount_amount
+        FROM sales s LEFT JOIN products p ON p.id = NEW.product_id WHERE s.id = NEW.sale_id
+        {rollup_upsert("rollup_category_daily")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_sale_item_modifiers_rollup AFTER INSERT ON sale_item_modifiers
+    BEGIN
+        INSERT INTO rollup_product_hourly (day, hour, product_id, variant_id, quantity, lines, discount_amount, revenue)
+        SELECT {SALE_DAY}, {SALE_HOUR}, si.product_id, COALESCE(si.variant_id, 0), 0, 0, 0, si.quantity * NEW.quantity * NEW.price_at_sale
+        FROM sale_items si JOIN sales s ON s.id = si.sale_id WHERE si.id = NEW.sale_item_id
+        {rollup_upsert("rollup_product_hourly")};
+
+        INSERT INTO rollup_product_daily (day, product_id, variant_id, quantity, lines, discount_amount, revenue)
+        SELECT {SALE_DAY}, si.product_id, COALESCE(si.variant_id, 0), 0, 0, 0, si.quantity * NEW.quantity * NEW.price_at_sale
+        FROM sale_items si JOIN sales s ON s.id = si.sale_id WHERE si.id = NEW.sale_item_id
+        {rollup_upsert("rollup_product_daily")};
+
+        INSERT INTO rollup_category_daily (day, category_id, quantity, revenue)
+        SELECT {SALE_DAY}, COALESCE(p.category_id, 0), 0, si.quantity * NEW.quantity * NEW.price_at_sale
+        FROM sale_items si JOIN sales s ON s.id = si.sale_id LEFT JOIN products p ON p.id = si.product_id
+        WHERE si.id = NEW.sale_item_id
+        {rollup_upsert("rollup_category_daily")};
+
+        INSERT INTO rollup_modifier_daily (day, modifier_id, attach_count, quantity, revenue)
+        SELECT {SALE_DAY}, NEW.modifier_id, 1, si.quantity * NEW.quantity, si.quantity * NEW.quantity * NEW.price_at_sale
+        FROM sale_items si JOIN sales s ON s.id = si.sale_id WHERE si.id = NEW.sale_item_id
+        {rollup_upsert("rollup_modifier_daily")};
+    END
+    """,
+]
+
+# Statements that recompute the rollups of the days in [:start, :end) from the sale tables.
+# The daily tables are derived from the hourly one, so the line items are read only once.
+# Note that a rebuild assigns each product to its current category.
+ROLLUP_REBUILD_STATEMENTS = [
+    f"""
+    INSERT INTO rollup_sales_hourly (day, hour, tickets, tax_amount, total_amount)
+    SELECT {SALE_DAY} AS day, {SALE_HOUR} AS hour, COUNT(*), SUM(s.tax_amount), SUM(s.total_amount)
+    FROM sales s
+    WHERE s.sale_date >= :start AND s.sale_date < :end
+    GROUP BY day, hour
+    """,
+    f"""
+    WITH line_amounts AS (
+        SELECT {SALE_DAY} AS day, {SALE_HOUR} AS hour, si.product_id, COALESCE(si.variant_id, 0) AS variant_id,
+               si.quantity, 1 AS lines, si.discount_amount, si.quantity * si.price_at_sale - si.discount_amount AS revenue
+        FROM sales s
+        JOIN sale_items si ON si.sale_id = s.id
+        WHERE s.sale_date >= :start AND s.sale_date < :end
+        UNION ALL
+        SELECT {SALE_DAY}, {SALE_HOUR}, si.product_id, COALESCE(si.variant_id, 0), 0, 0, 0, si.quantity * sim.quantity * sim.price_at_sale
+        FROM sales s
+        JOIN sale_items si ON si.sale_id = s.id
+        JOIN sale_item_modifiers sim ON sim.sale_item_id = si.id
+        WHERE s.sale_date >= :start AND s.sale_date < :end
+    )
+    INSERT INTO rollup_product_hourly (day, hour, product_id, variant_id, quantity, lines, discount_amount, revenue)
+    SELECT day, hour, product_id, variant_id, SUM(quantity), SUM(lines), SUM(discount_amount), SUM(revenue)
+    FROM line_amounts
+    GROUP BY day, hour, product_id, variant_id
+    """,
+    """
+    INSERT INTO rollup_product_daily (day, product_id, variant_id, quantity, lines, discount_amount, revenue)
+    SELECT day, product_id, variant_id, SUM(quantity), SUM(lines), SUM(discount_amount), SUM(revenue)
+    FROM rollup_product_hourly
+    WHERE day >= :start AND day < :end
+    GROUP BY day, product_id, variant_id
+    """,
+    """
+    INSERT INTO rollup_category_daily (day, category_id, quantity, revenue)
+    SELECT r.day, COALESCE(p.category_id, 0) AS category_id, SUM(r.quantity), SUM(r.revenue)
+    FROM rollup_product_daily r
+    LEFT JOIN products p ON p.id = r.product_id
+    WHERE r.day >= :start AND r.day < :end
+    GROUP BY r.day, category_id
+    """,
+    f"""
+    INSERT INTO rollup_modifier_daily (day, modifier_id, attach_count, quantity, revenue)
+    SELECT {SALE_DAY} AS day, sim.modifier_id, COUNT(*), SUM(si.quantity * sim.quantity), SUM(si.quantity * sim.quantity * sim.price_at_sale)
+    FROM sales s
+    JOIN sale_items si ON si.sale_id = s.id
+    JOIN sale_item_modifiers sim ON sim.sale_item_id = si.id
+    WHERE s.sale_date >= :start AND s.sale_date < :end
+    GROUP BY day, sim.modifier_id
+    """,
+]
+
+# Columns that hold money. Older databases stored them as REAL units; they are migrated to INTEGER cents.
+MONEY_COLUMNS = {
+    "products": ("base_price",),
+    "variants": ("price_adjustment",),
+    "modifiers": ("price",),
+    "sales": ("total_amount", "tax_amount"),
+    "sale_items": ("price_at_sale", "discount_amount"),
+    "sale_item_modifiers": ("price_at_sale",),
+    "sale_taxes": ("taxable_amount", "tax_amount"),
+    "pricing_rules": ("combo_price",),
+    "rollup_sales_hourly": ("tax_amount", "total_amount"),
+    "rollup_product_hourly": ("discount_amount", "revenue"),
+    "rollup_product_daily": ("discount_amount", "revenue"),
+    "rollup_category_daily": ("revenue",),
+    "rollup_modifier_daily": ("revenue",),
+}
+
+# Old column names still found in databases created by earlier versions: {(table, column): old_column}
+LEGACY_COLUMN_NAMES = {
+    ("sale_items", "price_at_sale"): "item_price",
+    ("sale_item_modifiers", "price_at_sale"): "modifier_price",
+}
+
+
+def create_tables():
+    """
+    Creates the necessary tables if they don't already exist and migrates older
+    databases to the current schema. This function should be called once at application startup.
+    """
+    conn, cursor = get_db_connection() # Get an active connection
+
+    existing_tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    for table_sql in TABLE_DEFINITIONS.values():
+        cursor.execute(table_sql)
+
+    migrate_tables(conn)
+
+    for index_sql in INDEX_DEFINITIONS:
+        cursor.execute(index_sql)
+    for trigger_sql in TRIGGER_DEFINITIONS:
+        cursor.execute(trigger_sql)
 
     conn.commit()
+
+    # Databases from before the rollup tables existed get them filled from their sales history
+    if not set(ROLLUP_TABLES) <= existing_tables:
+        print("Building rollup tables...")
+        rebuild_rollups(conn)
     # The connection is NOT closed here. It will remain open for the app.
     print("Tables created/verified.")
 
+
+def get_table_columns(cursor, table_name):
+    """Returns {column_name: declared_type} for a table."""
+    return {row[1]: row[2].upper() for row in cursor.execute(f"PRAGMA table_info({table_name})")}
+
+
+def migrate_tables(conn):
+    """
+    Rebuilds every table whose columns differ from TABLE_DEFINITIONS, copying its rows.
+    CREATE TABLE IF NOT EXISTS never touches existing tables, so this is how older databases
+    get new columns, renamed columns and REAL money columns converted to INTEGER cents.
+    """
+    cursor = conn.cursor()
+
+    # The expected columns come from creating each definition in an empty in-memory database
+    reference = sqlite3.connect(":memory:")
+    for table_sql in TABLE_DEFINITIONS.values():
+        reference.execute(table_sql)
+
+    # Keep foreign keys pointing at the real table names while tables are renamed
+    cursor.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        for table_name, table_sql in TABLE_DEFINITIONS.items():
+            expected = get_table_columns(reference.cursor(), table_name)
+            existing = get_table_columns(cursor, table_name)
+            if existing == expected:
+                continue
+
+            select_parts = []
+            for column_name in expected:
+                source = column_name if column_name in existing else LEGACY_COLUMN_NAMES.get((table_name, column_name))
+                if source not in existing:
+                    continue
+                if column_name in MONEY_COLUMNS.get(table_name, ()) and existing[source] != "INTEGER":
+                    select_parts.append((column_name, f"CAST(ROUND({source} * 100) AS INTEGER)"))
+                else:
+                    select_parts.append((column_name, source))
+
+            print(f"Migrating table {table_name}...")
+            if conn.in_transaction:
+                conn.commit()
+            # Each table is rebuilt in its own transaction, so a failure leaves it untouched
+            cursor.execute("BEGIN")
+            cursor.execute(f"ALTER TABLE {table_name} RENAME TO {table_name}_old")
+            cursor.execute(table_sql)
+            target_columns = ", ".join(name for name, _ in select_parts)
+            source_columns = ", ".join(expression for _, expression in select_parts)
+            cursor.execute(f"INSERT INTO {table_name} ({target_columns}) SELECT {source_columns} FROM {table_name}_old")
+            cursor.execute(f"DROP TABLE {table_name}_old")
+            conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.execute("PRAGMA legacy_alter_table = OFF")
+        reference.close()
+
+def first_live_day(conn):
+    """
+    First day whose sales are all still in this database: the day after the last month moved to a
+    partition (see utils/partitions.py), or None if nothing has been archived.
+    """
+    month = conn.execute("SELECT MAX(month) FROM sales_partitions").fetchone()[0]
+    if month is None:
+        return None
+    first = datetime.date.fromisoformat(f"{month}-01")
+    return (first + datetime.timedelta(days=32)).replace(day=1).isoformat()
+
+def rebuild_rollups(conn=None, start_date=None, end_date=None):
+    """
+    Recomputes the rollup tables from the sale tables for the days between start_date and
+    end_date ('YYYY-MM-DD', both included; None means no limit), in a single transaction.
+    Use it to backfill history or after editing old sales. Archived months are skipped.
+    """
+    if conn is None:
+        conn, _ = get_db_connection()
+    start = datetime.date.fromisoformat(start_date).isoformat() if start_date else "0000-01-01"
+    end = (datetime.date.fromisoformat(end_date) + datetime.timedelta(days=1)).isoformat() if end_date else "9999-12-31"
+    if start >= end:
+        raise ValueError("start_date is after end_date")
+    # Archived months keep their rollups: their sales are no longer in this database
+    live_start = first_live_day(conn)
+    if live_start and start < live_start:
+        start = live_start
+        if start >= end:
+            return
+    params = {"start": start, "end": end}
+
+    cursor = conn.cursor()
+    if conn.in_transaction:
+        conn.commit()
+    try:
+        cursor.execute("BEGIN")
+        for table_name in ROLLUP_TABLES:
+            cursor.execute(f"DELETE FROM {table_name} WHERE day >= :start AND day < :end", params)
+        for statement in ROLLUP_REBUILD_STATEMENTS:
+            cursor.execute(statement, params)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
 # New: Add a function to get the current active cursor for models
 def get_cursor():
     """Returns the globally active database cursor."""
@@ -164,4 +923,19 @@ def get_cursor():
     return cursor
 
 # Initial call to create_tables will also establish the connection
-# create_tables() # Do not call this directly here. Call it from main.py.
\ No newline at end of file
+# create_tables() # Do not call this directly here. Call it from main.py.
+
+
+if __name__ == "__main__":
+    # Maintenance command: python database.py rebuild-rollups [START_DATE [END_DATE]]
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild-rollups" or len(sys.argv) > 4:
+        print("Usage: python database.py rebuild-rollups [START_DATE [END_DATE]]")
+        sys.exit(1)
+    try:
+        claim_database_file()
+    except RuntimeError as e:
+        sys.exit(str(e))
+    create_tables()
+    rebuild_rollups(None, *sys.argv[2:])
+    print("Rollup tables rebuilt.")
+    close_db_connection()
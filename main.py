@@ -5,6 +5,12 @@ from tkinter import ttk, messagebox
 import os
 from config.translations import set_language, get_text, TRANSLATIONS
 from modules.product_manager_module import ProductManagerModule
+from modules.reports_module import ReportsModule
+from modules.sales_history_module import SalesHistoryModule
+from modules.dashboard_module import DashboardModule
+from modules.day_close_module import DayCloseModule
+from database import IN_MEMORY_DB, create_tables
+from utils.backup import BackupService, MemoryFlusher, flush_memory_database
 from utils.db_manager import DBManager
 from utils.helpers import load_icon # Importa la función de ayuda
 
@@ -24,6 +30,17 @@ class App(tk.Tk):
 
         self.db_manager = DBManager("restaurant_data.db")
         self.db_manager.init_db()
+        create_tables() # Base de datos de ventas (data/sales_db.db) usada por los modelos y reportes
+        if IN_MEMORY_DB:
+            # Las tablas nuevas y las migraciones no van al journal: tienen que estar en disco antes que
+            # las escrituras que las usan, o no se podrían volver a aplicar tras un corte
+            flush_memory_database()
+        self.backup_service = BackupService() # Copias de seguridad periódicas en un hilo secundario
+        self.backup_service.start()
+        self.memory_flusher = None
+        if IN_MEMORY_DB: # Base en memoria (SALES_DB_IN_MEMORY=1): se copia a disco periódicamente
+            self.memory_flusher = MemoryFlusher()
+            self.memory_flusher.start()
 
         self.current_module_frame = None
         self.icons = {} # Diccionario para guardar referencias a los iconos
@@ -91,6 +108,9 @@ class App(tk.Tk):
         modules_menu.add_command(label=get_text("menu_products"), image=self.icons["products"], compound=tk.LEFT, command=lambda: self.show_module("products"))
         modules_menu.add_command(label=get_text("menu_sales"), image=self.icons["sales"], compound=tk.LEFT, command=lambda: self.show_module("sales"))
         modules_menu.add_command(label=get_text("menu_reports"), image=self.icons["reports"], compound=tk.LEFT, command=lambda: self.show_module("reports"))
+        modules_menu.add_command(label=get_text("menu_sales_history"), image=self.icons["reports"], compound=tk.LEFT, command=lambda: self.show_module("history"))
+        modules_menu.add_command(label=get_text("menu_dashboard"), image=self.icons["reports"], compound=tk.LEFT, command=lambda: self.show_module("dashboard"))
+        modules_menu.add_command(label=get_text("menu_day_close"), image=self.icons["reports"], compound=tk.LEFT, command=lambda: self.show_module("day_close"))
         modules_menu.add_command(label=get_text("menu_settings"), image=self.icons["settings"], compound=tk.LEFT, command=lambda: self.show_module("settings"))
 
         language_menu = tk.Menu(menu_bar, tearoff=0)
@@ -117,8 +137,13 @@ class App(tk.Tk):
             # self.current_module_frame = SalesModule(self.main_frame, self.db_manager)
             self.current_module_frame = ttk.Label(self.main_frame, text=get_text("msg_not_implemented") + " " + get_text("sales_title"), anchor="center")
         elif module_name == "reports":
-            # self.current_module_frame = ReportsModule(self.main_frame, self.db_manager)
-            self.current_module_frame = ttk.Label(self.main_frame, text=get_text("msg_not_implemented") + " " + get_text("reports_title"), anchor="center")
+            self.current_module_frame = ReportsModule(self.main_frame)
+        elif module_name == "history":
+            self.current_module_frame = SalesHistoryModule(self.main_frame)
+        elif module_name == "dashboard":
+            self.current_module_frame = DashboardModule(self.main_frame)
+        elif module_name == "day_close":
+            self.current_module_frame = DayCloseModule(self.main_frame)
         elif module_name == "settings":
             # self.current_module_frame = SettingsModule(self.main_frame, self.db_manager)
             self.current_module_frame = ttk.Label(self.main_frame, text=get_text("msg_not_implemented") + " " + get_text("settings_title"), anchor="center")
@@ -137,6 +162,18 @@ class App(tk.Tk):
             current_module_name = ""
             if isinstance(self.current_module_frame, ProductManagerModule):
                 current_module_name = "products"
+            elif isinstance(self.current_module_frame, ReportsModule):
+                self.current_module_frame.update_language() # Conserva el reporte mostrado
+                return
+            elif isinstance(self.current_module_frame, SalesHistoryModule):
+                self.current_module_frame.update_language() # Conserva el filtro y la posición
+                return
+            elif isinstance(self.current_module_frame, DashboardModule):
+                self.current_module_frame.update_language()
+                return
+            elif isinstance(self.current_module_frame, DayCloseModule):
+                self.current_module_frame.update_language() # Conserva el avance de un cierre en curso
+                return
             # ... (para otros módulos)
             if current_module_name:
                 self.show_module(current_module_name)
@@ -145,6 +182,9 @@ class App(tk.Tk):
 
     def on_closing(self):
         if messagebox.askokcancel("Salir", "¿Estás seguro de que quieres salir?"):
+            self.backup_service.stop()
+            if self.memory_flusher is not None:
+                self.memory_flusher.stop() # Última copia a disco antes de salir
             self.db_manager.close_connection()
             self.destroy()
 
@@ -2,21 +2,150 @@
 
 import sqlite3
 import datetime
+import decimal
+import json
+import operator
 # Importamos get_db_connection y get_cursor para usar la conexión global
-from database import get_db_connection, get_cursor
+from database import get_db_connection, get_cursor, in_write_transaction, journal_lock, record_write
+
+class Money:
+    """
+    Importe de dinero en punto fijo, guardado como un entero de centavos.
+    Las columnas de dinero de la base de datos son INTEGER en centavos y los modelos las exponen
+    como Money, así que las sumas y restas son exactas y los SUM de SQL no acumulan errores de redondeo.
+    """
+    __slots__ = ("cents",)
+
+    def __init__(self, cents=0):
+        self.cents = operator.index(cents) # Solo enteros: un float o Decimal es un importe en unidades (from_decimal)
+
+    @classmethod
+    def from_cents(cls, cents):
+        """Crea un Money a partir de un entero de centavos (así vienen de la base de datos)."""
+        return cls(cents)
+
+    @classmethod
+    def from_decimal(cls, value):
+        """Crea un Money a partir de un importe en unidades (p. ej. 12.5, "12.50" o Decimal("12.5"))."""
+        amount = decimal.Decimal(str(value)).quantize(decimal.Decimal("0.01"), rounding=decimal.ROUND_HALF_UP)
+        return cls(int(amount * 100))
+
+    def to_decimal(self):
+        return decimal.Decimal(self.cents).scaleb(-2)
+
+    def percent(self, percent):
+        """Devuelve el porcentaje indicado de este importe, redondeado al centavo."""
+        return Money(apply_percent(self.cents, percent))
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents + other.cents)
+        if other == 0:
+            return self
+        return NotImplemented
+
+    __radd__ = __add__ # Permite sum() sobre una lista de Money
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents - other.cents)
+        return NotImplemented
+
+    def __mul__(self, quantity):
+        if isinstance(quantity, int):
+            return Money(self.cents * quantity)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __int__(self):
+        return self.cents
+
+    def __float__(self):
+        return self.cents / 100.0
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.cents < other.cents
+        return NotImplemented
+
+    def __le__(self, other):
+        if isinstance(other, Money):
+            return self.cents <= other.cents
+        return NotImplemented
+
+    def __gt__(self, other):
+        if isinstance(other, Money):
+            return self.cents > other.cents
+        return NotImplemented
+
+    def __ge__(self, other):
+        if isinstance(other, Money):
+            return self.cents >= other.cents
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.cents)
+
+    def __format__(self, format_spec):
+        # Permite f"{precio:.2f}" y f"{ajuste:+.2f}" igual que con un float
+        return format(self.to_decimal(), format_spec or ".2f")
+
+    def __str__(self):
+        return format(self.to_decimal(), ".2f")
+
+    def __repr__(self):
+        return f"Money({self})"
+
+
+def apply_percent(cents, percent):
+    """Porcentaje de un importe en centavos, redondeado al centavo (mitad hacia arriba), solo con enteros."""
+    basis_points = int(round(percent * 100))
+    product = cents * basis_points
+    return (product + 5000) // 10000 if product >= 0 else -((-product + 5000) // 10000)
+
+
+def check_money(model, field_name, value):
+    """
+    Lanza TypeError si el valor de un campo de dinero no es Money ni None. Un número suelto es ambiguo
+    (¿5 son 5 centavos o 5 unidades?): se pide Money.from_cents() o Money.from_decimal() explícito.
+    """
+    if value is not None and not isinstance(value, Money):
+        raise TypeError(f"{type(model).__name__}.{field_name} debe ser Money (Money.from_cents() o Money.from_decimal()), "
+                        f"no {type(value).__name__}")
+
+
+# Los Money se guardan en SQLite como su entero de centavos
+sqlite3.register_adapter(Money, int)
+
 
 class BaseModel:
     _table_name = ""
     _fields = [] # Lista de tuplas (nombre_columna, tipo_python)
     _primary_key = "id"
+    version = 0 # Cambios guardados con save()/delete() en la tabla de cada modelo; las cachés lo comparan
 
     def __init__(self, **kwargs):
         # Inicializa los atributos del objeto con los valores proporcionados o None
         # Incluye el primary key en la inicialización
         setattr(self, self._primary_key, kwargs.get(self._primary_key))
-        for field_name, _ in self._fields:
+        for field_name, field_type in self._fields:
             # Para campos que no tienen un valor en kwargs, se inicializan a None
-            setattr(self, field_name, kwargs.get(field_name))
+            value = kwargs.get(field_name)
+            if field_type is Money:
+                check_money(self, field_name, value)
+            setattr(self, field_name, value)
 
         # Manejar created_at y updated_at si existen en la tabla pero no en _fields
         # Asumiendo que la DB los gestiona automáticamente (DEFAULT CURRENT_TIMESTAMP)
@@ -26,22 +155,49 @@ class BaseModel:
 
 
     @classmethod
-    def _execute_query(cls, query, params=(), fetch_result=False):
-        """Método de clase para ejecutar consultas SQL y manejar la conexión."""
-        conn, cursor = get_db_connection()
+    def from_row(cls, row):
+        """Crea una instancia desde una fila de la base de datos ({columna: valor}); el dinero viene en centavos."""
+        values = dict(row)
+        for field_name, field_type in cls._fields:
+            if field_type is Money and values.get(field_name) is not None:
+                values[field_name] = Money.from_cents(values[field_name])
+        return cls(**values)
+
+    @classmethod
+    def _execute_query(cls, query, params=(), fetch_result=False, conn=None):
+        """
+        Método de clase para ejecutar consultas SQL y manejar la conexión.
+        conn permite leer con otra conexión (p. ej. una de solo lectura con meses archivados adjuntos).
+        Dentro de database.write_transaction() las escrituras no se confirman una por una y un error se
+        propaga, para que la transacción entera se deshaga.
+        """
+        journaled = conn is None # Solo las escrituras en la base en uso van al journal (modo en memoria)
+        deferred = journaled and in_write_transaction()
+        if conn is None:
+            conn, cursor = get_db_connection()
+        else:
+            cursor = conn.cursor()
 
         try:
-            cursor.execute(query, params)
             if query.strip().upper().startswith("SELECT"):
+                cursor.execute(query, params)
                 # Para SELECTs, necesitamos los nombres de las columnas para crear diccionarios
                 col_names = [description[0] for description in cursor.description]
                 rows = cursor.fetchall()
                 # Retorna una lista de diccionarios para facilitar la inicialización del modelo
                 return [dict(zip(col_names, row)) for row in rows] if fetch_result else rows
             else:
-                conn.commit() # Solo commitea si no es un SELECT
+                # La escritura y su registro en el journal van juntos: una copia a disco no puede quedar en el medio
+                with journal_lock:
+                    cursor.execute(query, params)
+                    if not deferred:
+                        conn.commit() # Solo commitea si no es un SELECT
+                    if journaled:
+                        record_write(query, params)
                 return cursor
         except sqlite3.Error as e:
+            if deferred:
+                raise
             print(f"Error de base de datos en {cls._table_name}: {e}")
             conn.rollback() # Solo rollback si no es un SELECT
             return None # Retorna None en caso de error
@@ -54,7 +210,7 @@ class BaseModel:
         # Pasamos fetch_result=True para obtener un diccionario
         rows = cls._execute_query(query, (item_id,), fetch_result=True)
         if rows: # Si se encontró al menos una fila (debería ser solo una para ID)
-            return cls(**rows[0]) # rows[0] es el diccionario de la primera fila
+            return cls.from_row(rows[0]) # rows[0] es el diccionario de la primera fila
         return None
 
     @classmethod
@@ -64,7 +220,7 @@ class BaseModel:
         # Pasamos fetch_result=True para obtener una lista de diccionarios
         rows = cls._execute_query(query, fetch_result=True)
         if rows:
-            return [cls(**row) for row in rows]
+            return [cls.from_row(row) for row in rows]
         return []
 
     def save(self):
@@ -73,8 +229,10 @@ class BaseModel:
         # No incluir 'id' en los campos a insertar ya que es AUTOINCREMENT
         fields_to_process = []
         values_to_process = []
-        for field_name, _ in self._fields:
+        for field_name, field_type in self._fields:
             value = getattr(self, field_name)
+            if field_type is Money:
+                check_money(self, field_name, value) # Por si se asignó un número suelto desde un formulario
             fields_to_process.append(field_name)
             values_to_process.append(value)
 
@@ -89,6 +247,7 @@ class BaseModel:
             cursor = self._execute_query(query, values_to_process)
             if cursor: # Si la ejecución fue exitosa
                 setattr(self, self._primary_key, cursor.lastrowid) # Asigna el ID generado
+                type(self).version += 1
                 return True
         else:
             # UPDATE registro existente
@@ -99,6 +258,7 @@ class BaseModel:
             query = f"UPDATE {self._table_name} SET {set_clauses} WHERE {self._primary_key} = ?"
             values_to_process.append(getattr(self, self._primary_key)) # Añade el ID al final
             if self._execute_query(query, values_to_process):
+                type(self).version += 1
                 return True
         return False
 
@@ -108,6 +268,7 @@ class BaseModel:
             query = f"DELETE FROM {self._table_name} WHERE {self._primary_key} = ?"
             # No se necesita fetch_result para DELETE
             if self._execute_query(query, (getattr(self, self._primary_key),)):
+                type(self).version += 1
                 return True
         return False
 
@@ -133,6 +294,7 @@ class Category(BaseModel):
     _fields = [
         ("name_es", str),
         ("name_en", str),
+        ("tax_rate_id", int), # NULL para usar la tasa por defecto
     ]
 
     def __init__(self, **kwargs):
@@ -158,9 +320,10 @@ class Product(BaseModel):
         ("name_en", str),
         ("description_es", str),
         ("description_en", str),
-        ("base_price", float),
+        ("base_price", Money),
         ("image_path", str),
         ("is_available", int), # Asegúrate de que este campo también exista en tu tabla
+        ("tax_rate_id", int), # NULL para usar la tasa de la categoría
     ]
 
     def __init__(self, **kwargs):
@@ -202,7 +365,7 @@ class Product(BaseModel):
         query = "SELECT * FROM products WHERE category_id = ?"
         rows = cls._execute_query(query, (category_id,), fetch_result=True)
         if rows:
-            return [cls(**row) for row in rows]
+            return [cls.from_row(row) for row in rows]
         return []
 
 
@@ -212,13 +375,13 @@ class Variant(BaseModel):
         ("product_id", int),
         ("name_es", str),
         ("name_en", str),
-        ("price_adjustment", float),
+        ("price_adjustment", Money),
     ]
 
     def __init__(self, **kwargs):
         # Asegúrate de que 'price_adjustment' tenga un valor por defecto
         if 'price_adjustment' not in kwargs:
-            kwargs['price_adjustment'] = 0.0
+            kwargs['price_adjustment'] = Money(0)
         super().__init__(**kwargs)
 
     def get_name(self, lang="es"):
@@ -238,7 +401,7 @@ class Variant(BaseModel):
         query = "SELECT * FROM variants WHERE product_id = ?"
         rows = cls._execute_query(query, (product_id,), fetch_result=True)
         if rows:
-            return [cls(**row) for row in rows]
+            return [cls.from_row(row) for row in rows]
         return []
 
 class Modifier(BaseModel):
@@ -246,7 +409,7 @@ class Modifier(BaseModel):
     _fields = [
         ("name_es", str),
         ("name_en", str),
-        ("price", float),
+        ("price", Money),
         ("product_id", int),  # Puede ser NULL si es un modificador global
         ("variant_id", int),  # Puede ser NULL si es un modificador global o de producto
     ]
@@ -254,7 +417,7 @@ class Modifier(BaseModel):
     def __init__(self, **kwargs):
         # Asegúrate de que 'price' tenga un valor por defecto
         if 'price' not in kwargs:
-            kwargs['price'] = 0.0
+            kwargs['price'] = Money(0)
         super().__init__(**kwargs)
 
     def get_name(self, lang="es"):
@@ -274,7 +437,7 @@ class Modifier(BaseModel):
         query = "SELECT * FROM modifiers WHERE product_id = ? AND variant_id IS NULL"
         rows = cls._execute_query(query, (product_id,), fetch_result=True)
         if rows:
-            return [cls(**row) for row in rows]
+            return [cls.from_row(row) for row in rows]
         return []
 
     @classmethod
@@ -283,7 +446,7 @@ class Modifier(BaseModel):
         query = "SELECT * FROM modifiers WHERE variant_id = ?"
         rows = cls._execute_query(query, (variant_id,), fetch_result=True)
         if rows:
-            return [cls(**row) for row in rows]
+            return [cls.from_row(row) for row in rows]
         return []
 
     @classmethod
@@ -292,30 +455,99 @@ class Modifier(BaseModel):
         query = "SELECT * FROM modifiers WHERE product_id IS NULL AND variant_id IS NULL"
         rows = cls._execute_query(query, fetch_result=True)
         if rows:
-            return [cls(**row) for row in rows]
+            return [cls.from_row(row) for row in rows]
         return []
 
 class Sale(BaseModel):
     _table_name = "sales"
     _fields = [
         ("sale_date", str),
-        ("total_amount", float),
+        ("total_amount", Money),
+        ("tax_amount", Money), # Total de impuestos de la venta (detalle por tasa en sale_taxes)
     ]
 
     def __init__(self, **kwargs):
         # Si sale_date no se proporciona, usa la fecha y hora actual
         if kwargs.get('sale_date') is None:
             kwargs['sale_date'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if kwargs.get('tax_amount') is None:
+            kwargs['tax_amount'] = Money(0)
         super().__init__(**kwargs)
+        self.items = None # Lista de SaleItem ya cargada por load_full(); None si no se cargó
 
     def get_items(self):
         """Obtiene todos los ítems de venta asociados a esta venta."""
+        if self.items is not None:
+            return self.items
         query = "SELECT * FROM sale_items WHERE sale_id = ?"
         rows = SaleItem._execute_query(query, (self.id,), fetch_result=True)
         if rows:
-            return [SaleItem(**row) for row in rows]
+            return [SaleItem.from_row(row) for row in rows]
         return []
 
+    @classmethod
+    def load_full(cls, ids, conn=None):
+        """
+        Carga una o varias ventas completas: ítems, productos, variantes y modificadores.
+        Hace siempre tres consultas (ventas, ítems con producto y variante, modificadores), sin
+        importar cuántas ventas o líneas haya; los ids se pasan como un solo parámetro JSON.
+        Con un id retorna la Sale (o None); con una lista de ids, las Sale encontradas en ese orden.
+        En las ventas cargadas, get_items() y los get_product/get_variant/get_modifiers de cada ítem
+        ya no consultan la base de datos. conn, si se pasa, se usa en lugar de la conexión global.
+        """
+        single = isinstance(ids, int)
+        id_list = [ids] if single else [int(sale_id) for sale_id in ids]
+        if not id_list:
+            return []
+        ids_param = json.dumps(id_list)
+
+        sale_rows = cls._execute_query(
+            "SELECT * FROM sales WHERE id IN (SELECT value FROM json_each(?))", (ids_param,), fetch_result=True, conn=conn) or []
+        sales = {row["id"]: cls.from_row(row) for row in sale_rows}
+        for sale in sales.values():
+            sale.items = []
+
+        # Ítems con su producto y variante en una sola consulta (columnas con prefijo p_ / v_)
+        product_columns = ["id"] + [name for name, _ in Product._fields]
+        variant_columns = ["id"] + [name for name, _ in Variant._fields]
+        item_query = f"""
+            SELECT si.*,
+                   {", ".join(f"p.{name} AS p_{name}" for name in product_columns)},
+                   {", ".join(f"v.{name} AS v_{name}" for name in variant_columns)}
+            FROM sale_items si
+            LEFT JOIN products p ON p.id = si.product_id
+            LEFT JOIN variants v ON v.id = si.variant_id
+            WHERE si.sale_id IN (SELECT value FROM json_each(?))
+            ORDER BY si.sale_id, si.id
+        """
+        items = {}
+        products, variants = {}, {} # Un solo objeto por producto/variante aunque se repita en varias líneas
+        for row in SaleItem._execute_query(item_query, (ids_param,), fetch_result=True, conn=conn) or []:
+            item = SaleItem.from_row(row)
+            product_id, variant_id = row["p_id"], row["v_id"]
+            if product_id is not None and product_id not in products:
+                products[product_id] = Product.from_row({name: row[f"p_{name}"] for name in product_columns})
+            if variant_id is not None and variant_id not in variants:
+                variants[variant_id] = Variant.from_row({name: row[f"v_{name}"] for name in variant_columns})
+            item._related = (products.get(product_id), variants.get(variant_id), [])
+            items[item.id] = item
+            sales[item.sale_id].items.append(item)
+
+        modifier_query = """
+            SELECT sim.sale_item_id, sim.modifier_id, sim.quantity, sim.price_at_sale, m.name_es, m.name_en
+            FROM sale_item_modifiers sim
+            JOIN sale_items si ON si.id = sim.sale_item_id
+            JOIN modifiers m ON m.id = sim.modifier_id
+            WHERE si.sale_id IN (SELECT value FROM json_each(?))
+            ORDER BY sim.sale_item_id, sim.id
+        """
+        for row in SaleItemModifier._execute_query(modifier_query, (ids_param,), fetch_result=True, conn=conn) or []:
+            items[row["sale_item_id"]]._related[2].append(SaleItem.modifier_dict(row))
+
+        if single:
+            return sales.get(ids)
+        return [sales[sale_id] for sale_id in id_list if sale_id in sales]
+
 class SaleItem(BaseModel):
     _table_name = "sale_items"
     _fields = [
@@ -323,49 +555,55 @@ class SaleItem(BaseModel):
         ("product_id", int),
         ("variant_id", int), # Puede ser None
         ("quantity", int),
-        ("price_at_sale", float),
+        ("price_at_sale", Money),
+        ("discount_amount", Money), # Descuento total de la línea (reglas de precio)
     ]
 
     def __init__(self, **kwargs):
         # Asegúrate de que 'quantity' tenga un valor por defecto
         if 'quantity' not in kwargs:
             kwargs['quantity'] = 1
+        if kwargs.get('discount_amount') is None:
+            kwargs['discount_amount'] = Money(0)
         super().__init__(**kwargs)
+        self._related = None # (producto, variante, modificadores) si la venta se cargó con Sale.load_full()
 
     def get_product(self):
         """Obtiene el objeto Producto asociado a este ítem de venta."""
+        if self._related is not None:
+            return self._related[0]
         return Product.get_by_id(self.product_id)
 
     def get_variant(self):
         """Obtiene el objeto Variante asociado a este ítem de venta (si existe)."""
+        if self._related is not None:
+            return self._related[1]
         return Variant.get_by_id(self.variant_id) if self.variant_id else None
 
+    @staticmethod
+    def modifier_dict(row):
+        """Convierte una fila de sale_item_modifiers (con los nombres del modificador) al formato de get_modifiers()."""
+        return {
+            "id": row["modifier_id"],
+            "name_es": row["name_es"],
+            "name_en": row["name_en"],
+            "price": Money.from_cents(row["price_at_sale"]), # Precio del modificador individual al momento de la venta
+            "quantity": row["quantity"]
+        }
+
     def get_modifiers(self):
         """Obtiene los modificadores aplicados a este ítem de venta."""
+        if self._related is not None:
+            return self._related[2]
         query = """
             SELECT sim.modifier_id, sim.quantity, sim.price_at_sale, m.name_es, m.name_en
             FROM sale_item_modifiers sim
             JOIN modifiers m ON sim.modifier_id = m.id
             WHERE sim.sale_item_id = ?
+            ORDER BY sim.id
         """
-        # Usamos _execute_query del SaleItemModifier para este fetch
-        # Y manejamos la conversión a dicts manualmente para asegurar la estructura deseada
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(query, (self.id,))
-        
-        col_names = [description[0] for description in cursor.description]
-        modifiers_data = []
-        for row_tuple in cursor.fetchall():
-            row_dict = dict(zip(col_names, row_tuple))
-            modifiers_data.append({
-                "id": row_dict["modifier_id"],
-                "name_es": row_dict["name_es"],
-                "name_en": row_dict["name_en"],
-                "price": row_dict["price_at_sale"], # Precio del modificador individual al momento de la venta
-                "quantity": row_dict["quantity"]
-            })
-        return modifiers_data # Retorna una lista de diccionarios
+        rows = SaleItemModifier._execute_query(query, (self.id,), fetch_result=True)
+        return [self.modifier_dict(row) for row in rows or []] # Retorna una lista de diccionarios
 
 
 class SaleItemModifier(BaseModel):
@@ -374,7 +612,7 @@ class SaleItemModifier(BaseModel):
         ("sale_item_id", int),
         ("modifier_id", int),
         ("quantity", int),
-        ("price_at_sale", float),
+        ("price_at_sale", Money),
     ]
 
     def __init__(self, **kwargs):
@@ -382,9 +620,97 @@ class SaleItemModifier(BaseModel):
         if 'quantity' not in kwargs:
             kwargs['quantity'] = 1
         if 'price_at_sale' not in kwargs:
-            kwargs['price_at_sale'] = 0.0 # O un valor más apropiado si se conoce
+            kwargs['price_at_sale'] = Money(0) # O un valor más apropiado si se conoce
         super().__init__(**kwargs)
 
     def get_modifier(self):
         """Obtiene el objeto Modifier asociado a este modificador de ítem de venta."""
-        return Modifier.get_by_id(self.modifier_id)
\ No newline at end of file
+        return Modifier.get_by_id(self.modifier_id)
+
+
+class PricingRule(BaseModel):
+    _table_name = "pricing_rules"
+    _fields = [
+        ("name", str),
+        ("rule_type", str), # 'percent_off', 'quantity_break' o 'combo'
+        ("category_id", int),
+        ("product_id", int),
+        ("percent", float),
+        ("min_quantity", int),
+        ("combo_items", str), # "product_id:cantidad,product_id:cantidad"
+        ("combo_price", Money),
+        ("start_time", str), # 'HH:MM'
+        ("end_time", str), # 'HH:MM'
+        ("days_of_week", str), # Dígitos 0-6 (lunes=0)
+        ("is_active", int),
+    ]
+
+    def __init__(self, **kwargs):
+        if kwargs.get('percent') is None:
+            kwargs['percent'] = 0.0
+        if kwargs.get('min_quantity') is None:
+            kwargs['min_quantity'] = 1
+        if 'is_active' not in kwargs:
+            kwargs['is_active'] = 1
+        super().__init__(**kwargs)
+
+    def get_combo_items(self):
+        """Devuelve los componentes del combo como {product_id: cantidad}."""
+        items = {}
+        for part in (self.combo_items or "").split(","):
+            if part.strip():
+                product_id, quantity = part.split(":")
+                items[int(product_id)] = items.get(int(product_id), 0) + int(quantity)
+        return items
+
+    @classmethod
+    def get_active_rules(cls):
+        """Obtiene todas las reglas de precio activas."""
+        query = "SELECT * FROM pricing_rules WHERE is_active = 1"
+        rows = cls._execute_query(query, fetch_result=True)
+        if rows:
+            return [cls.from_row(row) for row in rows]
+        return []
+
+
+class TaxRate(BaseModel):
+    _table_name = "tax_rates"
+    _fields = [
+        ("name", str),
+        ("rate", float), # Porcentaje
+        ("is_inclusive", int), # 1 si el precio ya incluye el impuesto
+        ("is_default", int),
+    ]
+
+    def __init__(self, **kwargs):
+        if 'is_inclusive' not in kwargs:
+            kwargs['is_inclusive'] = 1
+        if 'is_default' not in kwargs:
+            kwargs['is_default'] = 0
+        super().__init__(**kwargs)
+
+
+class SaleTax(BaseModel):
+    _table_name = "sale_taxes"
+    _fields = [
+        ("sale_id", int),
+        ("tax_rate_id", int),
+        ("sale_date", str),
+        ("rate", float),
+        ("taxable_amount", Money),
+        ("tax_amount", Money),
+    ]
+
+    @classmethod
+    def get_totals_by_rate(cls, start_date, end_date):
+        """
+        Totales de impuestos por tasa entre dos fechas ('YYYY-MM-DD HH:MM:SS', fin excluido), en centavos.
+        Usa el índice (sale_date, tax_rate_id) de sale_taxes, sin recorrer las líneas de venta.
+        """
+        query = """
+            SELECT tax_rate_id, rate, SUM(taxable_amount) AS taxable_amount, SUM(tax_amount) AS tax_amount
+            FROM sale_taxes
+            WHERE sale_date >= ? AND sale_date < ?
+            GROUP BY tax_rate_id, rate
+        """
+        return cls._execute_query(query, (start_date, end_date), fetch_result=True) or []
@@ -0,0 +1,109 @@
+import tkinter as tk
+from tkinter import ttk
+import datetime
+
+from config.translations import get_text
+import config.translations as translations
+from models import Money
+from utils.live_sales import LiveSalesTracker
+from utils.sketches import load_sketches
+
+REFRESH_INTERVAL_MS = 3000 # Cada cuánto se buscan ventas nuevas
+TOP_PRODUCTS = 10
+
+class DashboardModule(ttk.Frame):
+    """
+    Tablero en vivo de las ventas del día. Cada REFRESH_INTERVAL_MS le pide al LiveSalesTracker
+    las filas nuevas; si no hubo escrituras en la base no se consulta nada ni se redibuja.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.tracker = LiveSalesTracker()
+        self.product_names = {}
+        self.refresh_job = None
+        self.create_widgets()
+        self.refresh()
+
+    def create_widgets(self):
+        self.title_label = ttk.Label(self, text=get_text("dashboard_title"), font=("Arial", 16, "bold"))
+        self.title_label.pack(pady=10)
+
+        # --- Indicadores ---
+        self.stats_frame = ttk.Frame(self)
+        self.stats_frame.pack(fill=tk.X, padx=10, pady=5)
+        self.stat_labels = {}
+        self.stat_values = {}
+        for column, key in enumerate(("lbl_revenue_today", "lbl_tickets_today", "lbl_average_ticket", "lbl_ticket_median", "lbl_ticket_p95")):
+            self.stat_labels[key] = ttk.Label(self.stats_frame, text=get_text(key))
+            self.stat_labels[key].grid(row=0, column=column, padx=15, sticky=tk.W)
+            self.stat_values[key] = ttk.Label(self.stats_frame, text="-", font=("Arial", 14, "bold"))
+            self.stat_values[key].grid(row=1, column=column, padx=15, sticky=tk.W)
+
+        # --- Más vendidos ---
+        self.lbl_top_sellers = ttk.Label(self, text=get_text("lbl_top_sellers"), font=("Arial", 12, "bold"))
+        self.lbl_top_sellers.pack(anchor=tk.W, padx=10, pady=(10, 0))
+        self.top_tree = ttk.Treeview(self, columns=("product", "quantity", "total"), show="headings", height=TOP_PRODUCTS)
+        self.top_tree.column("product", width=250, anchor=tk.W)
+        self.top_tree.column("quantity", width=100, anchor=tk.E)
+        self.top_tree.column("total", width=120, anchor=tk.E)
+        self.update_headings()
+        self.top_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        self.lbl_last_update = ttk.Label(self, text="")
+        self.lbl_last_update.pack(anchor=tk.E, padx=10, pady=5)
+
+    def update_headings(self):
+        self.top_tree.heading("product", text=get_text("report_col_product_name"))
+        self.top_tree.heading("quantity", text=get_text("report_col_product_qty"))
+        self.top_tree.heading("total", text=get_text("report_col_total"))
+
+    def refresh(self):
+        """Incorpora las ventas nuevas y redibuja solo si hubo cambios; luego se vuelve a programar."""
+        if self.tracker.poll():
+            self.show_totals()
+        self.refresh_job = self.after(REFRESH_INTERVAL_MS, self.refresh)
+
+    def show_totals(self):
+        tracker = self.tracker
+        self.stat_values["lbl_revenue_today"].config(text=f"{Money(tracker.revenue)}")
+        self.stat_values["lbl_tickets_today"].config(text=str(tracker.tickets))
+        average = tracker.revenue // tracker.tickets if tracker.tickets else 0
+        self.stat_values["lbl_average_ticket"].config(text=f"{Money(average)}")
+
+        # Mediana y p95 del ticket desde los sketches por hora: cuesta lo mismo con 10 o 10.000 ventas
+        now = datetime.datetime.now()
+        day_start = datetime.datetime.combine(tracker.day, datetime.time())
+        sketch = load_sketches(day_start, now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1), tracker.conn)
+        for key, q in (("lbl_ticket_median", 0.5), ("lbl_ticket_p95", 0.95)):
+            value = sketch.ticket_totals.quantile(q)
+            self.stat_values[key].config(text=f"{Money(round(value))}" if value is not None else "-")
+
+        top = tracker.top_products(TOP_PRODUCTS)
+        if any(product_id not in self.product_names for product_id, _, _ in top):
+            self.load_product_names()
+        self.top_tree.delete(*self.top_tree.get_children())
+        for product_id, quantity, amount in top:
+            self.top_tree.insert("", tk.END, values=(self.product_names.get(product_id, f"#{product_id}"), quantity, f"{Money(amount)}"))
+        self.lbl_last_update.config(text=get_text("lbl_last_update").format(time=now.strftime("%H:%M:%S")))
+
+    def load_product_names(self):
+        name_column = "name_en" if translations.current_language == "en" else "name_es"
+        self.product_names = dict(self.tracker.conn.execute(f"SELECT id, {name_column} FROM products"))
+
+    def destroy(self):
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+        self.tracker.close()
+        super().destroy()
+
+    def update_language(self):
+        """Actualiza los textos del módulo al cambiar el idioma."""
+        self.title_label.config(text=get_text("dashboard_title"))
+        for key, label in self.stat_labels.items():
+            label.config(text=get_text(key))
+        self.lbl_top_sellers.config(text=get_text("lbl_top_sellers"))
+        self.update_headings()
+        self.product_names = {}
+        self.show_totals()
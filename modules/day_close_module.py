@@ -0,0 +1,163 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import datetime
+import queue
+import threading
+
+from config.translations import get_text
+from database import get_db_connection
+from models import Money
+from utils.day_close import CLOSE_STEPS, close_day, close_status, load_z_report, step_detail_text
+
+POLL_INTERVAL_MS = 100 # Cada cuánto se revisa el avance del cierre
+
+class DayCloseModule(ttk.Frame):
+    """
+    Cierre del día: corre los pasos de utils/day_close.py en un hilo secundario (con su propia conexión)
+    y muestra la duración de cada uno y el reporte Z resultante.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.progress_queue = queue.Queue() # El hilo del cierre deja aquí ("step"|"done"|"error", datos)
+        self.poll_job = None
+        self.running = False
+        self.step_status = {} # {paso: (estado, segundos, cifras)} de lo que muestra la tabla
+        self.z_report = None
+        self.create_widgets()
+        self.load_status()
+
+    def create_widgets(self):
+        self.title_label = ttk.Label(self, text=get_text("day_close_title"), font=("Arial", 16, "bold"))
+        self.title_label.pack(pady=10)
+
+        self.filter_frame = ttk.Frame(self)
+        self.filter_frame.pack(fill=tk.X, padx=10, pady=5)
+        self.lbl_close_day = ttk.Label(self.filter_frame, text=get_text("lbl_close_day"))
+        self.lbl_close_day.grid(row=0, column=0, sticky=tk.W, padx=5, pady=2)
+        self.day_entry = ttk.Entry(self.filter_frame, width=12)
+        self.day_entry.insert(0, datetime.date.today().isoformat())
+        self.day_entry.grid(row=0, column=1, sticky=tk.W, padx=5, pady=2)
+        self.day_entry.bind("<Return>", lambda event: self.load_status())
+        self.btn_close_day = ttk.Button(self.filter_frame, text=get_text("btn_close_day"), command=self.start_close)
+        self.btn_close_day.grid(row=0, column=2, padx=10, pady=2)
+
+        self.steps_tree = ttk.Treeview(self, columns=("step", "status", "seconds", "detail"), show="headings", height=len(CLOSE_STEPS))
+        self.steps_tree.column("step", width=200, anchor=tk.W)
+        self.steps_tree.column("status", width=110, anchor=tk.W)
+        self.steps_tree.column("seconds", width=80, anchor=tk.E)
+        self.steps_tree.column("detail", width=360, anchor=tk.W)
+        self.steps_tree.pack(fill=tk.X, padx=10, pady=5)
+
+        self.z_report_label = ttk.Label(self, text="", justify=tk.LEFT, font=("Courier", 11))
+        self.z_report_label.pack(anchor=tk.W, padx=10, pady=10)
+        self.update_headings()
+
+    def update_headings(self):
+        self.steps_tree.heading("step", text=get_text("col_close_step"))
+        self.steps_tree.heading("status", text=get_text("col_close_status"))
+        self.steps_tree.heading("seconds", text=get_text("col_close_seconds"))
+        self.steps_tree.heading("detail", text=get_text("col_close_detail"))
+
+    def get_day(self):
+        """Día del campo de fecha, o None tras avisar si no es válido."""
+        day = self.day_entry.get().strip()
+        try:
+            datetime.date.fromisoformat(day)
+        except ValueError:
+            messagebox.showwarning(get_text("msg_error"), get_text("msg_invalid_date"))
+            return None
+        return day
+
+    def load_status(self):
+        """Muestra los pasos ya hechos y el reporte Z (si existe) del día elegido."""
+        day = self.get_day()
+        if day is None or self.running:
+            return
+        conn, _ = get_db_connection()
+        self.step_status = {step: ("done", seconds, detail) for step, (seconds, detail) in close_status(conn, day).items()}
+        self.z_report = load_z_report(conn, day)
+        self.show_steps()
+
+    def show_steps(self):
+        self.steps_tree.delete(*self.steps_tree.get_children())
+        for step, _ in CLOSE_STEPS:
+            status, seconds, detail = self.step_status.get(step, ("pending", None, {}))
+            self.steps_tree.insert("", tk.END, iid=step, values=(
+                get_text(f"close_step_{step}"), get_text(f"close_status_{status}"),
+                f"{seconds:.2f}" if seconds is not None else "", step_detail_text(step, detail),
+            ))
+        self.z_report_label.config(text=self.format_z_report(self.z_report) if self.z_report else "")
+
+    def format_z_report(self, report):
+        lines = [
+            get_text("lbl_z_report").format(z_number=report["z_number"], day=report["day"]),
+            get_text("lbl_z_tickets").format(tickets=report["tickets"]),
+            get_text("lbl_z_total").format(amount=Money(report["total_amount"])),
+            get_text("lbl_z_discounts").format(amount=Money(report["discount_amount"])),
+            get_text("lbl_z_tax").format(amount=Money(report["tax_amount"])),
+        ]
+        for rate, taxable_amount, tax_amount in report["taxes"]:
+            lines.append(get_text("lbl_z_tax_rate").format(rate=rate, taxable=Money(taxable_amount), tax=Money(tax_amount)))
+        return "\n".join(lines)
+
+    def start_close(self):
+        day = self.get_day()
+        if day is None or self.running:
+            return
+        if not messagebox.askyesno(get_text("day_close_title"), get_text("msg_confirm_day_close").format(day=day)):
+            return
+
+        def worker():
+            try:
+                z_report = close_day(day, progress=lambda *step: self.progress_queue.put(("step", step)))
+                self.progress_queue.put(("done", z_report))
+            except Exception as e: # Se informa en el hilo de la interfaz
+                self.progress_queue.put(("error", e))
+
+        self.running = True
+        self.btn_close_day.state(['disabled'])
+        self.step_status = {}
+        self.show_steps()
+        threading.Thread(target=worker, daemon=True).start()
+        self.poll_job = self.after(POLL_INTERVAL_MS, self.poll_progress)
+
+    def poll_progress(self):
+        """Actualiza la tabla con el avance del cierre (desde el hilo de Tk) hasta que termina."""
+        while True:
+            try:
+                kind, data = self.progress_queue.get_nowait()
+            except queue.Empty:
+                self.poll_job = self.after(POLL_INTERVAL_MS, self.poll_progress)
+                return
+            if kind == "step":
+                step, status, seconds, detail = data
+                self.step_status[step] = (status, seconds if status != "running" else None, detail)
+                self.show_steps()
+                continue
+            self.running = False
+            self.poll_job = None
+            self.btn_close_day.state(['!disabled'])
+            if kind == "error":
+                messagebox.showerror(get_text("msg_error"), str(data))
+            else:
+                self.z_report = data
+                self.show_steps()
+                messagebox.showinfo(get_text("day_close_title"), get_text("msg_day_closed").format(
+                    day=data["day"], z_number=data["z_number"], tickets=data["tickets"]))
+            return
+
+    def destroy(self):
+        # El hilo del cierre sigue hasta terminar: cada paso queda anotado aunque se cierre el módulo
+        if self.poll_job is not None:
+            self.after_cancel(self.poll_job)
+        super().destroy()
+
+    def update_language(self):
+        """Actualiza los textos del módulo al cambiar el idioma."""
+        self.title_label.config(text=get_text("day_close_title"))
+        self.lbl_close_day.config(text=get_text("lbl_close_day"))
+        self.btn_close_day.config(text=get_text("btn_close_day"))
+        self.update_headings()
+        self.show_steps()
@@ -1,18 +1,331 @@
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox, filedialog
+import datetime
+import queue
+import threading
+
+from config.translations import get_text
+import config.translations as translations
+from models import Money
+from utils.report_queries import REPORTS, run_report, date_range_bounds
+from utils.report_jobs import PARTITIONED_REPORTS, ReportJob
+from utils.report_cache import report_cache, sales_watermark
+from utils.sales_export import export_sales
+
+PAGE_SIZE = 100 # Filas por página en el Treeview de resultados
+POLL_INTERVAL_MS = 100 # Cada cuánto se revisa si el hilo del reporte terminó
+
+# Reportes SQL (en un hilo) y reportes por tramos (en procesos, ver utils/report_jobs.py)
+REPORT_DEFINITIONS = {**REPORTS, **PARTITIONED_REPORTS}
 
 class ReportsModule(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.parent = parent
+        self.report_rows = [] # Resultado completo del último reporte (filas agregadas, importes en centavos)
+        self.report_name = None
+        self.current_page = 0
+        self.results_queue = queue.Queue() # El hilo del reporte deja aquí (request_id, filas o excepción)
+        self.request_id = 0 # Para descartar resultados de reportes que ya no se están esperando
+        self.polling = False # True mientras hay un ciclo de after() esperando resultados
+        self.export_queue = queue.Queue() # El hilo de exportación deja aquí ("progress"|"done"|"error", datos)
+        self.report_job = None # ReportJob en curso (reportes por tramos)
+        self.pending_report = None # (reporte, inicio, fin, idioma, marca de agua) del cálculo en curso, para la caché
         self.create_widgets()
 
     def create_widgets(self):
-        # Placeholder for future report widgets
-        label = ttk.Label(self, text="Reports Module - Coming Soon!")
-        label.pack(pady=20, padx=20)
+        self.title_label = ttk.Label(self, text=get_text("reports_title"), font=("Arial", 16, "bold"))
+        self.title_label.pack(pady=10)
+
+        # --- Filtros ---
+        self.filter_frame = ttk.Frame(self)
+        self.filter_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        self.lbl_report_type = ttk.Label(self.filter_frame, text=get_text("lbl_report_type"))
+        self.lbl_report_type.grid(row=0, column=0, sticky=tk.W, padx=5, pady=2)
+        self.report_names = list(REPORT_DEFINITIONS)
+        self.report_type_combo = ttk.Combobox(self.filter_frame, state="readonly", width=28,
+                                              values=[get_text(REPORT_DEFINITIONS[name]["label"]) for name in self.report_names])
+        self.report_type_combo.current(0)
+        self.report_type_combo.grid(row=0, column=1, sticky=tk.W, padx=5, pady=2)
+
+        # Por defecto, el mes en curso hasta hoy
+        today = datetime.date.today()
+        self.lbl_start_date = ttk.Label(self.filter_frame, text=get_text("lbl_start_date"))
+        self.lbl_start_date.grid(row=0, column=2, sticky=tk.W, padx=5, pady=2)
+        self.start_date_entry = ttk.Entry(self.filter_frame, width=12)
+        self.start_date_entry.insert(0, today.replace(day=1).isoformat())
+        self.start_date_entry.grid(row=0, column=3, sticky=tk.W, padx=5, pady=2)
+
+        self.lbl_end_date = ttk.Label(self.filter_frame, text=get_text("lbl_end_date"))
+        self.lbl_end_date.grid(row=0, column=4, sticky=tk.W, padx=5, pady=2)
+        self.end_date_entry = ttk.Entry(self.filter_frame, width=12)
+        self.end_date_entry.insert(0, today.isoformat())
+        self.end_date_entry.grid(row=0, column=5, sticky=tk.W, padx=5, pady=2)
+
+        self.btn_generate = ttk.Button(self.filter_frame, text=get_text("btn_generate_report"), command=self.generate_report)
+        self.btn_generate.grid(row=0, column=6, padx=10, pady=2)
+        self.btn_cancel_report = ttk.Button(self.filter_frame, text=get_text("btn_cancel"), command=self.cancel_report)
+        self.btn_cancel_report.grid(row=0, column=7, padx=5, pady=2)
+        self.btn_cancel_report.state(['disabled'])
+        self.btn_export = ttk.Button(self.filter_frame, text=get_text("btn_export_sales"), command=self.export_sales_to_file)
+        self.btn_export.grid(row=0, column=8, padx=5, pady=2)
+
+        # --- Resultados ---
+        self.results_frame = ttk.Frame(self)
+        self.results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.results_tree = ttk.Treeview(self.results_frame, show="headings")
+        self.results_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        results_scrollbar = ttk.Scrollbar(self.results_frame, orient="vertical", command=self.results_tree.yview)
+        results_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.results_tree.configure(yscrollcommand=results_scrollbar.set)
+
+        # --- Paginación y totales ---
+        self.footer_frame = ttk.Frame(self)
+        self.footer_frame.pack(fill=tk.X, padx=10, pady=5)
+        self.btn_previous_page = ttk.Button(self.footer_frame, text=get_text("btn_previous_page"), command=lambda: self.show_page(self.current_page - 1))
+        self.btn_previous_page.pack(side=tk.LEFT, padx=2)
+        self.lbl_page = ttk.Label(self.footer_frame, text="")
+        self.lbl_page.pack(side=tk.LEFT, padx=5)
+        self.btn_next_page = ttk.Button(self.footer_frame, text=get_text("btn_next_page"), command=lambda: self.show_page(self.current_page + 1))
+        self.btn_next_page.pack(side=tk.LEFT, padx=2)
+        self.lbl_status = ttk.Label(self.footer_frame, text="")
+        self.lbl_status.pack(side=tk.LEFT, padx=10)
+
+        self.lbl_total_sales_amount = ttk.Label(self.footer_frame, text="", font=("Arial", 12, "bold"))
+        self.lbl_total_sales_amount.pack(side=tk.RIGHT, padx=5)
+        self.lbl_total_sales = ttk.Label(self.footer_frame, text=get_text("lbl_total_sales"), font=("Arial", 12, "bold"))
+        self.lbl_total_sales.pack(side=tk.RIGHT, padx=5)
+
+        self.update_paging_controls()
+
+    def get_date_range(self):
+        """Retorna (fecha_inicio, fecha_fin) de los filtros, o None tras avisar si no son válidas."""
+        start_date = self.start_date_entry.get().strip()
+        end_date = self.end_date_entry.get().strip()
+        try:
+            datetime.date.fromisoformat(start_date)
+            datetime.date.fromisoformat(end_date)
+        except ValueError:
+            messagebox.showwarning(get_text("msg_error"), get_text("msg_invalid_date"))
+            return None
+        try:
+            date_range_bounds(start_date, end_date)
+        except ValueError:
+            messagebox.showwarning(get_text("msg_error"), get_text("msg_invalid_date_range"))
+            return None
+        return start_date, end_date
+
+    def generate_report(self):
+        """Valida los filtros y lanza la consulta en un hilo secundario para no bloquear la interfaz."""
+        date_range = self.get_date_range()
+        if date_range is None:
+            return
+        start_date, end_date = date_range
+
+        report_name = self.report_names[self.report_type_combo.current()]
+        lang = translations.current_language
+        rows = report_cache.get(report_name, start_date, end_date, lang)
+        if rows is not None: # Mismo reporte sin ventas nuevas en su rango: no se vuelve a calcular
+            self.show_report(report_name, rows)
+            if not rows:
+                messagebox.showinfo(get_text("reports_title"), get_text("msg_no_sales_found"))
+            return
+        # La marca de agua se toma antes de calcular: las ventas que entren durante el cálculo invalidan la entrada
+        self.pending_report = (report_name, start_date, end_date, lang, sales_watermark())
+        if report_name in PARTITIONED_REPORTS:
+            self.start_report_job(report_name, start_date, end_date)
+            return
+        self.request_id += 1
+        request_id = self.request_id
+
+        def worker():
+            try:
+                rows = run_report(report_name, start_date, end_date, lang)
+            except Exception as e: # Se informa en el hilo de la interfaz
+                rows = e
+            self.results_queue.put((request_id, report_name, rows))
+
+        self.btn_generate.state(['disabled'])
+        self.lbl_status.config(text=get_text("msg_report_running"))
+        threading.Thread(target=worker, daemon=True).start()
+        if not self.polling:
+            self.polling = True
+            self.after(POLL_INTERVAL_MS, self.poll_report_results)
+
+    def poll_report_results(self):
+        """Revisa (desde el hilo de Tk) si el reporte terminó; si no, vuelve a programarse."""
+        try:
+            request_id, report_name, rows = self.results_queue.get_nowait()
+        except queue.Empty:
+            self.after(POLL_INTERVAL_MS, self.poll_report_results)
+            return
+        if request_id != self.request_id:
+            self.after(POLL_INTERVAL_MS, self.poll_report_results) # Resultado viejo, seguir esperando el actual
+            return
+
+        self.polling = False
+        self.btn_generate.state(['!disabled'])
+        self.lbl_status.config(text="")
+        if isinstance(rows, Exception):
+            messagebox.showerror(get_text("msg_error"), str(rows))
+            return
+        report_cache.put(*self.pending_report, rows)
+        self.show_report(report_name, rows)
+        if not rows:
+            messagebox.showinfo(get_text("reports_title"), get_text("msg_no_sales_found"))
+
+    def start_report_job(self, report_name, start_date, end_date):
+        """Lanza un reporte por tramos en procesos separados; se puede cancelar mientras corre."""
+        self.report_job = ReportJob(report_name, start_date, end_date, translations.current_language).start()
+        self.btn_generate.state(['disabled'])
+        self.btn_cancel_report.state(['!disabled'])
+        self.lbl_status.config(text=get_text("msg_report_running"))
+        self.after(POLL_INTERVAL_MS, self.poll_report_job, self.report_job)
+
+    def poll_report_job(self, job):
+        """Muestra el avance del reporte por tramos (desde el hilo de Tk) hasta que termina."""
+        if job is not self.report_job:
+            return # Cancelado
+        while True:
+            try:
+                kind, data = job.events.get_nowait()
+            except queue.Empty:
+                self.after(POLL_INTERVAL_MS, self.poll_report_job, job)
+                return
+            if kind == "progress":
+                self.lbl_status.config(text=get_text("msg_report_progress").format(done=data[0], total=data[1]))
+                continue
+            self.report_job = None
+            self.btn_generate.state(['!disabled'])
+            self.btn_cancel_report.state(['disabled'])
+            self.lbl_status.config(text="")
+            if kind == "error":
+                messagebox.showerror(get_text("msg_error"), str(data))
+                return
+            report_cache.put(*self.pending_report, data)
+            self.show_report(job.report_name, data)
+            if not data:
+                messagebox.showinfo(get_text("reports_title"), get_text("msg_no_sales_found"))
+            return
+
+    def cancel_report(self):
+        """Cancela el reporte por tramos en curso: descarta los tramos pendientes e interrumpe los que corren."""
+        if self.report_job is None:
+            return
+        self.report_job.cancel()
+        self.report_job = None
+        self.btn_generate.state(['!disabled'])
+        self.btn_cancel_report.state(['disabled'])
+        self.lbl_status.config(text=get_text("msg_report_cancelled"))
+
+    def destroy(self):
+        # Al cambiar de módulo no deben quedar procesos calculando un reporte que nadie va a ver
+        if self.report_job is not None:
+            self.report_job.cancel()
+        super().destroy()
+
+    def export_sales_to_file(self):
+        """Exporta las ventas del rango a un archivo .jsonl.gz o .csv.gz en un hilo secundario."""
+        date_range = self.get_date_range()
+        if date_range is None:
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".jsonl.gz",
+            filetypes=[("JSON Lines (gzip)", "*.jsonl.gz"), ("CSV (gzip)", "*.csv.gz")],
+            initialfile=f"ventas_{date_range[0]}_{date_range[1]}.jsonl.gz",
+        )
+        if not path:
+            return
+        lang = translations.current_language
+
+        def worker():
+            try:
+                count = export_sales(path, *date_range, lang=lang,
+                                     progress=lambda done, total: self.export_queue.put(("progress", (done, total))))
+                self.export_queue.put(("done", (count, path)))
+            except Exception as e: # Se informa en el hilo de la interfaz
+                self.export_queue.put(("error", e))
+
+        self.btn_export.state(['disabled'])
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(POLL_INTERVAL_MS, self.poll_export_progress)
+
+    def poll_export_progress(self):
+        """Muestra el avance de la exportación (desde el hilo de Tk) hasta que termina."""
+        while True:
+            try:
+                kind, data = self.export_queue.get_nowait()
+            except queue.Empty:
+                self.after(POLL_INTERVAL_MS, self.poll_export_progress)
+                return
+            if kind == "progress":
+                self.lbl_status.config(text=get_text("msg_export_progress").format(done=data[0], total=data[1]))
+                continue
+            self.btn_export.state(['!disabled'])
+            self.lbl_status.config(text="")
+            if kind == "error":
+                messagebox.showerror(get_text("msg_error"), str(data))
+            else:
+                messagebox.showinfo(get_text("reports_title"), get_text("msg_export_done").format(count=data[0], path=data[1]))
+            return
+
+    def show_report(self, report_name, rows):
+        """Configura las columnas del Treeview para el reporte y muestra la primera página."""
+        self.report_name = report_name
+        self.report_rows = rows
+        columns = REPORT_DEFINITIONS[report_name]["columns"]
+        column_ids = [f"col{index}" for index in range(len(columns))]
+        self.results_tree.delete(*self.results_tree.get_children())
+        self.results_tree.configure(columns=column_ids)
+        for column_id, (title_key, kind) in zip(column_ids, columns):
+            self.results_tree.heading(column_id, text=get_text(title_key))
+            self.results_tree.column(column_id, anchor=tk.W if kind == "text" else tk.E, width=150 if kind == "text" else 100)
+
+        # El total del reporte es la suma de su última columna de importes
+        money_indexes = [index for index, (_, kind) in enumerate(columns) if kind == "money"]
+        total = sum(row[money_indexes[-1]] or 0 for row in rows) if money_indexes else 0
+        self.lbl_total_sales_amount.config(text=f"{Money(total)}")
+        self.show_page(0)
+
+    def show_page(self, page):
+        """Inserta en el Treeview solo las filas de la página pedida."""
+        page_count = self.get_page_count()
+        if not 0 <= page < page_count:
+            return
+        self.current_page = page
+        self.results_tree.delete(*self.results_tree.get_children())
+        kinds = [kind for _, kind in REPORT_DEFINITIONS[self.report_name]["columns"]]
+        for row in self.report_rows[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]:
+            values = [f"{Money(value or 0)}" if kind == "money" else value for value, kind in zip(row, kinds)]
+            self.results_tree.insert("", tk.END, values=values)
+        self.update_paging_controls()
+
+    def get_page_count(self):
+        return max(1, (len(self.report_rows) + PAGE_SIZE - 1) // PAGE_SIZE)
+
+    def update_paging_controls(self):
+        page_count = self.get_page_count()
+        self.lbl_page.config(text=get_text("lbl_page").format(page=self.current_page + 1, pages=page_count))
+        self.btn_previous_page.state(['!disabled'] if self.current_page > 0 else ['disabled'])
+        self.btn_next_page.state(['!disabled'] if self.current_page < page_count - 1 else ['disabled'])
 
     def update_language(self):
-        # This method will be called when the language changes
-        # You'll update text elements here later
-        pass
\ No newline at end of file
+        """Actualiza los textos del módulo al cambiar el idioma."""
+        self.title_label.config(text=get_text("reports_title"))
+        self.lbl_report_type.config(text=get_text("lbl_report_type"))
+        selected = self.report_type_combo.current()
+        self.report_type_combo.config(values=[get_text(REPORT_DEFINITIONS[name]["label"]) for name in self.report_names])
+        self.report_type_combo.current(selected)
+        self.lbl_start_date.config(text=get_text("lbl_start_date"))
+        self.lbl_end_date.config(text=get_text("lbl_end_date"))
+        self.btn_generate.config(text=get_text("btn_generate_report"))
+        self.btn_cancel_report.config(text=get_text("btn_cancel"))
+        self.btn_export.config(text=get_text("btn_export_sales"))
+        self.btn_previous_page.config(text=get_text("btn_previous_page"))
+        self.btn_next_page.config(text=get_text("btn_next_page"))
+        self.lbl_total_sales.config(text=get_text("lbl_total_sales"))
+        if self.report_name:
+            for column_id, (title_key, _) in zip(self.results_tree["columns"], REPORT_DEFINITIONS[self.report_name]["columns"]):
+                self.results_tree.heading(column_id, text=get_text(title_key))
+        self.update_paging_controls()
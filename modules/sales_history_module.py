@@ -0,0 +1,255 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import datetime
+import queue
+import threading
+
+from config.translations import get_text
+import config.translations as translations
+from models import Sale, Money
+from utils.report_queries import date_range_bounds
+from utils.sales_history import SalesHistoryPager
+
+OVERSCAN_ROWS = 5 # Filas extra insertadas debajo de las visibles
+WHEEL_ROWS = 3 # Filas que avanza cada paso de la rueda del ratón
+POLL_INTERVAL_MS = 100
+DEFAULT_ROW_HEIGHT = 25 # Debe coincidir con el rowheight del estilo Treeview de main.py
+
+class SalesHistoryModule(ttk.Frame):
+    """
+    Lista de ventas pasadas con scroll virtual: el Treeview solo contiene las filas visibles
+    (más unas pocas de margen) y la barra de desplazamiento representa el total de ventas del rango.
+    Al desplazarse se vuelven a pedir al SalesHistoryPager las filas de la nueva posición.
+    Las líneas de cada venta se cargan al expandirla.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.parent = parent
+        self.pager = None
+        self.offset = 0 # Posición (en el rango filtrado) de la primera venta visible
+        self.visible_rows = 20 # Se recalcula al cambiar el tamaño del Treeview
+        self.expanded_sales = {} # {sale_id: [(texto, valores)]} líneas ya cargadas de las ventas abiertas
+        self.results_queue = queue.Queue()
+        self.request_id = 0
+        self.create_widgets()
+        self.search()
+
+    def create_widgets(self):
+        self.title_label = ttk.Label(self, text=get_text("sales_history_title"), font=("Arial", 16, "bold"))
+        self.title_label.pack(pady=10)
+
+        # --- Filtros ---
+        self.filter_frame = ttk.Frame(self)
+        self.filter_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        today = datetime.date.today()
+        self.lbl_start_date = ttk.Label(self.filter_frame, text=get_text("lbl_start_date"))
+        self.lbl_start_date.grid(row=0, column=0, sticky=tk.W, padx=5, pady=2)
+        self.start_date_entry = ttk.Entry(self.filter_frame, width=12)
+        self.start_date_entry.insert(0, today.replace(day=1).isoformat())
+        self.start_date_entry.grid(row=0, column=1, sticky=tk.W, padx=5, pady=2)
+
+        self.lbl_end_date = ttk.Label(self.filter_frame, text=get_text("lbl_end_date"))
+        self.lbl_end_date.grid(row=0, column=2, sticky=tk.W, padx=5, pady=2)
+        self.end_date_entry = ttk.Entry(self.filter_frame, width=12)
+        self.end_date_entry.insert(0, today.isoformat())
+        self.end_date_entry.grid(row=0, column=3, sticky=tk.W, padx=5, pady=2)
+
+        self.btn_search = ttk.Button(self.filter_frame, text=get_text("btn_search"), command=self.search)
+        self.btn_search.grid(row=0, column=4, padx=10, pady=2)
+        self.lbl_count = ttk.Label(self.filter_frame, text="")
+        self.lbl_count.grid(row=0, column=5, sticky=tk.W, padx=5, pady=2)
+
+        # --- Lista de ventas ---
+        self.tree_frame = ttk.Frame(self)
+        self.tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.sales_tree = ttk.Treeview(self.tree_frame, columns=("date", "lines", "tax", "total"), show="tree headings")
+        self.sales_tree.column("#0", width=260, anchor=tk.W)
+        self.sales_tree.column("date", width=160, anchor=tk.W)
+        self.sales_tree.column("lines", width=80, anchor=tk.E)
+        self.sales_tree.column("tax", width=100, anchor=tk.E)
+        self.sales_tree.column("total", width=100, anchor=tk.E)
+        self.update_headings()
+        self.sales_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # La barra no se conecta al yview del Treeview: representa la posición en todo el rango
+        self.scrollbar = ttk.Scrollbar(self.tree_frame, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.sales_tree.bind("<Configure>", self.on_tree_resize)
+        self.sales_tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.sales_tree.bind("<Button-4>", lambda e: self.scroll_to(self.offset - WHEEL_ROWS)) # Linux
+        self.sales_tree.bind("<Button-5>", lambda e: self.scroll_to(self.offset + WHEEL_ROWS))
+        self.sales_tree.bind("<Prior>", lambda e: self.scroll_to(self.offset - self.visible_rows))
+        self.sales_tree.bind("<Next>", lambda e: self.scroll_to(self.offset + self.visible_rows))
+        self.sales_tree.bind("<<TreeviewOpen>>", self.on_sale_open)
+        self.sales_tree.bind("<<TreeviewClose>>", self.on_sale_close)
+
+    def update_headings(self):
+        self.sales_tree.heading("#0", text=get_text("report_col_sale_id"))
+        self.sales_tree.heading("date", text=get_text("report_col_date"))
+        self.sales_tree.heading("lines", text=get_text("report_col_lines"))
+        self.sales_tree.heading("tax", text=get_text("report_col_tax"))
+        self.sales_tree.heading("total", text=get_text("report_col_total"))
+
+    def search(self):
+        """Valida el rango y prepara el paginador en un hilo secundario (contar un año de tickets tarda)."""
+        start_date = self.start_date_entry.get().strip()
+        end_date = self.end_date_entry.get().strip()
+        try:
+            datetime.date.fromisoformat(start_date)
+            datetime.date.fromisoformat(end_date)
+            date_range_bounds(start_date, end_date)
+        except ValueError:
+            messagebox.showwarning(get_text("msg_error"), get_text("msg_invalid_date_range"))
+            return
+
+        self.request_id += 1
+        request_id = self.request_id
+
+        def worker():
+            try:
+                result = SalesHistoryPager.open(start_date, end_date)
+            except Exception as e: # Se informa en el hilo de la interfaz
+                result = e
+            self.results_queue.put((request_id, result))
+
+        self.lbl_count.config(text=get_text("msg_loading"))
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(POLL_INTERVAL_MS, self.poll_pager)
+
+    def poll_pager(self):
+        try:
+            request_id, result = self.results_queue.get_nowait()
+        except queue.Empty:
+            self.after(POLL_INTERVAL_MS, self.poll_pager)
+            return
+        if request_id != self.request_id:
+            if not isinstance(result, Exception):
+                result.close()
+            return # Hay una búsqueda más reciente con su propio ciclo de espera
+        if isinstance(result, Exception):
+            self.lbl_count.config(text="")
+            messagebox.showerror(get_text("msg_error"), str(result))
+            return
+        if self.pager is not None:
+            self.pager.close()
+        self.pager = result
+        self.offset = 0
+        self.expanded_sales = {}
+        self.lbl_count.config(text=get_text("lbl_sales_count").format(count=len(self.pager)))
+        self.render()
+
+    # --- Scroll virtual ---
+
+    def on_tree_resize(self, event):
+        style = ttk.Style(self)
+        row_height = int(style.lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT)
+        visible_rows = max(1, (event.height - row_height) // row_height) # Menos la fila de encabezados
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.scroll_to(self.offset, force=True)
+
+    def on_mouse_wheel(self, event):
+        # Windows envía múltiplos de 120; macOS, pasos pequeños
+        steps = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_to(self.offset - steps * WHEEL_ROWS)
+        return "break"
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if self.pager is None:
+            return
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.pager)))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def scroll_to(self, offset, force=False):
+        if self.pager is None:
+            return
+        offset = max(0, min(offset, len(self.pager) - self.visible_rows))
+        if offset != self.offset or force:
+            self.offset = offset
+            self.render()
+
+    def render(self):
+        """Reemplaza el contenido del Treeview por las ventas de la posición actual."""
+        selection = self.sales_tree.selection()
+        self.sales_tree.delete(*self.sales_tree.get_children())
+        rows = self.pager.get_rows(self.offset, self.visible_rows + OVERSCAN_ROWS) if self.pager else []
+        for sale_id, sale_date, line_count, tax_amount, total_amount in rows:
+            iid = f"sale-{sale_id}"
+            expanded = sale_id in self.expanded_sales
+            self.sales_tree.insert("", tk.END, iid=iid, text=f"#{sale_id}", open=expanded,
+                                   values=(sale_date, line_count, f"{Money(tax_amount)}", f"{Money(total_amount)}"))
+            if expanded:
+                self.insert_sale_lines(iid, self.expanded_sales[sale_id])
+            elif line_count:
+                # Hijo provisional para que se vea el botón de expandir; las líneas se cargan al abrir
+                self.sales_tree.insert(iid, tk.END, iid=f"{iid}-placeholder", text=get_text("msg_loading"))
+        self.sales_tree.selection_set([iid for iid in selection if self.sales_tree.exists(iid)])
+
+        total = len(self.pager) if self.pager else 0
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # --- Líneas de venta (carga diferida) ---
+
+    def on_sale_open(self, event):
+        iid = self.sales_tree.focus()
+        if not iid.startswith("sale-") or iid.endswith("-placeholder"):
+            return
+        sale_id = int(iid.split("-")[1])
+        if sale_id in self.expanded_sales:
+            return
+        sale = Sale.load_full(sale_id, conn=self.pager.conn)
+        lines = self.build_sale_lines(sale) if sale else []
+        self.expanded_sales[sale_id] = lines
+        self.sales_tree.delete(*self.sales_tree.get_children(iid))
+        self.insert_sale_lines(iid, lines)
+
+    def on_sale_close(self, event):
+        iid = self.sales_tree.focus()
+        if iid.startswith("sale-") and not iid.endswith("-placeholder"):
+            self.expanded_sales.pop(int(iid.split("-")[1]), None)
+
+    def build_sale_lines(self, sale):
+        """Texto y valores de cada línea de una venta cargada con Sale.load_full()."""
+        name_field = "name_en" if translations.current_language == "en" else "name_es"
+        lines = []
+        for item in sale.get_items():
+            product, variant = item.get_product(), item.get_variant()
+            name = getattr(product, name_field) if product else f"#{item.product_id}"
+            if variant:
+                name += f" ({getattr(variant, name_field)})"
+            modifiers = item.get_modifiers()
+            if modifiers:
+                name += " + " + ", ".join(f"{modifier[name_field]} x{modifier['quantity']}" for modifier in modifiers)
+            unit_price = item.price_at_sale + sum((modifier["price"] * modifier["quantity"] for modifier in modifiers), Money(0))
+            line_total = unit_price * item.quantity - item.discount_amount
+            lines.append((name, ("", item.quantity, "", f"{line_total}")))
+        return lines
+
+    def insert_sale_lines(self, parent_iid, lines):
+        for index, (text, values) in enumerate(lines):
+            self.sales_tree.insert(parent_iid, tk.END, iid=f"{parent_iid}-line-{index}", text=text, values=values)
+
+    def destroy(self):
+        if self.pager is not None:
+            self.pager.close() # Separa los meses archivados y cierra la conexión del pager
+        super().destroy()
+
+    def update_language(self):
+        """Actualiza los textos del módulo al cambiar el idioma."""
+        self.title_label.config(text=get_text("sales_history_title"))
+        self.lbl_start_date.config(text=get_text("lbl_start_date"))
+        self.lbl_end_date.config(text=get_text("lbl_end_date"))
+        self.btn_search.config(text=get_text("btn_search"))
+        self.update_headings()
+        if self.pager is not None:
+            self.lbl_count.config(text=get_text("lbl_sales_count").format(count=len(self.pager)))
+        self.expanded_sales = {} # Los nombres de las líneas abiertas dependen del idioma
+        self.render()
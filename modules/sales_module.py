@@ -7,7 +7,10 @@ import os
 import shutil # Para copiar imágenes
 
 from config.translations import get_text, set_language, current_language
-from models import Category, Product, Variant, Modifier, Sale, SaleItem, SaleItemModifier
+from models import Category, Product, Variant, Modifier, Money
+from utils.order_cart import OrderCart
+from utils.pricing import PricingEngine
+from utils.tax import TaxTable
 
 # Directorio donde se guardarán las imágenes de productos
 IMAGE_DIR = "assets/product_images"
@@ -16,7 +19,8 @@ class SalesModule(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.parent = parent
-        self.current_order_items = [] # Lista para almacenar los ítems del pedido actual
+        self.cart = OrderCart() # Pedido actual (líneas con id estable y total incremental)
+        self.rendered_rows = {} # {iid: values} de las filas actualmente dibujadas en order_tree
         self.selected_product = None # Almacena el objeto Product seleccionado
         self.selected_variant = None # Almacena el objeto Variant seleccionado
         self.selected_modifiers = {} # {modifier_id: quantity}
@@ -131,6 +135,20 @@ class SalesModule(ttk.Frame):
         self.lbl_total_amount = ttk.Label(self.total_frame, text="0.00", font=("Arial", 12, "bold"))
         self.lbl_total_amount.pack(side=tk.RIGHT, padx=5)
 
+        self.discount_frame = ttk.Frame(self.order_summary_frame)
+        self.discount_frame.pack(fill=tk.X, before=self.total_frame)
+        self.lbl_discount = ttk.Label(self.discount_frame, text=get_text("lbl_discount"))
+        self.lbl_discount.pack(side=tk.LEFT, padx=5)
+        self.lbl_discount_amount = ttk.Label(self.discount_frame, text="0.00")
+        self.lbl_discount_amount.pack(side=tk.RIGHT, padx=5)
+
+        self.tax_frame = ttk.Frame(self.order_summary_frame)
+        self.tax_frame.pack(fill=tk.X, before=self.total_frame)
+        self.lbl_tax = ttk.Label(self.tax_frame, text=get_text("lbl_tax"))
+        self.lbl_tax.pack(side=tk.LEFT, padx=5)
+        self.lbl_tax_amount = ttk.Label(self.tax_frame, text="0.00")
+        self.lbl_tax_amount.pack(side=tk.RIGHT, padx=5)
+
         self.checkout_buttons_frame = ttk.Frame(self.order_summary_frame)
         self.checkout_buttons_frame.pack(fill=tk.X, pady=5)
 
@@ -267,87 +285,75 @@ class SalesModule(ttk.Frame):
             messagebox.showwarning(get_text("msg_error"), get_text("msg_invalid_quantity"))
             return
 
-        # Calcular el precio base del ítem (producto + variante si aplica)
-        item_base_price = self.selected_product.base_price
-        if self.selected_variant:
-            item_base_price += self.selected_variant.price_adjustment
-
-        # Crear un diccionario para el ítem del pedido
-        order_item = {
-            "product": self.selected_product,
-            "variant": self.selected_variant,
-            "modifiers": [], # Almacenará {modifier_obj, quantity_selected}
-            "quantity": quantity,
-            "price_at_sale": item_base_price, # Este será el precio unitario del producto/variante
-        }
-
-        # Añadir modificadores seleccionados y ajustar el precio total del ítem
+        # Modificadores seleccionados como (modifier_obj, cantidad por unidad del ítem)
+        modifiers = []
         for mod_id, mod_qty in self.selected_modifiers.items():
             modifier_obj = Modifier.get_by_id(mod_id)
             if modifier_obj:
-                order_item["modifiers"].append({"modifier": modifier_obj, "quantity": mod_qty})
-                # El precio del modificador se suma al precio_at_sale por cada unidad de modificador
-                order_item["price_at_sale"] += (modifier_obj.price * mod_qty)
+                modifiers.append((modifier_obj, mod_qty))
 
-        self.current_order_items.append(order_item)
+        self.cart.add_item(self.selected_product, self.selected_variant, modifiers, quantity)
         self.update_order_summary()
         self.clear_current_selection() # Limpia la selección después de añadir al pedido
 
-    def update_order_summary(self):
-        # Limpiar el Treeview del pedido
-        self.order_tree.delete(*self.order_tree.get_children())
-        total_amount = 0.0
-
-        for item_data in self.current_order_items:
-            product_name = item_data["product"].get_localized_name(current_language)
-            variant_name = item_data["variant"].get_localized_name(current_language) if item_data["variant"] else ""
-
-            display_name = product_name
-            if variant_name:
-                display_name += f" ({variant_name})"
-
-            item_unit_price = item_data["product"].base_price
-            if item_data["variant"]:
-                item_unit_price += item_data["variant"].price_adjustment
-
-            item_total = (item_unit_price * item_data["quantity"])
-
-            # Insertar el producto/variante principal
-            parent_iid = self.order_tree.insert("", tk.END, values=(
-                display_name,
-                item_data["quantity"],
-                f"{item_unit_price:.2f}",
-                f"{item_total:.2f}"
-            ))
-
-            # Insertar los modificadores como ítems secundarios
-            for mod_info in item_data["modifiers"]:
-                modifier_obj = mod_info["modifier"]
-                mod_qty = mod_info["quantity"]
-                mod_price_at_sale = modifier_obj.price # El precio del modificador individual
-                mod_total = mod_price_at_sale * mod_qty # El total para este modificador * su cantidad
-                
-                # Sumar el total de los modificadores al total del item
-                item_total += mod_total
-
-                self.order_tree.insert(parent_iid, tk.END, values=(
-                    f"  + {modifier_obj.get_localized_name(current_language)}",
-                    mod_qty,
-                    f"{mod_price_at_sale:.2f}",
-                    f"{mod_total:.2f}"
-                ))
-
-            # Actualizar el total de la fila principal con los modificadores
-            self.order_tree.item(parent_iid, values=(
-                display_name,
-                item_data["quantity"],
-                f"{item_unit_price:.2f}", # Precio unitario del producto/variante sin modificadores
-                f"{item_total:.2f}" # Total del item CON modificadores
-            ))
-            
-            total_amount += item_total # Sumar el total de este item (con modificadores) al total general
-
-        self.lbl_total_amount.config(text=f"{total_amount:.2f}")
+    def build_order_rows(self, line):
+        """
+        Construye las filas de order_tree para una línea del pedido (OrderLine).
+        Retorna una lista de tuplas (iid, parent_iid, values), con el producto primero y sus modificadores después.
+        """
+        line_iid = f"line-{line.line_id}"
+        display_name = line.product.get_localized_name(current_language)
+        if line.variant:
+            display_name += f" ({line.variant.get_localized_name(current_language)})"
+
+        rows = [(line_iid, "", (
+            display_name,
+            line.quantity,
+            f"{Money(line.unit_price)}", # Precio unitario del producto/variante sin modificadores
+            f"{Money(line.line_total)}" # Total del item CON modificadores
+        ))]
+
+        # Los modificadores se muestran como ítems secundarios
+        for modifier_obj, mod_qty in line.modifiers:
+            rows.append((f"{line_iid}-mod-{modifier_obj.id}", line_iid, (
+                f"  + {modifier_obj.get_localized_name(current_language)}",
+                mod_qty,
+                f"{modifier_obj.price:.2f}",
+                f"{modifier_obj.price * mod_qty * line.quantity:.2f}"
+            )))
+        return rows
+
+    def update_order_summary(self, refresh_all=False):
+        """
+        Sincroniza order_tree con el pedido (self.cart) tocando solo las filas que cambiaron.
+        Las filas se identifican por el line_id estable de cada línea, así que añadir o quitar
+        un ítem no obliga a borrar y volver a insertar el resto del pedido.
+        Con refresh_all=True se reescriben todas las filas (p. ej. tras cambiar el idioma).
+        """
+        if refresh_all:
+            self.rendered_rows = {iid: None for iid in self.rendered_rows}
+
+        wanted_iids = set()
+        for line in self.cart:
+            for iid, parent_iid, values in self.build_order_rows(line):
+                wanted_iids.add(iid)
+                if iid not in self.rendered_rows:
+                    self.order_tree.insert(parent_iid, tk.END, iid=iid, values=values)
+                elif self.rendered_rows[iid] != values:
+                    self.order_tree.item(iid, values=values)
+                self.rendered_rows[iid] = values
+
+        # Quitar las filas que ya no existen (al borrar un padre, Tk borra también sus hijos)
+        for iid in [iid for iid in self.rendered_rows if iid not in wanted_iids]:
+            if self.order_tree.exists(iid):
+                self.order_tree.delete(iid)
+            del self.rendered_rows[iid]
+
+        self.cart.apply_pricing(PricingEngine.load()) # Los descuentos dependen del pedido completo; reglas en caché
+        self.cart.apply_taxes(TaxTable.load()) # En caché; se recarga sola si se editaron tasas, productos o categorías
+        self.lbl_discount_amount.config(text=f"-{Money(self.cart.discount)}")
+        self.lbl_tax_amount.config(text=f"{Money(self.cart.tax_amount)}")
+        self.lbl_total_amount.config(text=f"{Money(self.cart.total)}")
 
         # Habilitar/deshabilitar botón de eliminar si hay elementos seleccionados
         if self.order_tree.selection():
@@ -381,82 +387,33 @@ class SalesModule(ttk.Frame):
         else: # Si no tiene padre, es un item principal (producto/variante)
             item_to_remove_iid = selected_item_iid
         
-        # Obtener el índice del ítem a eliminar en current_order_items
-        # El IID de los ítems principales del pedido es el índice en current_order_items
-        try:
-            item_index = self.order_tree.index(item_to_remove_iid)
-            if 0 <= item_index < len(self.current_order_items):
-                del self.current_order_items[item_index]
-                self.update_order_summary()
-            else:
-                # Esto no debería ocurrir si la lógica del IID es correcta
-                messagebox.showerror(get_text("msg_error"), get_text("msg_item_not_found"))
-        except tk.TclError:
-            # Esto puede pasar si el IID no existe (ej. ya fue eliminado)
+        # El IID de los ítems principales del pedido es "line-<line_id>"
+        line_id = int(item_to_remove_iid.split("-")[1])
+        if self.cart.remove_line(line_id) is None:
+            # Esto no debería ocurrir si la lógica del IID es correcta
             messagebox.showerror(get_text("msg_error"), get_text("msg_item_not_found"))
+            return
+        self.update_order_summary()
 
 
     def process_checkout(self):
-        if not self.current_order_items:
+        if not self.cart:
             messagebox.showwarning(get_text("msg_error"), get_text("msg_no_items_in_order"))
             return
 
-        total_amount = float(self.lbl_total_amount.cget("text"))
-
-        # Crear la venta
-        sale = Sale(total_amount=total_amount)
-        if not sale.save():
+        # Re-evaluar las reglas por si cambió la franja horaria (happy hour) desde el último cambio
+        self.cart.apply_pricing(PricingEngine.load())
+        self.cart.apply_taxes(TaxTable.load())
+        # La venta se guarda directamente desde el pedido (total, ítems y modificadores)
+        if self.cart.save_sale() is None:
             messagebox.showerror(get_text("msg_error"), get_text("msg_save_failed") + " (Venta)")
             return
 
-        sale_id = sale.id
-
-        # Guardar cada SaleItem y sus SaleItemModifiers
-        for item_data in self.current_order_items:
-            product_id = item_data["product"].id
-            variant_id = item_data["variant"].id if item_data["variant"] else None
-            quantity = item_data["quantity"]
-            # El price_at_sale en SaleItem es el precio unitario del producto/variante sin modificadores
-            # Los modificadores se guardan por separado
-            item_base_price = item_data["product"].base_price
-            if item_data["variant"]:
-                item_base_price += item_data["variant"].price_adjustment
-
-            sale_item = SaleItem(
-                sale_id=sale_id,
-                product_id=product_id,
-                variant_id=variant_id,
-                quantity=quantity,
-                price_at_sale=item_base_price # Precio base del item (prod+var)
-            )
-            if not sale_item.save():
-                messagebox.showerror(get_text("msg_error"), get_text("msg_save_failed") + f" (Item de venta para {item_data['product'].get_localized_name(current_language)})")
-                # Considerar rollback de la venta si un item falla
-                return
-
-            sale_item_id = sale_item.id
-
-            # Guardar los modificadores del SaleItem
-            for mod_info in item_data["modifiers"]:
-                modifier_obj = mod_info["modifier"]
-                mod_qty = mod_info["quantity"]
-                
-                sale_item_modifier = SaleItemModifier(
-                    sale_item_id=sale_item_id,
-                    modifier_id=modifier_obj.id,
-                    quantity=mod_qty,
-                    price_at_sale=modifier_obj.price # Precio del modificador en el momento de la venta
-                )
-                if not sale_item_modifier.save():
-                    messagebox.showerror(get_text("msg_error"), get_text("msg_save_failed") + f" (Modificador {modifier_obj.get_localized_name(current_language)})")
-                    # Considerar rollback
-                    return
-        
         messagebox.showinfo(get_text("msg_success"), get_text("msg_sale_successful"))
         self.clear_order() # Limpiar el pedido después de una venta exitosa
 
     def clear_order(self):
-        self.current_order_items = []
+        self.cart.clear()
         self.update_order_summary()
         self.clear_current_selection()
 
@@ -543,6 +500,8 @@ class SalesModule(ttk.Frame):
         
         # Actualizar el texto del total (la cantidad ya está en el label, solo el prefijo)
         self.total_frame.winfo_children()[0].config(text=get_text("lbl_total")) # Asumiendo que el label del total es el primer hijo
+        self.lbl_discount.config(text=get_text("lbl_discount"))
+        self.lbl_tax.config(text=get_text("lbl_tax"))
 
         self.btn_checkout.config(text=get_text("btn_checkout"))
         self.btn_clear_order.config(text=get_text("btn_clear_order"))
@@ -560,4 +519,4 @@ class SalesModule(ttk.Frame):
             self.load_product_details(self.selected_product)
             self.update_selection_labels() # Re-renderiza las etiquetas de selección
 
-        self.update_order_summary() # Actualiza los nombres de los ítems en el resumen del pedido
\ No newline at end of file
+        self.update_order_summary(refresh_all=True) # Actualiza los nombres de los ítems en el resumen del pedido
\ No newline at end of file
@@ -6,7 +6,7 @@ from PIL import Image, ImageTk
 import os
 
 # Importar tus modelos y traducciones
-from models import Category, Product, Variant, Modifier, Sale, SaleItem, SaleItemModifier
+from models import Category, Money, Product, Variant, Modifier, Sale, SaleItem, SaleItemModifier
 from config.translations import get_text, set_language, current_language
 
 class ProductManagerUI(ttk.Frame):
@@ -467,8 +467,8 @@ class ProductManagerUI(ttk.Frame):
                 return
 
             try:
-                base_price = float(base_price_str)
-                if base_price < 0:
+                base_price = Money.from_decimal(float(base_price_str)) # El formulario pide unidades, no centavos
+                if base_price < Money(0):
                     self._show_error(get_text("msg_error") + get_text("msg_price_positive"))
                     return
             except ValueError:
@@ -731,7 +731,7 @@ class ProductManagerUI(ttk.Frame):
                 return
 
             try:
-                price_adjustment = float(price_adjustment_str)
+                price_adjustment = Money.from_decimal(float(price_adjustment_str))
             except ValueError:
                 self._show_error(get_text("msg_error") + get_text("msg_invalid_price_adjustment", default="Ajuste de precio inválido. Introduce un número válido."))
                 return
@@ -1007,7 +1007,7 @@ class ProductManagerUI(ttk.Frame):
                 return
 
             try:
-                price = float(price_str)
+                price = Money.from_decimal(float(price_str))
             except ValueError:
                 self._show_error(get_text("msg_error") + get_text("msg_invalid_price", default="Precio inválido. Introduce un número válido."))
                 return
@@ -0,0 +1,197 @@
+# utils/analytics.py
+
+import datetime
+import itertools
+
+import numpy as np
+
+from database import open_read_only_connection
+from utils.partitions import attached_partitions, split_date_range
+
+CHUNK_SIZE = 50000 # Filas leídas de SQLite por bloque
+
+# Importe neto de una línea de venta (alias si): cantidad * (precio + modificadores) - descuento
+LINE_AMOUNT_SQL = """si.quantity * (si.price_at_sale + COALESCE((
+    SELECT SUM(sim.quantity * sim.price_at_sale) FROM sale_item_modifiers sim WHERE sim.sale_item_id = si.id
+), 0)) - si.discount_amount"""
+
+# Una fila por línea de venta. La fecha se convierte a segundos en SQLite para no parsear cadenas en Python.
+SALE_LINES_SQL = f"""
+    SELECT si.sale_id, si.product_id, COALESCE(si.variant_id, 0), COALESCE(p.category_id, 0), si.quantity,
+           {LINE_AMOUNT_SQL},
+           si.discount_amount,
+           CAST(strftime('%s', s.sale_date) AS INTEGER)
+    FROM sales s
+    JOIN sale_items si ON si.sale_id = s.id
+    LEFT JOIN products p ON p.id = si.product_id
+    WHERE s.sale_date >= :start AND s.sale_date < :end
+"""
+
+
+def date_bounds(start_date, end_date):
+    """Límites [inicio, día siguiente al fin) de sale_date para dos fechas 'YYYY-MM-DD' incluidas."""
+    start = datetime.date.fromisoformat(start_date)
+    end = datetime.date.fromisoformat(end_date) + datetime.timedelta(days=1)
+    if start >= end:
+        raise ValueError("La fecha de inicio es posterior a la fecha de fin.")
+    return start.isoformat(), end.isoformat()
+
+
+class SaleLines:
+    """
+    Líneas de venta en formato columnar: un arreglo de NumPy por columna.
+    Ids en int32, importes en centavos int64 y la hora de la venta en datetime64[s].
+    Los métodos de agregación usan operaciones vectorizadas (bincount, cumsum), sin bucles por fila.
+    """
+    __slots__ = ("sale_id", "product_id", "variant_id", "category_id", "quantity", "amount", "discount_amount", "sale_time")
+
+    def __init__(self, sale_id, product_id, variant_id, category_id, quantity, amount, discount_amount, sale_time):
+        self.sale_id = sale_id
+        self.product_id = product_id
+        self.variant_id = variant_id # 0 si la línea no tiene variante
+        self.category_id = category_id # 0 si el producto no tiene categoría
+        self.quantity = quantity
+        self.amount = amount
+        self.discount_amount = discount_amount
+        self.sale_time = sale_time
+
+    def __len__(self):
+        return len(self.sale_id)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Crea el bloque a partir de filas de SALE_LINES_SQL (todas sus columnas son enteros)."""
+        # fromiter sobre las filas aplanadas evita crear una lista de listas intermedia
+        data = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=len(rows) * 8).reshape(-1, 8)
+        return cls(
+            data[:, 0].astype(np.int32),
+            data[:, 1].astype(np.int32),
+            data[:, 2].astype(np.int32),
+            data[:, 3].astype(np.int32),
+            data[:, 4].astype(np.int32),
+            data[:, 5].copy(),
+            data[:, 6].copy(),
+            data[:, 7].astype("datetime64[s]"),
+        )
+
+    @classmethod
+    def iter_chunks(cls, start_date, end_date, conn=None, chunk_size=CHUNK_SIZE):
+        """
+        Genera las líneas de venta entre dos fechas 'YYYY-MM-DD' (ambas incluidas) en bloques de
+        chunk_size filas, así la memoria usada no depende del tamaño del rango.
+        Incluye los meses archivados (utils/partitions.py), por tramos de a lo sumo MAX_ATTACHED meses.
+        Si no se pasa conn, abre una conexión de solo lectura propia.
+        """
+        date_bounds(start_date, end_date) # Valida las fechas
+        own_connection = conn is None
+        if own_connection:
+            conn = open_read_only_connection()
+        try:
+            for first_day, last_day in split_date_range(conn, start_date, end_date):
+                start, end = date_bounds(first_day, last_day)
+                with attached_partitions(conn, first_day, last_day):
+                    cursor = conn.execute(SALE_LINES_SQL, {"start": start, "end": end})
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        yield cls.from_rows(rows)
+        finally:
+            if own_connection:
+                conn.close()
+
+    @classmethod
+    def load(cls, start_date, end_date, conn=None, chunk_size=CHUNK_SIZE):
+        """Carga todas las líneas del rango en un solo SaleLines (lee por bloques y los concatena)."""
+        chunks = list(cls.iter_chunks(start_date, end_date, conn, chunk_size))
+        if not chunks:
+            return cls.from_rows([])
+        return cls(*(np.concatenate([getattr(chunk, name) for chunk in chunks]) for name in cls.__slots__))
+
+    # --- Agregaciones ---
+
+    def sum_by(self, column, values="amount", size=0):
+        """
+        Suma una columna (por defecto el importe) agrupada por un id ('product_id', 'category_id'...).
+        Retorna un arreglo indexado por el id, de longitud al menos size; los ids sin ventas quedan en 0.
+        """
+        return group_sum(getattr(self, column), getattr(self, values), size)
+
+    def daily_totals(self, start_date, day_count, values="amount"):
+        """Suma por día a partir de start_date: arreglo de day_count posiciones (día 0 = start_date)."""
+        day_index = (self.sale_time.astype("datetime64[D]") - np.datetime64(start_date, "D")).astype(np.int64)
+        inside = (day_index >= 0) & (day_index < day_count)
+        return group_sum(day_index[inside], getattr(self, values)[inside], day_count)[:day_count]
+
+    def hour_of_week_totals(self, values="amount"):
+        """Matriz 7x24 (lunes=0, hora 0-23) con la suma por día de la semana y hora."""
+        return group_sum(hour_of_week(self.sale_time), getattr(self, values), 7 * 24).reshape(7, 24)
+
+    def ticket_totals(self):
+        """Importe de cada venta (suma de sus líneas), en el orden de sale_id."""
+        _, inverse = np.unique(self.sale_id, return_inverse=True)
+        return group_sum(inverse, self.amount)
+
+
+def group_sum(keys, values, size=0):
+    """
+    Suma values agrupando por keys (enteros no negativos) con np.bincount.
+    Los enteros se suman como float64, que es exacto hasta 2**53 centavos, y se devuelven como int64.
+    """
+    sums = np.bincount(keys, weights=values, minlength=size)
+    if np.issubdtype(np.asarray(values).dtype, np.integer):
+        return np.rint(sums).astype(np.int64)
+    return sums
+
+
+def hour_of_week(times):
+    """Índice hora-de-la-semana (lunes 00h = 0 ... domingo 23h = 167) de un arreglo datetime64."""
+    seconds = times.astype("datetime64[s]").astype(np.int64)
+    days = seconds // 86400
+    weekday = (days + 3) % 7 # 1970-01-01 fue jueves
+    return weekday * 24 + (seconds // 3600) % 24
+
+
+def sum_chunks(chunks, aggregate):
+    """
+    Aplica una agregación sumable (p. ej. lambda lines: lines.sum_by('product_id')) a cada bloque
+    de SaleLines.iter_chunks y suma los resultados; los arreglos de distinta longitud se rellenan con ceros.
+    """
+    total = None
+    for chunk in chunks:
+        result = aggregate(chunk)
+        if total is None:
+            total = result
+            continue
+        if result.shape != total.shape:
+            shape = tuple(max(a, b) for a, b in zip(result.shape, total.shape))
+            total = np.pad(total, [(0, s - t) for s, t in zip(shape, total.shape)])
+            result = np.pad(result, [(0, s - r) for s, r in zip(shape, result.shape)])
+        total = total + result
+    return total
+
+
+def rolling_mean(values, window):
+    """
+    Media móvil de 'window' posiciones (la posición i promedia las window anteriores, incluida ella).
+    Las primeras window-1 posiciones promedian solo los valores disponibles. Usa sumas acumuladas: O(n).
+    """
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return rolling_sum(values, window) / counts
+
+
+def rolling_sum(values, window):
+    """Suma móvil de 'window' posiciones, con la misma convención que rolling_mean."""
+    if window <= 0:
+        raise ValueError("La ventana debe ser un número positivo.")
+    sums = np.cumsum(np.asarray(values))
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums
+
+
+def percentiles(values, percents=(50, 90, 99)):
+    """Percentiles de un arreglo (interpolación lineal). Retorna {percentil: valor}; vacío si no hay datos."""
+    values = np.asarray(values)
+    if values.size == 0:
+        return {}
+    return dict(zip(percents, np.percentile(values, percents).tolist()))
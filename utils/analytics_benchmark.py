@@ -0,0 +1,179 @@
+# utils/analytics_benchmark.py
+#
+# Compara utils.analytics (NumPy) con consultas SQL equivalentes sobre una base sintética.
+# Uso: python -m utils.analytics_benchmark [RUTA_DB] [LINEAS]
+# Si la base no existe se crea con LINEAS líneas de venta (por defecto un millón).
+
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from database import TABLE_DEFINITIONS, INDEX_DEFINITIONS, TRIGGER_DEFINITIONS, rebuild_rollups
+from utils.analytics import SaleLines, LINE_AMOUNT_SQL, date_bounds, rolling_mean, percentiles
+
+DEFAULT_DB_PATH = "data/analytics_benchmark.db"
+DEFAULT_LINE_COUNT = 1000000
+PERCENTS = (50, 90, 99)
+
+
+def sql_baselines():
+    """Consultas SQL puras equivalentes a cada análisis de NumPy. Parámetros :start / :end."""
+    lines = f"""
+        SELECT si.sale_id, si.product_id, s.sale_date, {LINE_AMOUNT_SQL} AS amount
+        FROM sales s
+        JOIN sale_items si ON si.sale_id = s.id
+        WHERE s.sale_date >= :start AND s.sale_date < :end
+    """
+    return {
+        "revenue_by_product": f"""
+            SELECT product_id, SUM(amount) FROM ({lines}) GROUP BY product_id ORDER BY product_id
+        """,
+        "daily_moving_average": f"""
+            SELECT day, total, AVG(total) OVER (ORDER BY day ROWS BETWEEN 6 PRECEDING AND CURRENT ROW)
+            FROM (SELECT substr(sale_date, 1, 10) AS day, SUM(amount) AS total FROM ({lines}) GROUP BY day)
+            ORDER BY day
+        """,
+        "hour_of_week": f"""
+            SELECT ((CAST(strftime('%w', sale_date) AS INTEGER) + 6) % 7) * 24 + CAST(substr(sale_date, 12, 2) AS INTEGER) AS slot,
+                   SUM(amount)
+            FROM ({lines}) GROUP BY slot ORDER BY slot
+        """,
+        "ticket_totals": f"""
+            SELECT SUM(amount) AS total FROM ({lines}) GROUP BY sale_id ORDER BY total
+        """,
+    }
+
+
+def create_synthetic_database(path, line_count=DEFAULT_LINE_COUNT, days=90, seed=1):
+    """
+    Crea una base de datos con el esquema de la aplicación y line_count líneas de venta aleatorias
+    repartidas en 'days' días hasta ayer. Los triggers se crean después de la carga y las tablas
+    de resumen se llenan con rebuild_rollups(), que es mucho más rápido que disparar un trigger por fila.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    for table_sql in TABLE_DEFINITIONS.values():
+        conn.execute(table_sql)
+
+    product_count, variant_count, modifier_count = 200, 100, 20
+    conn.executemany("INSERT INTO categories (name_es, name_en) VALUES (?, ?)",
+                     [(f"Categoría {i}", f"Category {i}") for i in range(1, 11)])
+    conn.executemany("INSERT INTO products (category_id, name_es, name_en, base_price) VALUES (?, ?, ?, ?)",
+                     [(i % 10 + 1, f"Producto {i}", f"Product {i}", rng.randint(100, 2000)) for i in range(1, product_count + 1)])
+    conn.executemany("INSERT INTO variants (product_id, name_es, name_en, price_adjustment) VALUES (?, ?, ?, ?)",
+                     [(i, f"Grande {i}", f"Large {i}", 50) for i in range(1, variant_count + 1)])
+    conn.executemany("INSERT INTO modifiers (name_es, name_en, price) VALUES (?, ?, ?)",
+                     [(f"Extra {i}", f"Extra {i}", rng.randint(0, 200)) for i in range(1, modifier_count + 1)])
+
+    sales_per_day = max(1, line_count // (3 * days))
+    first_day = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=days), datetime.time(8))
+    sales, items, modifiers = [], [], []
+    sale_id = item_id = 0
+    while item_id < line_count:
+        sale_id += 1
+        day, slot = divmod(sale_id - 1, sales_per_day)
+        sale_date = first_day + datetime.timedelta(days=day % days, seconds=slot * 14 * 3600 // sales_per_day)
+        total = 0
+        for _ in range(min(rng.randint(1, 5), line_count - item_id)):
+            item_id += 1
+            product_id = rng.randint(1, product_count)
+            variant_id = product_id if product_id <= variant_count and rng.random() < 0.5 else None
+            quantity, price = rng.randint(1, 3), rng.randint(100, 2000)
+            items.append((item_id, sale_id, product_id, variant_id, quantity, price))
+            total += quantity * price
+            if rng.random() < 0.3:
+                modifiers.append((item_id, rng.randint(1, modifier_count), 1, 50))
+                total += quantity * 50
+        sales.append((sale_id, sale_date.strftime("%Y-%m-%d %H:%M:%S"), total, total * 16 // 116))
+
+    conn.executemany("INSERT INTO sales (id, sale_date, total_amount, tax_amount) VALUES (?, ?, ?, ?)", sales)
+    conn.executemany("INSERT INTO sale_items (id, sale_id, product_id, variant_id, quantity, price_at_sale) VALUES (?, ?, ?, ?, ?, ?)", items)
+    conn.executemany("INSERT INTO sale_item_modifiers (sale_item_id, modifier_id, quantity, price_at_sale) VALUES (?, ?, ?, ?)", modifiers)
+    conn.commit()
+    for index_sql in INDEX_DEFINITIONS:
+        conn.execute(index_sql)
+    for trigger_sql in TRIGGER_DEFINITIONS:
+        conn.execute(trigger_sql)
+    conn.commit()
+    rebuild_rollups(conn)
+    conn.close()
+
+
+def timed(function):
+    """Ejecuta function() y retorna (resultado, segundos)."""
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def run_benchmark(conn, start_date, end_date):
+    """
+    Ejecuta cada análisis con SQL puro y con NumPy, comprueba que den el mismo resultado
+    y retorna [(nombre, segundos SQL, segundos NumPy)]. La carga columnar se mide aparte
+    como 'load_sale_lines', ya que se hace una vez y se reutiliza en todos los análisis.
+    """
+    start, end = date_bounds(start_date, end_date)
+    params = {"start": start, "end": end}
+    day_count = (datetime.date.fromisoformat(end) - datetime.date.fromisoformat(start)).days
+    queries = sql_baselines()
+    results = []
+
+    lines, load_seconds = timed(lambda: SaleLines.load(start_date, end_date, conn))
+    results.append(("load_sale_lines", None, load_seconds))
+
+    sql_rows, sql_seconds = timed(lambda: conn.execute(queries["revenue_by_product"], params).fetchall())
+    by_product, numpy_seconds = timed(lambda: lines.sum_by("product_id"))
+    assert all(by_product[product_id] == total for product_id, total in sql_rows)
+    results.append(("revenue_by_product", sql_seconds, numpy_seconds))
+
+    sql_rows, sql_seconds = timed(lambda: conn.execute(queries["daily_moving_average"], params).fetchall())
+    moving_average, numpy_seconds = timed(lambda: rolling_mean(lines.daily_totals(start, day_count), 7))
+    # SQL solo devuelve días con ventas; en la base sintética son todos los del rango
+    assert len(sql_rows) != day_count or np.allclose(moving_average, [row[2] for row in sql_rows])
+    results.append(("daily_moving_average", sql_seconds, numpy_seconds))
+
+    sql_rows, sql_seconds = timed(lambda: conn.execute(queries["hour_of_week"], params).fetchall())
+    heatmap, numpy_seconds = timed(lambda: lines.hour_of_week_totals())
+    assert all(heatmap.reshape(-1)[slot] == total for slot, total in sql_rows)
+    results.append(("hour_of_week", sql_seconds, numpy_seconds))
+
+    def sql_percentiles():
+        totals = [row[0] for row in conn.execute(queries["ticket_totals"], params)]
+        return {percent: totals[(len(totals) - 1) * percent // 100] for percent in PERCENTS} if totals else {}
+
+    sql_result, sql_seconds = timed(sql_percentiles)
+    numpy_result, numpy_seconds = timed(lambda: percentiles(lines.ticket_totals(), PERCENTS))
+    assert sql_result.keys() == numpy_result.keys()
+    results.append(("ticket_percentiles", sql_seconds, numpy_seconds))
+    return results
+
+
+def main(argv):
+    path = argv[1] if len(argv) > 1 else DEFAULT_DB_PATH
+    line_count = int(argv[2]) if len(argv) > 2 else DEFAULT_LINE_COUNT
+    if not os.path.exists(path):
+        print(f"Creando base sintética con {line_count} líneas en {path}...")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        _, seconds = timed(lambda: create_synthetic_database(path, line_count))
+        print(f"Base creada en {seconds:.1f} s")
+
+    conn = sqlite3.connect("file:" + os.path.abspath(path).replace("\\", "/") + "?mode=ro", uri=True)
+    try:
+        first_day, last_day = conn.execute("SELECT substr(MIN(sale_date), 1, 10), substr(MAX(sale_date), 1, 10) FROM sales").fetchone()
+        line_total = conn.execute("SELECT COUNT(*) FROM sale_items").fetchone()[0]
+        print(f"{line_total} líneas de venta entre {first_day} y {last_day}")
+        print(f"{'Análisis':<24}{'SQL (s)':>10}{'NumPy (s)':>12}")
+        for name, sql_seconds, numpy_seconds in run_benchmark(conn, first_day, last_day):
+            sql_text = f"{sql_seconds:.3f}" if sql_seconds is not None else "-"
+            print(f"{name:<24}{sql_text:>10}{numpy_seconds:>12.3f}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
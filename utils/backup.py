@@ -0,0 +1,287 @@
+# utils/backup.py
+#
+# Copias de seguridad en caliente de la base de ventas con la API de backup de SQLite
+# (sqlite3.Connection.backup), sin cerrar la aplicación ni arriesgar una copia a medio escribir.
+# La copia se hace de a BACKUP_STEP_PAGES páginas con una pausa entre pasos, desde una conexión propia
+# que solo lee: con WAL un lector nunca bloquea a un cobro. La conexión abre una transacción de
+# lectura antes de empezar, así todos los pasos leen la misma foto de la base; sin ella, cada
+# escritura de otra conexión haría que la copia vuelva a empezar de cero.
+#
+# Cada copia se escribe en un archivo temporal, se pasa a modo DELETE (un solo archivo, sin -wal), se
+# verifica con PRAGMA quick_check y recién entonces se renombra. Se conservan las KEEP_BACKUPS más
+# recientes. BackupService corre las copias cada BACKUP_INTERVAL_S en un hilo secundario.
+# Las particiones de data/archive no se copian: no cambian después de archivadas.
+#
+# En modo en memoria (database.IN_MEMORY_DB), MemoryFlusher usa la misma API para llevar la base en
+# memoria a DB_FILE cada FLUSH_INTERVAL_S: toma una foto de la base con serialize() (unas decenas de
+# milisegundos en los que los cobros esperan) y la copia a disco por pasos, sin bloquear a nadie.
+# Cada copia es completa, no incremental: reescribe la base entera en DB_FILE y otro tanto en su WAL,
+# unas dos veces el tamaño de la base por copia. Por eso solo se copia si hubo escrituras desde la
+# anterior (PRAGMA data_version): una terminal sin ventas no escribe nada en la tarjeta.
+# Lo que no va al journal (el cierre del día) se lleva a disco con commit_to_disk() al terminar cada paso.
+# Uso desde consola:
+#   python -m utils.backup [DIRECTORIO]
+
+import datetime
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from database import DB_DIR, DB_FILE, IN_MEMORY_DB, connect_live, discard_journal, journal_lock, rotate_journal
+
+BACKUP_DIR = os.path.join(DB_DIR, "backups")
+BACKUP_PREFIX = "sales_db-"
+BACKUP_INTERVAL_S = 3600 # Una copia por hora mientras la aplicación está abierta
+KEEP_BACKUPS = 24
+BACKUP_STEP_PAGES = 64 # Páginas por paso (256 KB con páginas de 4 KB)
+BACKUP_STEP_SLEEP_S = 0.005 # Pausa entre pasos: deja el disco libre para los cobros
+FLUSH_INTERVAL_S = 60 # Copias a disco de la base en memoria; lo de en medio lo cubre el journal
+FLUSH_LOCK_TIMEOUT_S = 10 # Espera máxima del bloqueo de escritura para tomar la foto
+
+_flush_lock = threading.Lock() # Una copia a disco a la vez: dos en paralelo podrían escribir la más vieja al final
+_flush_source = None # Conexión de las copias a la base en memoria; su data_version cambia con cada commit de otra
+_flushed_version = None # data_version de la última foto copiada a disco
+
+
+def list_backups(backup_dir=BACKUP_DIR):
+    """Rutas de las copias terminadas, de la más reciente a la más vieja."""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = [name for name in os.listdir(backup_dir) if name.startswith(BACKUP_PREFIX) and name.endswith(".db")]
+    return [os.path.join(backup_dir, name) for name in sorted(names, reverse=True)]
+
+
+def rotate_backups(backup_dir=BACKUP_DIR, keep=KEEP_BACKUPS):
+    """Borra las copias más viejas más allá de las keep más recientes. Retorna las rutas borradas."""
+    removed = list_backups(backup_dir)[keep:]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def verify_backup(path):
+    """Retorna None si PRAGMA quick_check da 'ok', o el primer problema encontrado."""
+    conn = sqlite3.connect("file:" + os.path.abspath(path).replace("\\", "/") + "?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        conn.close()
+    return None if result == "ok" else result
+
+
+def paced_progress(step_sleep, stop_event=None):
+    """Callback de progreso para Connection.backup: pausa entre pasos y corta si stop_event se activa."""
+    def pause(status, remaining, total):
+        if stop_event is not None and stop_event.is_set():
+            raise InterruptedError("Copia de seguridad interrumpida.")
+        time.sleep(step_sleep)
+    return pause
+
+
+def backup_database(source, target_path, step_pages=BACKUP_STEP_PAGES, step_sleep=BACKUP_STEP_SLEEP_S, stop_event=None):
+    """
+    Copia la base de la conexión source a target_path por pasos, leyendo una sola foto de la base.
+    source no debe tener una transacción abierta. Si stop_event se activa, la copia se abandona y
+    lanza InterruptedError. Retorna el número de páginas copiadas.
+    """
+    target = sqlite3.connect(target_path)
+    try:
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone() # Toma la foto que leen todos los pasos
+        try:
+            source.backup(target, pages=step_pages, progress=paced_progress(step_sleep, stop_event))
+        finally:
+            source.rollback()
+        target.execute("PRAGMA journal_mode = DELETE") # La copia queda en un solo archivo
+        return target.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        target.close()
+
+
+def make_backup(backup_dir=BACKUP_DIR, db_file=DB_FILE, keep=KEEP_BACKUPS, stop_event=None, source=None):
+    """
+    Hace una copia verificada de la base en backup_dir y rota las viejas. source permite copiar desde
+    una conexión ya abierta (p. ej. una base en memoria); si no, abre una propia de solo lectura.
+    Retorna {"path", "pages", "seconds"}. Lanza sqlite3.DatabaseError si la copia no pasa quick_check.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(backup_dir, f"{BACKUP_PREFIX}{stamp}.db")
+    temp_path = path + ".tmp"
+    own_connection = source is None
+    if own_connection:
+        source = sqlite3.connect("file:" + os.path.abspath(db_file).replace("\\", "/") + "?mode=ro", uri=True)
+    started = time.perf_counter()
+    try:
+        pages = backup_database(source, temp_path, stop_event=stop_event)
+        problem = verify_backup(temp_path)
+        if problem is not None:
+            raise sqlite3.DatabaseError(f"La copia de seguridad no pasó quick_check: {problem}")
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        if own_connection:
+            source.close()
+    rotate_backups(backup_dir, keep)
+    return {"path": path, "pages": pages, "seconds": time.perf_counter() - started}
+
+
+def flush_memory_database(db_file=DB_FILE, stop_event=None):
+    """
+    Copia la base en memoria a db_file. La foto se toma con el bloqueo de escritura de la base en
+    memoria y junto con el cambio de archivo del journal, así que contiene justo los archivos
+    anteriores; se anota en memory_journal_state y esos archivos se borran después de copiarla. La copia
+    es una sola transacción sobre db_file: un corte la deja como estaba. Si nadie escribió desde la copia
+    anterior no hace nada y retorna None; si no, retorna {"seq", "pages", "seconds"}.
+    """
+    global _flush_source, _flushed_version
+    started = time.perf_counter()
+    with _flush_lock:
+        if _flush_source is None:
+            _flush_source = connect_live(timeout=FLUSH_LOCK_TIMEOUT_S, check_same_thread=False)
+        source = _flush_source
+        if source.execute("PRAGMA data_version").fetchone()[0] == _flushed_version:
+            return None
+        with journal_lock:
+            # serialize() no toma bloqueos: BEGIN IMMEDIATE espera a que terminen las transacciones de
+            # otras conexiones (p. ej. el cierre del día), para no copiar una a medio escribir
+            source.execute("BEGIN IMMEDIATE")
+            try:
+                data_version = source.execute("PRAGMA data_version").fetchone()[0]
+                seq = rotate_journal()
+                data = source.serialize()
+            finally:
+                source.rollback()
+        snapshot = sqlite3.connect(":memory:")
+        try:
+            snapshot.deserialize(data)
+            del data
+            snapshot.execute("UPDATE memory_journal_state SET flushed_seq = ?, flushed_at = CURRENT_TIMESTAMP WHERE id = 1", (seq,))
+            snapshot.commit()
+            target = sqlite3.connect(db_file, timeout=10)
+            try:
+                target.execute("PRAGMA journal_mode = WAL") # Los lectores de db_file siguen leyendo durante la copia
+                snapshot.backup(target, pages=BACKUP_STEP_PAGES, progress=paced_progress(BACKUP_STEP_SLEEP_S, stop_event))
+                pages = target.execute("PRAGMA page_count").fetchone()[0]
+            finally:
+                target.close()
+        finally:
+            snapshot.close()
+        discard_journal(seq)
+        _flushed_version = data_version
+    return {"seq": seq, "pages": pages, "seconds": time.perf_counter() - started}
+
+
+def commit_to_disk(conn):
+    """
+    Confirma conn y, en modo en memoria, copia la base a disco. Para escrituras que no pasan por el
+    journal (las del cierre del día, con su propia conexión) y para cambios del catálogo de particiones
+    que tienen que estar en DB_FILE antes de borrar un archivo. Fuera del modo en memoria es un commit.
+    """
+    conn.commit()
+    if IN_MEMORY_DB:
+        flush_memory_database()
+
+
+class MemoryFlusher:
+    """
+    Copias periódicas de la base en memoria a disco en un hilo secundario (ver flush_memory_database).
+    stop() hace una última copia completa, para cerrar la aplicación sin depender del journal.
+    """
+
+    def __init__(self, interval=FLUSH_INTERVAL_S, db_file=DB_FILE):
+        self.interval = interval
+        self.db_file = db_file
+        self.last_flush = None
+        self.last_error = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="memory-flush", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=30):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self.last_flush = flush_memory_database(self.db_file) or self.last_flush
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.last_flush = flush_memory_database(self.db_file, self.stop_event) or self.last_flush
+                self.last_error = None
+            except InterruptedError:
+                break
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error al copiar la base en memoria a disco: {e}")
+                self.last_error = e
+
+
+class BackupService:
+    """
+    Copias de seguridad periódicas en un hilo secundario. La primera se hace cuando vence el intervalo
+    desde la última copia existente (al abrir la aplicación si ya pasó). last_backup y last_error
+    guardan el resultado de la última copia, para mostrarlo en la interfaz.
+    """
+
+    def __init__(self, interval=BACKUP_INTERVAL_S, backup_dir=BACKUP_DIR, db_file=DB_FILE, keep=KEEP_BACKUPS):
+        self.interval = interval
+        self.backup_dir = backup_dir
+        self.db_file = db_file
+        self.keep = keep
+        self.last_backup = None # {"path", "pages", "seconds"} de la última copia correcta
+        self.last_error = None
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event() # run_now() adelanta la próxima copia
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="backup", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        """Detiene el servicio; una copia en curso se abandona en su próximo paso."""
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def run_now(self):
+        self.wake_event.set()
+
+    def seconds_until_due(self):
+        backups = list_backups(self.backup_dir)
+        if not backups:
+            return 0
+        return max(0, os.path.getmtime(backups[0]) + self.interval - time.time())
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.wake_event.wait(self.seconds_until_due())
+            self.wake_event.clear()
+            if self.stop_event.is_set():
+                break
+            try:
+                self.last_backup = make_backup(self.backup_dir, self.db_file, self.keep, self.stop_event)
+                self.last_error = None
+            except InterruptedError:
+                break
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error en la copia de seguridad: {e}")
+                self.last_error = e
+                self.wake_event.wait(min(self.interval, 300)) # Reintenta en unos minutos
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        print("Uso: python -m utils.backup [DIRECTORIO]")
+        sys.exit(1)
+    result = make_backup(sys.argv[1] if len(sys.argv) == 2 else BACKUP_DIR)
+    print(f"{result['path']}: {result['pages']} páginas en {result['seconds']:.1f} s")
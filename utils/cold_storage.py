@@ -0,0 +1,183 @@
+# utils/cold_storage.py
+#
+# Almacenamiento en frío de bases SQLite que casi no se leen (las particiones mensuales de ventas de
+# utils/partitions.py). freeze_database() guarda cada tabla por columnas en un archivo ZIP: un miembro
+# por columna, comprimido con lzma (o zlib). Al agrupar los valores de una misma columna la compresión
+# es mucho mejor que la del archivo SQLite: los ids y las fechas van ordenados, los importes se repiten.
+# Las columnas enteras se guardan como .npy (en diferencias si son crecientes), el texto unido por \0
+# y lo demás como JSON. El archivo lleva también el SQL de sus tablas e índices, así que no depende del
+# esquema actual.
+#
+# Para leer, thawed_path() descomprime el archivo en una base temporal en THAW_DIR (una vez: las
+# siguientes lecturas la reutilizan) que se puede adjuntar con ATTACH. Se conservan a lo sumo
+# MAX_THAWED bases; las menos usadas se borran.
+#
+# Estructura del archivo:
+#   manifest.json                                 tablas (SQL, filas, columnas con su codificación) e índices
+#   <tabla>/<columna>.npy | .txt | .json          valores de la columna, en orden de rowid
+#   <tabla>/<columna>.nulls.npy                   máscara de NULL (solo si la columna tiene NULL)
+
+import io
+import json
+import os
+import sqlite3
+import threading
+import zipfile
+
+import numpy as np
+
+from database import DB_DIR
+
+COMPRESSIONS = {"lzma": zipfile.ZIP_LZMA, "zlib": zipfile.ZIP_DEFLATED}
+COMPRESSION = "lzma" # Más lenta que zlib pero ~30 % más chica; solo se paga al archivar
+MANIFEST_FILE = "manifest.json"
+THAW_DIR = os.path.join(DB_DIR, "archive", "thawed")
+MAX_THAWED = 10 # Bases descomprimidas que se conservan (una consulta adjunta hasta 10 particiones)
+TEXT_SEPARATOR = "\0"
+
+
+def encode_column(values):
+    """
+    Codifica los valores de una columna. Retorna (codificación, extensión, bytes, máscara de NULL o None).
+    Codificaciones: 'int' y 'int_delta' (.npy int64), 'text' (unido por \\0), 'json' (el resto).
+    """
+    nulls = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    present = [value for value in values if value is not None]
+    types = {type(value) for value in present}
+    mask = nulls if nulls.any() else None
+    if types <= {int}:
+        array = np.fromiter((0 if value is None else value for value in values), dtype=np.int64, count=len(values))
+        encoding = "int"
+        if len(array) > 1 and (np.diff(array) >= 0).all():
+            array = np.diff(array, prepend=0) # Ids y claves ordenadas: diferencias chicas y repetidas
+            encoding = "int_delta"
+        buffer = io.BytesIO()
+        np.save(buffer, array, allow_pickle=False)
+        return encoding, "npy", buffer.getvalue(), mask
+    if types == {str} and not any(TEXT_SEPARATOR in value for value in present):
+        return "text", "txt", TEXT_SEPARATOR.join(present).encode("utf-8"), mask
+    return "json", "json", json.dumps(values).encode("utf-8"), None
+
+
+def decode_column(encoding, data, row_count, mask):
+    """Valores de una columna codificada con encode_column(), como lista (None en los NULL)."""
+    if encoding == "json":
+        return json.loads(data)
+    if encoding == "text":
+        present_count = row_count - (int(mask.sum()) if mask is not None else 0)
+        present = data.decode("utf-8").split(TEXT_SEPARATOR) if present_count else []
+        if mask is None:
+            return present
+        values = [None] * row_count
+        for position, value in zip(np.flatnonzero(~mask).tolist(), present):
+            values[position] = value
+        return values
+    array = np.load(io.BytesIO(data), allow_pickle=False)
+    if encoding == "int_delta":
+        array = np.cumsum(array)
+    values = array.tolist()
+    if mask is not None:
+        for position in np.flatnonzero(mask).tolist():
+            values[position] = None
+    return values
+
+
+def save_array(archive, name, array):
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    archive.writestr(name, buffer.getvalue())
+
+
+def freeze_database(db_path, cold_path, compression=COMPRESSION):
+    """
+    Guarda todas las tablas de la base db_path en el archivo comprimido cold_path (se escribe aparte y
+    se renombra al terminar). La base no se modifica. Retorna {tabla: filas}.
+    """
+    conn = sqlite3.connect("file:" + os.path.abspath(db_path).replace("\\", "/") + "?mode=ro", uri=True)
+    manifest = {"compression": compression, "tables": {}, "indexes": []}
+    try:
+        with zipfile.ZipFile(cold_path + ".tmp", "w", compression=COMPRESSIONS[compression]) as archive:
+            tables = conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name").fetchall()
+            for table_name, table_sql in tables:
+                column_names = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+                rows = conn.execute(f"SELECT {', '.join(column_names)} FROM {table_name} ORDER BY rowid").fetchall()
+                columns = []
+                for column_name, values in zip(column_names, zip(*rows) if rows else [()] * len(column_names)):
+                    encoding, extension, data, mask = encode_column(list(values))
+                    archive.writestr(f"{table_name}/{column_name}.{extension}", data)
+                    if mask is not None:
+                        save_array(archive, f"{table_name}/{column_name}.nulls.npy", mask)
+                    columns.append({"name": column_name, "encoding": encoding, "file": f"{column_name}.{extension}",
+                                    "nulls": mask is not None})
+                manifest["tables"][table_name] = {"sql": table_sql, "rows": len(rows), "columns": columns}
+            manifest["indexes"] = [row[0] for row in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL ORDER BY name")]
+            archive.writestr(MANIFEST_FILE, json.dumps(manifest, indent=2))
+    finally:
+        conn.close()
+    os.replace(cold_path + ".tmp", cold_path)
+    return {table_name: table["rows"] for table_name, table in manifest["tables"].items()}
+
+
+def thaw_database(cold_path, db_path):
+    """
+    Descomprime cold_path en una base SQLite nueva en db_path (se crea aparte y se renombra al
+    terminar, así nadie adjunta una base a medio llenar). El archivo temporal lleva el proceso y el
+    hilo en el nombre: dos lectores que descomprimen a la vez no se pisan. Retorna {tabla: filas}.
+    """
+    temp_path = f"{db_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with zipfile.ZipFile(cold_path) as archive:
+        manifest = json.loads(archive.read(MANIFEST_FILE))
+        conn = sqlite3.connect(temp_path)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF") # Archivo temporal: si falla se descarta entero
+            for table_name, table in manifest["tables"].items():
+                conn.execute(table["sql"])
+                columns = []
+                for column in table["columns"]:
+                    mask = None
+                    if column["nulls"]:
+                        mask = np.load(io.BytesIO(archive.read(f"{table_name}/{column['name']}.nulls.npy")), allow_pickle=False)
+                    data = archive.read(f"{table_name}/{column['file']}")
+                    columns.append(decode_column(column["encoding"], data, table["rows"], mask))
+                column_names = ", ".join(column["name"] for column in table["columns"])
+                placeholders = ", ".join("?" * len(table["columns"]))
+                conn.executemany(f"INSERT INTO {table_name} ({column_names}) VALUES ({placeholders})", zip(*columns))
+            # Los índices al final: crearlos sobre la tabla llena es más rápido que mantenerlos fila a fila
+            for index_sql in manifest["indexes"]:
+                conn.execute(index_sql)
+            conn.commit()
+        except Exception:
+            conn.close()
+            os.remove(temp_path)
+            raise
+        conn.close()
+    os.replace(temp_path, db_path)
+    return {table_name: table["rows"] for table_name, table in manifest["tables"].items()}
+
+
+def evict_thawed(thaw_dir=THAW_DIR, keep=MAX_THAWED):
+    """Borra las bases descomprimidas menos usadas más allá de las keep más recientes."""
+    paths = [os.path.join(thaw_dir, name) for name in os.listdir(thaw_dir) if name.endswith(".db")]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass # En Windows no se puede borrar mientras otra conexión la tenga adjunta
+
+
+def thawed_path(cold_path, thaw_dir=THAW_DIR):
+    """
+    Ruta de una base SQLite con el contenido de cold_path, lista para ATTACH. La descomprime si no
+    existe o si el archivo comprimido es más nuevo; si ya existe, solo la marca como usada.
+    """
+    os.makedirs(thaw_dir, exist_ok=True)
+    db_path = os.path.join(thaw_dir, os.path.splitext(os.path.basename(cold_path))[0] + ".db")
+    if os.path.exists(db_path) and os.path.getmtime(db_path) >= os.path.getmtime(cold_path):
+        os.utime(db_path)
+        return db_path
+    thaw_database(cold_path, db_path)
+    evict_thawed(thaw_dir, MAX_THAWED)
+    return db_path
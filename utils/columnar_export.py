@@ -0,0 +1,227 @@
+# utils/columnar_export.py
+#
+# Exportación columnar e incremental de sales, sale_items y sale_item_modifiers para análisis.
+# Cada exportación escribe un lote por tabla con un archivo .npy por columna, que se puede
+# leer con np.load(..., mmap_mode="r") sin cargarlo entero en memoria. Incluye los meses archivados
+# (utils/partitions.py), por tramos de a lo sumo MAX_ATTACHED meses: un lote por tramo con filas nuevas.
+# Uso: python -m utils.columnar_export [DIRECTORIO] [FECHA_INICIO FECHA_FIN]
+#
+# Estructura del directorio:
+#   manifest.json                        rango de fechas, último id exportado y lotes de cada tabla
+#   <tabla>/<primer_id>-<último_id>/<columna>.npy
+
+import datetime
+import itertools
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from database import open_read_only_connection
+from utils.analytics import date_bounds
+from utils.partitions import attached_partitions, split_date_range
+
+DEFAULT_EXPORT_DIR = "data/exports/columnar"
+MANIFEST_FILE = "manifest.json"
+CHUNK_SIZE = 50000
+
+# {tabla: (consulta, [(columna, dtype)])}. Las consultas reciben :last_id (último id ya exportado),
+# :max_id (id máximo en la foto de la exportación; lo que llegue después va en la siguiente) y :start / :end (límites de sale_date). Los NULL se exportan como 0.
+EXPORT_TABLES = {
+    "sales": (
+        """
+        SELECT s.id, CAST(strftime('%s', s.sale_date) AS INTEGER), s.total_amount, s.tax_amount
+        FROM sales s
+        WHERE s.id > :last_id AND s.id <= :max_id AND s.sale_date >= :start AND s.sale_date < :end
+        ORDER BY s.id
+        """,
+        [("id", np.int64), ("sale_date", "datetime64[s]"), ("total_amount", np.int64), ("tax_amount", np.int64)],
+    ),
+    "sale_items": (
+        """
+        SELECT si.id, si.sale_id, si.product_id, COALESCE(si.variant_id, 0), si.quantity, si.price_at_sale, si.discount_amount
+        FROM sale_items si
+        JOIN sales s ON s.id = si.sale_id
+        WHERE si.id > :last_id AND si.id <= :max_id AND s.sale_date >= :start AND s.sale_date < :end
+        ORDER BY si.id
+        """,
+        [("id", np.int64), ("sale_id", np.int64), ("product_id", np.int32), ("variant_id", np.int32),
+         ("quantity", np.int32), ("price_at_sale", np.int64), ("discount_amount", np.int64)],
+    ),
+    "sale_item_modifiers": (
+        """
+        SELECT sim.id, sim.sale_item_id, sim.modifier_id, sim.quantity, sim.price_at_sale
+        FROM sale_item_modifiers sim
+        JOIN sale_items si ON si.id = sim.sale_item_id
+        JOIN sales s ON s.id = si.sale_id
+        WHERE sim.id > :last_id AND sim.id <= :max_id AND s.sale_date >= :start AND s.sale_date < :end
+        ORDER BY sim.id
+        """,
+        [("id", np.int64), ("sale_item_id", np.int64), ("modifier_id", np.int32), ("quantity", np.int32),
+         ("price_at_sale", np.int64)],
+    ),
+}
+
+
+def read_manifest(export_dir):
+    """Lee el manifest de un directorio de exportación (uno vacío si aún no se exportó nada)."""
+    path = os.path.join(export_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"start_date": None, "end_date": None, "tables": {}}
+    with open(path, "r", encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)
+
+
+def write_manifest(export_dir, manifest):
+    """Escribe el manifest de forma atómica (archivo temporal + os.replace)."""
+    path = os.path.join(export_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def range_bounds(first_day, last_day):
+    """Límites de sale_date de un tramo de split_date_range(); None en un extremo = sin límite."""
+    start = first_day or "0000-01-01"
+    end = (datetime.date.fromisoformat(last_day) + datetime.timedelta(days=1)).isoformat() if last_day else "9999-12-31"
+    return start, end
+
+
+def export_table(conn, export_dir, table_name, last_id, max_id, params):
+    """
+    Exporta las filas nuevas (id > last_id) de una tabla como un lote de archivos .npy.
+    Los archivos se crean con open_memmap y se llenan por bloques de fetchmany, así la memoria
+    usada no depende del número de filas. Debe llamarse dentro de una transacción de lectura.
+    Retorna el lote {"first_id", "last_id", "rows", "path"} o None si no hay filas nuevas.
+    """
+    query, columns = EXPORT_TABLES[table_name]
+    params = dict(params, last_id=last_id, max_id=max_id)
+    row_count = conn.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0]
+    if row_count == 0:
+        return None
+
+    batch_dir = os.path.join(export_dir, table_name, "in-progress")
+    if os.path.exists(batch_dir):
+        shutil.rmtree(batch_dir) # Restos de una exportación interrumpida
+    os.makedirs(batch_dir)
+    arrays = [
+        np.lib.format.open_memmap(os.path.join(batch_dir, f"{name}.npy"), mode="w+", dtype=dtype, shape=(row_count,))
+        for name, dtype in columns
+    ]
+
+    cursor = conn.execute(query, params)
+    position = 0
+    first_id = None
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        data = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=len(rows) * len(columns))
+        data = data.reshape(-1, len(columns))
+        for index, array in enumerate(arrays):
+            array[position:position + len(rows)] = data[:, index].astype(array.dtype)
+        if first_id is None:
+            first_id = int(data[0, 0])
+        position += len(rows)
+    last_exported_id = int(arrays[0][position - 1])
+    for array in arrays:
+        array.flush()
+    del arrays
+
+    # El lote solo aparece con su nombre definitivo cuando está completo
+    final_name = f"{first_id}-{last_exported_id}"
+    final_dir = os.path.join(export_dir, table_name, final_name)
+    if os.path.exists(final_dir):
+        shutil.rmtree(final_dir)
+    os.rename(batch_dir, final_dir)
+    return {"first_id": first_id, "last_id": last_exported_id, "rows": position, "path": f"{table_name}/{final_name}"}
+
+
+def export_sales_columnar(export_dir=DEFAULT_EXPORT_DIR, start_date=None, end_date=None, conn=None):
+    """
+    Exporta las ventas nuevas desde la última exportación a export_dir.
+    Cada tabla lleva su propio último id exportado en el manifest, así que una exportación nocturna
+    solo escribe el delta. Un directorio de exportación corresponde a un rango de fechas fijo
+    (None = sin límite); lanza ValueError si se pide otro rango sobre el mismo directorio.
+    Escribe un lote por tramo de meses archivados con filas nuevas. Retorna {tabla: [lotes nuevos]}.
+    """
+    start, end = date_bounds(start_date, end_date) if start_date and end_date else ("0000-01-01", "9999-12-31")
+    os.makedirs(export_dir, exist_ok=True)
+    manifest = read_manifest(export_dir)
+    if manifest["tables"] and (manifest["start_date"], manifest["end_date"]) != (start_date, end_date):
+        raise ValueError("El directorio de exportación ya contiene otro rango de fechas.")
+    manifest["start_date"], manifest["end_date"] = start_date, end_date
+
+    own_connection = conn is None
+    if own_connection:
+        conn = open_read_only_connection()
+    new_batches = {}
+    try:
+        ranges = split_date_range(conn, start_date, end_date)
+        for table_name in EXPORT_TABLES:
+            table_manifest = manifest["tables"].setdefault(table_name, {"last_id": 0, "batches": []})
+            # La foto de la tabla es su id máximo en la base principal y en las particiones del rango:
+            # lo que llegue (o se archive) después con un id mayor va en la próxima exportación
+            max_id = 0
+            for first_day, last_day in ranges:
+                with attached_partitions(conn, first_day, last_day):
+                    max_id = max(max_id, conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table_name}").fetchone()[0])
+            batches = []
+            for first_day, last_day in ranges:
+                range_start, range_end = range_bounds(first_day, last_day)
+                params = {"start": max(start, range_start), "end": min(end, range_end)}
+                with attached_partitions(conn, first_day, last_day):
+                    # Una transacción de lectura por tramo: el conteo y las filas del lote salen de la misma foto
+                    conn.execute("BEGIN")
+                    try:
+                        batch = export_table(conn, export_dir, table_name, table_manifest["last_id"], max_id, params)
+                    finally:
+                        conn.rollback()
+                if batch:
+                    batches.append(batch)
+            table_manifest["batches"] += batches
+            # Las filas hasta max_id que no entraron están fuera del rango y ya no van a entrar
+            table_manifest["last_id"] = max(table_manifest["last_id"], max_id)
+            new_batches[table_name] = batches
+            # Se guarda después de cada tabla: si algo falla, lo ya exportado no se repite
+            write_manifest(export_dir, manifest)
+    finally:
+        if own_connection:
+            conn.close()
+    return new_batches
+
+
+def iter_batches(export_dir, table_name, mmap=True):
+    """Genera cada lote exportado de una tabla como {columna: arreglo}, mapeado en memoria por defecto."""
+    _, columns = EXPORT_TABLES[table_name]
+    table_manifest = read_manifest(export_dir)["tables"].get(table_name, {"batches": []})
+    for batch in table_manifest["batches"]:
+        batch_dir = os.path.join(export_dir, batch["path"])
+        yield {
+            name: np.load(os.path.join(batch_dir, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name, _ in columns
+        }
+
+
+def load_table(export_dir, table_name):
+    """Une todos los lotes de una tabla en un solo {columna: arreglo}. Con un solo lote no copia nada."""
+    _, columns = EXPORT_TABLES[table_name]
+    batches = list(iter_batches(export_dir, table_name))
+    if len(batches) == 1:
+        return batches[0]
+    return {
+        name: np.concatenate([batch[name] for batch in batches]) if batches else np.empty(0, dtype=dtype)
+        for name, dtype in columns
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (1, 2, 4):
+        print("Uso: python -m utils.columnar_export [DIRECTORIO] [FECHA_INICIO FECHA_FIN]")
+        sys.exit(1)
+    target_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_EXPORT_DIR
+    dates = sys.argv[2:4] if len(sys.argv) == 4 else (None, None)
+    for exported_table, exported_batches in export_sales_columnar(target_dir, *dates).items():
+        print(f"{exported_table}: {sum(batch['rows'] for batch in exported_batches)} filas nuevas")
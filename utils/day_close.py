@@ -0,0 +1,239 @@
+# utils/day_close.py
+#
+# Cierre del día: un proceso por lotes que se corre al terminar la jornada (desde el módulo de cierre o
+# desde consola) y deja la base lista para el día siguiente. Pasos, en orden:
+#   rollups     recalcula los rollups del día desde las ventas (corrige cualquier desvío de los triggers)
+#   z_report    guarda el reporte Z del día (totales, descuentos e impuestos por tasa) con su número
+#   analytics   actualiza el pronóstico, el cubo de ventas y la canasta del día
+#   archive     mueve los meses cerrados a sus particiones mensuales (utils/partitions.py)
+#   compress    comprime las particiones de los meses más viejos (utils/cold_storage.py)
+#   statistics  actualiza las estadísticas del planificador (ANALYZE acotado y PRAGMA optimize)
+#   vacuum      devuelve páginas libres al sistema (incremental_vacuum) y vacía el WAL
+# Cada paso terminado se anota en day_close_steps con su duración; si el cierre se interrumpe,
+# volver a correrlo sigue desde el primer paso sin terminar. Todos los pasos se pueden repetir.
+# Uso desde consola:
+#   python -m utils.day_close [FECHA]
+
+import datetime
+import json
+import os
+import sys
+import time
+
+from config.translations import get_text
+from database import DB_FILE, claim_database_file, create_tables, close_db_connection, open_connection, rebuild_rollups
+from utils.backup import commit_to_disk
+from utils.basket_analysis import range_counts
+from utils.forecast import update_forecast
+from utils.partitions import archive_closed_months, attached_partitions, freeze_old_months
+from utils.sales_cube import update_cube
+
+ANALYSIS_LIMIT = 1000 # Filas que ANALYZE lee por índice: estadísticas aproximadas en milisegundos
+VACUUM_PAGES = 25600 # Páginas libres que se devuelven por cierre (100 MB con páginas de 4 KB)
+
+Z_REPORT_SQL = """
+    SELECT COUNT(*), COALESCE(SUM(total_amount), 0), COALESCE(SUM(tax_amount), 0), MIN(id), MAX(id)
+    FROM sales
+    WHERE sale_date >= :start AND sale_date < :end
+"""
+Z_DISCOUNTS_SQL = """
+    SELECT COALESCE(SUM(si.discount_amount), 0)
+    FROM sales s
+    JOIN sale_items si ON si.sale_id = s.id
+    WHERE s.sale_date >= :start AND s.sale_date < :end
+"""
+Z_TAXES_SQL = """
+    SELECT tax_rate_id, rate, SUM(taxable_amount), SUM(tax_amount)
+    FROM sale_taxes
+    WHERE sale_date >= :start AND sale_date < :end
+    GROUP BY tax_rate_id, rate
+    ORDER BY rate
+"""
+
+
+def day_bounds(day):
+    """Límites de sale_date de un día 'YYYY-MM-DD': [día 00:00:00, día siguiente 00:00:00)."""
+    following = datetime.date.fromisoformat(day) + datetime.timedelta(days=1)
+    return {"start": f"{day} 00:00:00", "end": f"{following} 00:00:00"}
+
+
+def finalize_rollups(conn, day):
+    rebuild_rollups(conn, day, day)
+    hours = conn.execute("SELECT COUNT(*) FROM rollup_sales_hourly WHERE day = ?", (day,)).fetchone()[0]
+    return {"hours": hours}
+
+
+def write_z_report(conn, day):
+    """Guarda el reporte Z del día si todavía no existe. No confirma: el cierre lo hace junto con el paso."""
+    existing = conn.execute("SELECT z_number, tickets FROM z_reports WHERE day = ?", (day,)).fetchone()
+    if existing:
+        return {"z_number": existing[0], "tickets": existing[1]}
+    params = day_bounds(day)
+    with attached_partitions(conn, day, day): # El día puede estar en un mes ya archivado
+        tickets, total_amount, tax_amount, first_sale_id, last_sale_id = conn.execute(Z_REPORT_SQL, params).fetchone()
+        discount_amount = conn.execute(Z_DISCOUNTS_SQL, params).fetchone()[0]
+        taxes = conn.execute(Z_TAXES_SQL, params).fetchall()
+    z_number = conn.execute("SELECT COALESCE(MAX(z_number), 0) + 1 FROM z_reports").fetchone()[0]
+    conn.execute(
+        "INSERT INTO z_reports (day, z_number, tickets, total_amount, tax_amount, discount_amount, first_sale_id, last_sale_id) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (day, z_number, tickets, total_amount, tax_amount, discount_amount, first_sale_id, last_sale_id),
+    )
+    conn.executemany(
+        "INSERT INTO z_report_taxes (day, tax_rate_id, rate, taxable_amount, tax_amount) VALUES (?, ?, ?, ?, ?)",
+        ((day, *row) for row in taxes),
+    )
+    return {"z_number": z_number, "tickets": tickets}
+
+
+def refresh_analytics(conn, day):
+    forecast = update_forecast(conn)
+    cube = update_cube(conn)
+    following = datetime.date.fromisoformat(day) + datetime.timedelta(days=1)
+    range_counts(conn, day, following.isoformat()) # Deja calculada la canasta del día
+    return {"products": len(forecast["product_ids"]), "days": cube.days}
+
+
+def archive_sales(conn, day):
+    moved = archive_closed_months(conn)
+    return {"months": len(moved), "sales": sum(moved.values())}
+
+
+def compress_partitions(conn, day):
+    frozen = freeze_old_months(conn)
+    saved = sum(db_bytes - cold_bytes for db_bytes, cold_bytes in frozen.values())
+    return {"months": len(frozen), "saved_mb": round(saved / 1048576, 1)}
+
+
+def refresh_statistics(conn, day):
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+    indexes = conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]
+    return {"indexes": indexes}
+
+
+def vacuum_database(conn, day):
+    """
+    Devuelve hasta VACUUM_PAGES páginas libres y vacía el WAL. Una base creada antes de auto_vacuum
+    incremental se convierte la primera vez con un VACUUM completo (más lento, una sola vez).
+    """
+    if conn.in_transaction:
+        conn.commit()
+    converted = conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+    if converted:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # El módulo sqlite3 reinicia tras el primer paso las sentencias sin columnas, y incremental_vacuum
+    # libera una página por paso: se ejecuta una vez por página, todo en una transacción
+    conn.execute("BEGIN")
+    for _ in range(min(free_pages, VACUUM_PAGES)):
+        conn.execute("PRAGMA incremental_vacuum")
+    conn.commit()
+    freed = free_pages - conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    return {"pages": freed, "size_mb": round(os.path.getsize(DB_FILE) / 1048576, 1), "converted": converted}
+
+
+# (nombre, función(conn, día) -> dict con las cifras del paso). El orden importa: el pronóstico y el
+# cubo leen los rollups ya recalculados, y el vacuum va al final para devolver lo que liberen los demás.
+CLOSE_STEPS = [
+    ("rollups", finalize_rollups),
+    ("z_report", write_z_report),
+    ("analytics", refresh_analytics),
+    ("archive", archive_sales),
+    ("compress", compress_partitions),
+    ("statistics", refresh_statistics),
+    ("vacuum", vacuum_database),
+]
+
+
+def close_status(conn, day):
+    """{paso: (segundos, cifras)} de los pasos ya terminados del cierre de un día."""
+    rows = conn.execute("SELECT step, seconds, detail FROM day_close_steps WHERE day = ?", (day,))
+    return {step: (seconds, json.loads(detail) if detail else {}) for step, seconds, detail in rows}
+
+
+def close_day(day=None, conn=None, progress=None):
+    """
+    Corre los pasos pendientes del cierre de un día ('YYYY-MM-DD', por defecto hoy). progress, si se
+    pasa, se llama como progress(paso, "running"|"done"|"skipped", segundos, cifras). Si no se pasa conn,
+    abre una conexión propia, así que se puede llamar desde un hilo secundario. Retorna el reporte Z.
+    Lanza ValueError si el día es posterior a hoy.
+    """
+    day = datetime.date.fromisoformat(day).isoformat() if day else datetime.date.today().isoformat()
+    if day > datetime.date.today().isoformat():
+        raise ValueError("No se puede cerrar un día futuro.")
+    own_connection = conn is None
+    if own_connection:
+        conn = open_connection()
+    try:
+        done = close_status(conn, day)
+        for step, function in CLOSE_STEPS:
+            if step in done:
+                if progress:
+                    progress(step, "skipped", *done[step])
+                continue
+            if progress:
+                progress(step, "running", 0, {})
+            started = time.perf_counter()
+            detail = function(conn, day)
+            seconds = time.perf_counter() - started
+            # El paso queda anotado en la misma transacción que sus cambios (si el paso no confirmó antes).
+            # En modo en memoria estas escrituras no van al journal: cada paso terminado se copia a disco,
+            # y un corte en el medio de uno solo pierde ese paso, que el próximo cierre vuelve a correr
+            conn.execute("INSERT OR REPLACE INTO day_close_steps (day, step, seconds, detail) VALUES (?, ?, ?, ?)",
+                         (day, step, seconds, json.dumps(detail)))
+            commit_to_disk(conn)
+            if progress:
+                progress(step, "done", seconds, detail)
+        return load_z_report(conn, day)
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        if own_connection:
+            conn.close()
+
+
+def load_z_report(conn, day):
+    """Reporte Z guardado de un día como dict (con "taxes": [(tasa, base, impuesto)]), o None."""
+    row = conn.execute(
+        "SELECT z_number, tickets, total_amount, tax_amount, discount_amount, first_sale_id, last_sale_id, created_at "
+        "FROM z_reports WHERE day = ?", (day,),
+    ).fetchone()
+    if row is None:
+        return None
+    keys = ("z_number", "tickets", "total_amount", "tax_amount", "discount_amount", "first_sale_id", "last_sale_id", "created_at")
+    report = dict(zip(keys, row), day=day)
+    report["taxes"] = conn.execute(
+        "SELECT rate, taxable_amount, tax_amount FROM z_report_taxes WHERE day = ? ORDER BY rate", (day,),
+    ).fetchall()
+    return report
+
+
+def step_detail_text(step, detail):
+    """Cifras de un paso en el idioma actual."""
+    return get_text(f"close_detail_{step}").format(**detail) if detail else ""
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        print("Uso: python -m utils.day_close [FECHA]")
+        sys.exit(1)
+    try:
+        claim_database_file() # No con la aplicación abierta en modo en memoria: su próxima copia a disco borraría esto
+    except RuntimeError as e:
+        sys.exit(str(e))
+    create_tables()
+    close_db_connection()
+
+    def print_progress(step, status, seconds, detail):
+        if status != "running":
+            print(f"{get_text(f'close_step_{step}'):<28} {seconds:8.2f} s  {step_detail_text(step, detail)}"
+                  + (f"  ({get_text('close_status_skipped')})" if status == "skipped" else ""))
+
+    z_report = close_day(sys.argv[1] if len(sys.argv) == 2 else None, progress=print_progress)
+    print(get_text("msg_day_closed").format(day=z_report["day"], z_number=z_report["z_number"], tickets=z_report["tickets"]))
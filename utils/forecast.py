@@ -0,0 +1,189 @@
+# utils/forecast.py
+#
+# Pronóstico de demanda por producto y hora de la semana (lunes 00h = 0 ... domingo 23h = 167).
+# Para cada producto y hora de la semana, el pronóstico es el promedio con suavizado exponencial
+# de lo vendido en esa hora las semanas anteriores: la semana más reciente pesa SMOOTHING, la
+# anterior SMOOTHING * (1 - SMOOTHING), etc. Se calcula sobre rollup_product_hourly para todo el
+# catálogo a la vez con NumPy (sin un bucle por producto).
+#
+# Los parámetros ajustados (suma ponderada por producto y hora, primer día de venta de cada producto
+# y último día incluido) se guardan en FORECAST_DIR/params.npz. Cada actualización solo lee los días
+# nuevos: la suma guardada se descuenta por los días transcurridos y se le suman los nuevos, lo que
+# da exactamente lo mismo que ajustar desde cero. Uso desde consola (p. ej. cada noche):
+#   python -m utils.forecast update
+
+import datetime
+import itertools
+import os
+import sys
+
+import numpy as np
+
+from database import DB_DIR, open_read_only_connection
+
+FORECAST_DIR = os.path.join(DB_DIR, "forecast")
+PARAMS_FILE = "params.npz"
+SMOOTHING = 0.2 # Peso de la semana más reciente
+HOURS_OF_WEEK = 168
+MIN_FORECAST_QUANTITY = 0.05 # Por debajo de esto no se muestra en el reporte
+EPOCH = datetime.date(1970, 1, 1)
+
+# Cantidad vendida por producto (todas sus variantes), día y hora, de los días (after, until].
+# El día se convierte a días desde 1970-01-01 en SQLite. El GROUP BY sigue el orden de la clave primaria
+# del rollup, así que no hace falta ordenar.
+HOURLY_SQL = """
+    SELECT product_id, CAST(julianday(day) - 2440587.5 AS INTEGER), hour, SUM(quantity)
+    FROM rollup_product_hourly
+    WHERE day > :after AND day <= :until
+    GROUP BY day, hour, product_id
+"""
+
+
+def epoch_day(day):
+    """Días desde 1970-01-01 de una fecha (date o 'YYYY-MM-DD')."""
+    if isinstance(day, str):
+        day = datetime.date.fromisoformat(day)
+    return (day - EPOCH).days
+
+
+def empty_params(smoothing=SMOOTHING):
+    return {
+        "product_ids": np.empty(0, dtype=np.int64),
+        "weighted": np.zeros((0, HOURS_OF_WEEK)), # Suma de cantidades ponderadas por antigüedad
+        "first_day": np.empty(0, dtype=np.int64), # Primer día con ventas de cada producto
+        "as_of": -1, # Último día incluido (días desde 1970-01-01); -1 = nada ajustado
+        "smoothing": smoothing,
+    }
+
+
+def daily_decay(smoothing):
+    """Factor por día equivalente a multiplicar por (1 - smoothing) cada semana."""
+    return (1 - smoothing) ** (1 / 7)
+
+
+def update_params(params, conn, until):
+    """
+    Agrega a params las ventas de los días posteriores a params["as_of"] hasta until (días desde 1970-01-01).
+    Retorna params actualizado (los arreglos pueden ser nuevos si aparecieron productos).
+    """
+    after = params["as_of"]
+    if until <= after:
+        return params
+    rows = conn.execute(HOURLY_SQL, {
+        "after": (EPOCH + datetime.timedelta(days=after)).isoformat() if after >= 0 else "",
+        "until": (EPOCH + datetime.timedelta(days=until)).isoformat(),
+    }).fetchall()
+    data = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64, count=len(rows) * 4).reshape(-1, 4)
+    product_ids, days = data[:, 0].astype(np.int64), data[:, 1].astype(np.int64)
+    hours, quantities = data[:, 2].astype(np.int64), data[:, 3]
+
+    # Productos nuevos: se agregan filas vacías manteniendo product_ids ordenado
+    known_ids = params["product_ids"]
+    all_ids = np.union1d(known_ids, product_ids)
+    weighted = np.zeros((len(all_ids), HOURS_OF_WEEK))
+    first_day = np.full(len(all_ids), np.iinfo(np.int64).max)
+    positions = np.searchsorted(all_ids, known_ids)
+    weighted[positions] = params["weighted"]
+    first_day[positions] = params["first_day"]
+
+    decay = daily_decay(params["smoothing"])
+    weighted *= decay ** (until - max(after, 0)) # Lo ya acumulado envejece los días transcurridos
+    rows_index = np.searchsorted(all_ids, product_ids)
+    slots = rows_index * HOURS_OF_WEEK + ((days + 3) % 7) * 24 + hours # 1970-01-01 fue jueves
+    weighted += np.bincount(slots, weights=quantities * decay ** (until - days),
+                            minlength=weighted.size).reshape(weighted.shape)
+    np.minimum.at(first_day, rows_index, days)
+    return dict(params, product_ids=all_ids, weighted=weighted, first_day=first_day, as_of=until)
+
+
+def demand_levels(params):
+    """
+    Demanda esperada por producto y hora de la semana: la suma ponderada dividida por la suma de
+    los pesos de las semanas en que el producto ya existía. Retorna un arreglo (productos, 168).
+    """
+    if params["as_of"] < 0 or len(params["product_ids"]) == 0:
+        return np.zeros((len(params["product_ids"]), HOURS_OF_WEEK))
+    keep = 1 - params["smoothing"]
+    as_of = params["as_of"]
+    weekday_of_slot = np.arange(HOURS_OF_WEEK) // 24
+    # Días entre as_of y la última vez que hubo ese día de la semana (0..6)
+    last_age = (((as_of + 3) % 7) - weekday_of_slot) % 7
+    # Cuántas veces hubo ese día de la semana desde la primera venta de cada producto
+    occurrences = np.maximum((as_of - last_age[None, :] - params["first_day"][:, None]) // 7 + 1, 0)
+    weights = keep ** (last_age[None, :] / 7) * (1 - keep ** occurrences) / params["smoothing"]
+    return np.divide(params["weighted"], weights, out=np.zeros_like(params["weighted"]), where=weights > 0)
+
+
+def load_params(forecast_dir=FORECAST_DIR):
+    path = os.path.join(forecast_dir, PARAMS_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as params_file:
+        params = {name: params_file[name] for name in params_file.files}
+    params["as_of"] = int(params["as_of"])
+    params["smoothing"] = float(params["smoothing"])
+    return params
+
+
+def save_params(params, forecast_dir=FORECAST_DIR):
+    os.makedirs(forecast_dir, exist_ok=True)
+    path = os.path.join(forecast_dir, PARAMS_FILE)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as params_file:
+        np.savez(params_file, **params)
+    os.replace(temp_path, path)
+
+
+def update_forecast(conn=None, until=None, smoothing=SMOOTHING, forecast_dir=FORECAST_DIR):
+    """
+    Actualiza y guarda los parámetros hasta el día until ('YYYY-MM-DD', por defecto ayer: el día en curso
+    está incompleto). Si no había parámetros o cambió smoothing, ajusta desde cero. Retorna los parámetros.
+    """
+    until_day = epoch_day(until) if until else epoch_day(datetime.date.today()) - 1
+    params = load_params(forecast_dir)
+    if params is None or params["smoothing"] != smoothing or params["as_of"] > until_day:
+        params = empty_params(smoothing)
+    own_connection = conn is None
+    if own_connection:
+        conn = open_read_only_connection()
+    try:
+        if params["as_of"] < until_day:
+            params = update_params(params, conn, until_day)
+            save_params(params, forecast_dir)
+    finally:
+        if own_connection:
+            conn.close()
+    return params
+
+
+def forecast_report(conn, start_date, end_date, lang):
+    """
+    Filas (producto, hora, cantidad esperada) de la demanda pronosticada sumada sobre los días
+    start_date..end_date, por hora del día. Para el reporte 'demand_forecast' de REPORTS.
+    """
+    params = update_forecast(conn)
+    levels = demand_levels(params)
+    start, end = epoch_day(start_date), epoch_day(end_date)
+    # Cada día del rango suma la demanda de las 24 horas de su día de la semana
+    weekdays, day_counts = np.unique((np.arange(start, end + 1) + 3) % 7, return_counts=True)
+    by_hour = np.zeros((levels.shape[0], 24))
+    for weekday, day_count in zip(weekdays, day_counts):
+        by_hour += day_count * levels[:, weekday * 24:(weekday + 1) * 24]
+
+    product_rows, hours = np.nonzero(by_hour >= MIN_FORECAST_QUANTITY)
+    quantities = by_hour[product_rows, hours]
+    order = np.lexsort((-quantities, hours)) # Por hora y, dentro de cada hora, de mayor a menor
+    name_column = "name_en" if lang == "en" else "name_es"
+    names = dict(conn.execute(f"SELECT id, {name_column} FROM products"))
+    product_ids = params["product_ids"][product_rows[order]].tolist()
+    return [
+        (names.get(product_id, f"#{product_id}"), f"{hour:02d}:00", f"{quantity:.1f}")
+        for product_id, hour, quantity in zip(product_ids, hours[order].tolist(), quantities[order].tolist())
+    ]
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3) or sys.argv[1] != "update":
+        print("Uso: python -m utils.forecast update [HASTA_FECHA]")
+        sys.exit(1)
+    updated = update_forecast(until=sys.argv[2] if len(sys.argv) == 3 else None)
+    print(f"Pronóstico actualizado hasta {EPOCH + datetime.timedelta(days=updated['as_of'])}: {len(updated['product_ids'])} productos")
@@ -0,0 +1,115 @@
+# utils/live_sales.py
+#
+# Totales del día en curso para el tablero en vivo, actualizados por diferencias: cada consulta
+# solo lee las filas con id mayor al último visto, y si PRAGMA data_version no cambió desde la
+# consulta anterior (nadie escribió en la base), no se consulta nada.
+# El cobro guarda la venta, sus ítems y sus modificadores en una sola transacción
+# (database.write_transaction), pero poll() lee las tres tablas con consultas separadas: un cobro que
+# termina entre una y otra aparece en unas tablas en este poll y en las demás en el siguiente. Por eso
+# cada tabla lleva su propio último id visto, y nada se cuenta dos veces ni se pierde.
+
+import datetime
+import heapq
+
+from database import open_read_only_connection
+
+NEW_SALES_SQL = """
+    SELECT id, total_amount, tax_amount
+    FROM sales
+    WHERE id > :last_id AND sale_date >= :day_start AND sale_date < :day_end
+    ORDER BY id
+"""
+
+NEW_ITEMS_SQL = """
+    SELECT si.id, si.product_id, si.quantity, si.quantity * si.price_at_sale - si.discount_amount
+    FROM sale_items si
+    JOIN sales s ON s.id = si.sale_id
+    WHERE si.id > :last_id AND s.sale_date >= :day_start AND s.sale_date < :day_end
+    ORDER BY si.id
+"""
+
+# Los modificadores suman su precio por cada unidad del ítem
+NEW_MODIFIERS_SQL = """
+    SELECT sim.id, si.product_id, sim.quantity * sim.price_at_sale * si.quantity
+    FROM sale_item_modifiers sim
+    JOIN sale_items si ON si.id = sim.sale_item_id
+    JOIN sales s ON s.id = si.sale_id
+    WHERE sim.id > :last_id AND s.sale_date >= :day_start AND s.sale_date < :day_end
+    ORDER BY sim.id
+"""
+
+# Primer id de cada tabla que puede pertenecer al día (los ids crecen con el tiempo)
+FIRST_IDS_SQL = """
+    SELECT
+        (SELECT COALESCE(MIN(id), (SELECT COALESCE(MAX(id), 0) + 1 FROM sales)) FROM sales WHERE sale_date >= :day_start),
+        (SELECT COALESCE(MIN(si.id), (SELECT COALESCE(MAX(id), 0) + 1 FROM sale_items))
+         FROM sale_items si WHERE si.sale_id >= (SELECT MIN(id) FROM sales WHERE sale_date >= :day_start)),
+        (SELECT COALESCE(MIN(sim.id), (SELECT COALESCE(MAX(id), 0) + 1 FROM sale_item_modifiers))
+         FROM sale_item_modifiers sim WHERE sim.sale_item_id >= (
+             SELECT MIN(si.id) FROM sale_items si WHERE si.sale_id >= (SELECT MIN(id) FROM sales WHERE sale_date >= :day_start)))
+"""
+
+
+class LiveSalesTracker:
+    """
+    Ventas del día en memoria: total, impuestos, tickets y cantidad/importe por producto (centavos).
+    poll() incorpora lo nuevo y retorna True si algo cambió. Usa su propia conexión de solo lectura:
+    PRAGMA data_version solo cambia con los commits de otras conexiones (la del cobro es la global).
+    """
+
+    def __init__(self, conn=None):
+        self.conn = conn or open_read_only_connection(live=True) # En modo en memoria, sin esperar a la copia a disco
+        self.data_version = None
+        self.day = None
+        self.reset(datetime.date.today())
+
+    def reset(self, day):
+        """Empieza de cero los totales de un día y ubica los primeros ids que le pueden pertenecer."""
+        self.day = day
+        self.params = {"day_start": f"{day} 00:00:00", "day_end": f"{day + datetime.timedelta(days=1)} 00:00:00"}
+        self.revenue = 0
+        self.tax = 0
+        self.tickets = 0
+        self.products = {} # {product_id: [cantidad, importe]}
+        first_sale, first_item, first_modifier = self.conn.execute(FIRST_IDS_SQL, self.params).fetchone()
+        self.last_sale_id = first_sale - 1
+        self.last_item_id = first_item - 1
+        self.last_modifier_id = first_modifier - 1
+        self.data_version = None # Fuerza la primera lectura
+
+    def poll(self):
+        """Lee solo las filas nuevas y las suma a los totales. Retorna True si hubo cambios."""
+        today = datetime.date.today()
+        if today != self.day:
+            self.reset(today)
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self.data_version:
+            return False # Nadie escribió desde la última consulta
+        self.data_version = data_version
+
+        changed = False
+        for sale_id, total_amount, tax_amount in self.conn.execute(NEW_SALES_SQL, dict(self.params, last_id=self.last_sale_id)):
+            self.revenue += total_amount
+            self.tax += tax_amount
+            self.tickets += 1
+            self.last_sale_id = sale_id
+            changed = True
+        for item_id, product_id, quantity, amount in self.conn.execute(NEW_ITEMS_SQL, dict(self.params, last_id=self.last_item_id)):
+            totals = self.products.setdefault(product_id, [0, 0])
+            totals[0] += quantity
+            totals[1] += amount
+            self.last_item_id = item_id
+            changed = True
+        for modifier_id, product_id, amount in self.conn.execute(NEW_MODIFIERS_SQL, dict(self.params, last_id=self.last_modifier_id)):
+            self.products.setdefault(product_id, [0, 0])[1] += amount
+            self.last_modifier_id = modifier_id
+            changed = True
+        return changed
+
+    def top_products(self, count=10):
+        """[(product_id, cantidad, importe)] de los productos con más importe del día."""
+        return heapq.nlargest(count, ((product_id, quantity, amount) for product_id, (quantity, amount) in self.products.items()),
+                              key=lambda row: row[2])
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,220 @@
+# utils/order_cart.py
+
+import sqlite3
+
+from database import write_transaction
+from models import Money, Sale, SaleItem, SaleItemModifier, SaleTax
+from utils.sketches import record_sale
+
+
+def make_config_key(product, variant=None, modifiers=()):
+    """
+    Clave canónica de una configuración de ítem: (product_id, variant_id, ((modifier_id, cantidad), ...)).
+    Los modificadores se ordenan por id y se suman si se repiten, así que dos configuraciones
+    iguales producen siempre la misma clave sin importar el orden de selección.
+    """
+    mod_quantities = {}
+    for modifier, mod_qty in modifiers:
+        mod_quantities[modifier.id] = mod_quantities.get(modifier.id, 0) + mod_qty
+    return (product.id, variant.id if variant else None, tuple(sorted(mod_quantities.items())))
+
+
+def normalize_modifiers(modifiers):
+    """Une los modificadores repetidos y los ordena por id. Retorna una tupla de (modifier_obj, cantidad)."""
+    merged = {}
+    for modifier, mod_qty in modifiers:
+        if modifier.id in merged:
+            merged[modifier.id] = (merged[modifier.id][0], merged[modifier.id][1] + mod_qty)
+        else:
+            merged[modifier.id] = (modifier, mod_qty)
+    return tuple(merged[mod_id] for mod_id in sorted(merged))
+
+
+class OrderLine:
+    """
+    Una línea del pedido: producto, variante opcional, modificadores y cantidad.
+    Los importes (unit_price, modifiers_price, line_total) son enteros en centavos.
+    """
+    __slots__ = ("line_id", "config_key", "product", "variant", "modifiers", "quantity", "unit_price", "modifiers_price", "line_total")
+
+    def __init__(self, line_id, product, variant, modifiers, quantity):
+        self.line_id = line_id
+        self.config_key = make_config_key(product, variant, modifiers)
+        self.product = product
+        self.variant = variant
+        self.modifiers = modifiers # Tupla de (modifier_obj, cantidad) por unidad del ítem
+        self.quantity = quantity
+        # Precio unitario del producto/variante sin modificadores
+        self.unit_price = product.base_price.cents + (variant.price_adjustment.cents if variant else 0)
+        # Precio de los modificadores por unidad del ítem
+        self.modifiers_price = sum(modifier.price.cents * mod_qty for modifier, mod_qty in modifiers)
+        self.line_total = (self.unit_price + self.modifiers_price) * quantity
+
+    def __repr__(self):
+        return f"<OrderLine ID={self.line_id} product={self.product.id} variant={self.variant.id if self.variant else None} qty={self.quantity}>"
+
+
+class OrderCart:
+    """
+    Estado del pedido actual, independiente de la interfaz.
+    Mantiene el subtotal de forma incremental, así que añadir, quitar o cambiar la cantidad
+    de una línea cuesta lo mismo sin importar cuántas líneas tenga el pedido.
+    Las configuraciones idénticas (mismo producto, variante y modificadores) se unen en una sola línea.
+    Todos los importes se llevan como enteros en centavos; usa Money(...) para mostrarlos.
+    """
+
+    def __init__(self):
+        self.lines = {} # {line_id: OrderLine}, en orden de inserción
+        self.lines_by_key = {} # {config_key: line_id}
+        self.next_line_id = 1
+        self.subtotal = 0
+        self.discount = 0 # Descuento de las reglas de precio (ver apply_pricing)
+        self.line_discounts = {} # {line_id: descuento}
+        self.taxes = None # TaxResult del último apply_taxes
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines.values())
+
+    @property
+    def total(self):
+        # Los impuestos incluidos en el precio ya están en el subtotal; solo se suman los no incluidos
+        exclusive_tax = self.taxes.exclusive_tax if self.taxes else 0
+        return self.subtotal - self.discount + exclusive_tax
+
+    @property
+    def tax_amount(self):
+        return self.taxes.total_tax if self.taxes else 0
+
+    def apply_pricing(self, pricing_engine, now=None):
+        """Evalúa las reglas de precio sobre todo el pedido y guarda los descuentos resultantes."""
+        result = pricing_engine.evaluate(self, now)
+        self.line_discounts = result.line_discounts
+        self.discount = result.total_discount
+        return result
+
+    def apply_taxes(self, tax_table):
+        """Calcula los impuestos del pedido (después de los descuentos) con una TaxTable."""
+        self.taxes = tax_table.compute(self)
+        return self.taxes
+
+    def get_line(self, line_id):
+        return self.lines.get(line_id)
+
+    def add_item(self, product, variant=None, modifiers=(), quantity=1):
+        """
+        Añade un ítem al pedido y retorna su línea. modifiers es una secuencia de (modifier_obj, cantidad).
+        Si ya existe una línea con la misma configuración, se le suma la cantidad en lugar de crear otra.
+        """
+        if quantity <= 0:
+            raise ValueError("La cantidad debe ser un número positivo.")
+        modifiers = normalize_modifiers(modifiers)
+        existing_line_id = self.lines_by_key.get(make_config_key(product, variant, modifiers))
+        if existing_line_id is not None:
+            return self.set_quantity(existing_line_id, self.lines[existing_line_id].quantity + quantity)
+
+        line = OrderLine(self.next_line_id, product, variant, modifiers, quantity)
+        self.next_line_id += 1
+        self.lines[line.line_id] = line
+        self.lines_by_key[line.config_key] = line.line_id
+        self.subtotal += line.line_total
+        return line
+
+    def remove_line(self, line_id):
+        """Quita una línea del pedido y la retorna (None si no existe)."""
+        line = self.lines.pop(line_id, None)
+        if line is not None:
+            del self.lines_by_key[line.config_key]
+            self.subtotal -= line.line_total
+        return line
+
+    def set_quantity(self, line_id, quantity):
+        """Cambia la cantidad de una línea. Una cantidad de 0 o menos quita la línea."""
+        line = self.lines.get(line_id)
+        if line is None:
+            return None
+        if quantity <= 0:
+            return self.remove_line(line_id)
+        new_total = (line.unit_price + line.modifiers_price) * quantity
+        self.subtotal += new_total - line.line_total
+        line.quantity = quantity
+        line.line_total = new_total
+        return line
+
+    def clear(self):
+        self.lines = {}
+        self.lines_by_key = {}
+        self.subtotal = 0
+        self.discount = 0
+        self.line_discounts = {}
+        self.taxes = None
+
+    def to_sale_records(self):
+        """
+        Serializa el pedido en la forma en que se guarda en sale_items / sale_item_modifiers.
+        Retorna una lista de diccionarios, uno por configuración distinta (un sale_item por clave),
+        con los importes como Money.
+        """
+        # Las líneas ya están unidas por config_key, así que cada una es un único sale_item
+        return [{
+            "product_id": line.product.id,
+            "variant_id": line.variant.id if line.variant else None,
+            "quantity": line.quantity,
+            "price_at_sale": Money.from_cents(line.unit_price), # Precio base del item (prod+var), los modificadores van aparte
+            "discount_amount": Money.from_cents(self.line_discounts.get(line.line_id, 0)),
+            "modifiers": [
+                {"modifier_id": modifier.id, "quantity": mod_qty, "price_at_sale": modifier.price}
+                for modifier, mod_qty in line.modifiers
+            ],
+        } for line in self.lines.values()]
+
+    def save_sale(self):
+        """
+        Guarda el pedido como una venta (Sale + SaleItem + SaleItemModifier + SaleTax) en una sola
+        transacción: si alguna escritura falla no queda nada guardado. Retorna el objeto Sale guardado,
+        o None si la venta no se pudo guardar.
+        """
+        if not self.lines:
+            return None
+
+        records = self.to_sale_records()
+        try:
+            # En modo en memoria la venta entera es un solo registro del journal (ver database.write_transaction)
+            with write_transaction():
+                sale = Sale(total_amount=Money.from_cents(self.total), tax_amount=Money.from_cents(self.tax_amount))
+                sale.save()
+                for record in records:
+                    sale_item = SaleItem(
+                        sale_id=sale.id,
+                        product_id=record["product_id"],
+                        variant_id=record["variant_id"],
+                        quantity=record["quantity"],
+                        price_at_sale=record["price_at_sale"],
+                        discount_amount=record["discount_amount"]
+                    )
+                    sale_item.save()
+                    for mod_record in record["modifiers"]:
+                        SaleItemModifier(sale_item_id=sale_item.id, **mod_record).save()
+
+                # Totales por tasa, para que los reportes de impuestos no tengan que recalcular las líneas
+                for tax_line in (self.taxes.lines.values() if self.taxes else ()):
+                    SaleTax(
+                        sale_id=sale.id,
+                        tax_rate_id=tax_line.tax_rate_id,
+                        sale_date=sale.sale_date,
+                        rate=tax_line.rate,
+                        taxable_amount=Money.from_cents(tax_line.taxable_amount),
+                        tax_amount=Money.from_cents(tax_line.tax_amount)
+                    ).save()
+        except sqlite3.Error as e:
+            print(f"Error al guardar la venta: {e}")
+            return None
+
+        # Sketches por hora para los tableros en vivo; un fallo aquí no debe anular una venta ya guardada
+        try:
+            record_sale(sale.id, sale.sale_date, sale.total_amount, sum(record["quantity"] for record in records))
+        except sqlite3.Error as e:
+            print(f"Error al actualizar los sketches de ventas: {e}")
+        return sale
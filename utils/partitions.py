@@ -0,0 +1,325 @@
+# utils/partitions.py
+#
+# Particiones mensuales de las ventas. Los meses cerrados (anteriores al período en curso) de sales,
+# sale_items, sale_item_modifiers y sale_taxes se mueven por lotes a un archivo SQLite por mes en
+# ARCHIVE_DIR, anotado en la tabla sales_partitions. La base en uso queda solo con el período actual.
+# Los rollups se quedan en la base principal, así que los reportes no cambian.
+#
+# Para leer ventas archivadas, attached_partitions(conn, inicio, fin) adjunta (ATTACH) solo los meses
+# del rango y crea vistas TEMP con los mismos nombres de las tablas, que unen la base principal y esas
+# particiones (UNION ALL). Las consultas existentes funcionan sin cambios y solo leen los archivos de
+# los meses que tocan. Las vistas TEMP tapan a las tablas para toda la conexión: usarlo solo en
+# conexiones de lectura, nunca en la global.
+#
+# Mover un lote son dos transacciones: primero se copia a la partición (INSERT OR IGNORE, se puede
+# repetir) y después se borra de la base principal junto con el último id movido del catálogo. Si algo
+# se corta entre las dos, las vistas ignoran las filas copiadas después de ese id y volver a archivar
+# termina el mes.
+#
+# Los meses más viejos que los WARM_MONTHS archivados más recientes se comprimen (utils/cold_storage.py):
+# el catálogo pasa a storage 'cold' y el archivo SQLite se reemplaza por el comprimido. Al leerlos,
+# attached_partitions() adjunta una copia descomprimida que se reutiliza entre consultas.
+# Antes de borrar un archivo, el cambio del catálogo se lleva a disco (commit_to_disk: en modo en memoria
+# la base en uso se copia a DB_FILE), para que un corte nunca deje al catálogo apuntando a un archivo borrado.
+# Uso desde consola:
+#   python -m utils.partitions archive|compress|list
+
+import contextlib
+import datetime
+import json
+import os
+import sys
+
+from database import DB_DIR, TABLE_DEFINITIONS, INDEX_DEFINITIONS, claim_database_file, create_tables, close_db_connection, get_db_connection
+from utils.backup import commit_to_disk
+from utils.cold_storage import COMPRESSION, freeze_database, thaw_database, thawed_path
+
+ARCHIVE_DIR = os.path.join(DB_DIR, "archive")
+PARTITIONED_TABLES = ("sales", "sale_items", "sale_item_modifiers", "sale_taxes")
+HOT_MONTHS = 1 # Meses que quedan en la base en uso: el actual
+WARM_MONTHS = 3 # Meses archivados más recientes que quedan sin comprimir (los que más se consultan)
+MOVE_BATCH_SALES = 2000 # Ventas por lote: cada borrado retiene el bloqueo de escritura unos milisegundos
+MAX_ATTACHED = 10 # Límite de bases adjuntas por conexión de SQLite (SQLITE_MAX_ATTACHED por defecto)
+
+# Filas de cada tabla que pertenecen a un lote de ventas (ids en :ids como JSON)
+BATCH_FILTERS = {
+    "sales": "id IN (SELECT value FROM json_each(:ids))",
+    "sale_items": "sale_id IN (SELECT value FROM json_each(:ids))",
+    "sale_item_modifiers": "sale_item_id IN (SELECT id FROM main.sale_items WHERE sale_id IN (SELECT value FROM json_each(:ids)))",
+    "sale_taxes": "sale_id IN (SELECT value FROM json_each(:ids))",
+}
+
+# Los modificadores se borran antes que sus ítems: su filtro pasa por main.sale_items
+DELETE_ORDER = ("sale_item_modifiers", "sale_items", "sale_taxes", "sales")
+
+# Filas de una partición ya movidas (id de venta <= moved_until_id). Solo hace falta mientras el mes está
+# en 'moving': una partición 'archived' no tiene copias pendientes de borrar en la base principal.
+MOVED_FILTERS = {
+    "sales": "id <= {moved}",
+    "sale_items": "sale_id <= {moved}",
+    "sale_item_modifiers": "sale_item_id IN (SELECT id FROM {schema}.sale_items WHERE sale_id <= {moved})",
+    "sale_taxes": "sale_id <= {moved}",
+}
+
+
+def month_bounds(month):
+    """Límites de sale_date de un mes 'AAAA-MM': ('AAAA-MM-01', primer día del mes siguiente)."""
+    first = datetime.date.fromisoformat(f"{month}-01")
+    following = (first + datetime.timedelta(days=32)).replace(day=1)
+    return first.isoformat(), following.isoformat()
+
+
+def partition_path(month, archive_dir=ARCHIVE_DIR):
+    return os.path.join(archive_dir, f"sales_{month.replace('-', '_')}.db")
+
+
+def cold_partition_path(month, archive_dir=ARCHIVE_DIR):
+    return os.path.join(archive_dir, f"sales_{month.replace('-', '_')}.zip")
+
+
+def table_columns(conn, schema, table_name):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table_name})")]
+
+
+def create_partition_tables(conn, schema):
+    """Crea en una base adjunta las tablas particionadas y sus índices, con las mismas columnas que la principal."""
+    for table_name in PARTITIONED_TABLES:
+        conn.execute(TABLE_DEFINITIONS[table_name].replace("IF NOT EXISTS ", f"IF NOT EXISTS {schema}.", 1))
+    for index_sql in INDEX_DEFINITIONS:
+        if any(f" ON {table_name} (" in index_sql for table_name in PARTITIONED_TABLES):
+            conn.execute(index_sql.replace("IF NOT EXISTS ", f"IF NOT EXISTS {schema}.", 1))
+
+
+def first_recent_month(months, today=None):
+    """Primer mes 'AAAA-MM' de los months más recientes (contando el actual)."""
+    today = today or datetime.date.today()
+    month_index = today.year * 12 + today.month - 1 - (months - 1)
+    return f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+
+
+def closed_months(conn, hot_months=HOT_MONTHS, today=None):
+    """Meses 'AAAA-MM' con ventas en la base principal anteriores a los hot_months más recientes."""
+    hot_start = first_recent_month(hot_months, today) + "-01"
+    rows = conn.execute("SELECT DISTINCT substr(sale_date, 1, 7) FROM main.sales WHERE sale_date < ? ORDER BY 1", (hot_start,))
+    return [row[0] for row in rows]
+
+
+def archive_month(conn, month, archive_dir=ARCHIVE_DIR, batch_size=MOVE_BATCH_SALES):
+    """
+    Mueve las ventas de un mes a su partición, de a batch_size ventas. Se puede repetir (p. ej. tras un
+    corte, o si después entraron ventas con fecha de ese mes). Retorna el número de ventas movidas.
+    """
+    start, end = month_bounds(month)
+    path = partition_path(month, archive_dir)
+    os.makedirs(archive_dir, exist_ok=True)
+    if conn.in_transaction:
+        conn.commit()
+    warm_month(conn, month, archive_dir) # Ventas nuevas con fecha de un mes ya comprimido
+    conn.execute(
+        "INSERT INTO sales_partitions (month, file_name, status) VALUES (?, ?, 'moving') "
+        "ON CONFLICT (month) DO UPDATE SET status = 'moving'",
+        (month, os.path.basename(path)),
+    )
+    conn.commit()
+
+    conn.execute("ATTACH DATABASE ? AS partition_db", (path,))
+    moved = 0
+    try:
+        create_partition_tables(conn, "partition_db")
+        conn.commit()
+        columns = {table_name: ", ".join(table_columns(conn, "main", table_name)) for table_name in PARTITIONED_TABLES}
+        while True:
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM main.sales WHERE sale_date >= ? AND sale_date < ? ORDER BY id LIMIT ?", (start, end, batch_size))]
+            if not ids:
+                break
+            params = {"ids": json.dumps(ids)}
+            # 1) Copia a la partición (solo escribe en la partición: su transacción es atómica)
+            conn.execute("BEGIN")
+            for table_name in PARTITIONED_TABLES:
+                conn.execute(f"INSERT OR IGNORE INTO partition_db.{table_name} ({columns[table_name]}) "
+                             f"SELECT {columns[table_name]} FROM main.{table_name} WHERE {BATCH_FILTERS[table_name]}", params)
+            conn.commit()
+            # 2) Borrado en la base principal junto con el avance del catálogo
+            conn.execute("BEGIN")
+            for table_name in DELETE_ORDER:
+                conn.execute(f"DELETE FROM main.{table_name} WHERE {BATCH_FILTERS[table_name]}", params)
+            conn.execute("UPDATE sales_partitions SET moved_until_id = MAX(moved_until_id, ?) WHERE month = ?", (ids[-1], month))
+            conn.commit()
+            moved += len(ids)
+
+        first_sale, last_sale, count = conn.execute(
+            "SELECT MIN(sale_date), MAX(sale_date), COUNT(*) FROM partition_db.sales").fetchone()
+        conn.execute(
+            "UPDATE sales_partitions SET status = 'archived', sales = ?, first_sale_date = ?, last_sale_date = ?, "
+            "archived_at = CURRENT_TIMESTAMP WHERE month = ?",
+            (count, first_sale, last_sale, month),
+        )
+        conn.commit()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.execute("DETACH DATABASE partition_db")
+    conn.execute("UPDATE sales_partitions SET size_bytes = ? WHERE month = ?", (os.path.getsize(path), month))
+    conn.commit()
+    return moved
+
+
+def freeze_month(conn, month, archive_dir=ARCHIVE_DIR, compression=COMPRESSION):
+    """
+    Comprime la partición archivada de un mes y borra su archivo SQLite. El catálogo apunta al archivo
+    comprimido antes de borrar el otro, así que un corte en el medio solo deja un archivo de más.
+    Retorna (bytes antes, bytes después).
+    """
+    db_path, cold_path = partition_path(month, archive_dir), cold_partition_path(month, archive_dir)
+    db_bytes = os.path.getsize(db_path)
+    freeze_database(db_path, cold_path, compression)
+    cold_bytes = os.path.getsize(cold_path)
+    conn.execute("UPDATE sales_partitions SET storage = 'cold', file_name = ?, size_bytes = ? WHERE month = ?",
+                 (os.path.basename(cold_path), cold_bytes, month))
+    commit_to_disk(conn)
+    try:
+        os.remove(db_path)
+    except OSError:
+        pass # Adjunta por otra conexión (Windows): freeze_old_months() la borra la próxima vez
+    return db_bytes, cold_bytes
+
+
+def warm_month(conn, month, archive_dir=ARCHIVE_DIR):
+    """Si la partición de un mes está comprimida, la vuelve a dejar como archivo SQLite."""
+    row = conn.execute("SELECT storage FROM sales_partitions WHERE month = ?", (month,)).fetchone()
+    if row is None or row[0] != "cold":
+        return
+    db_path, cold_path = partition_path(month, archive_dir), cold_partition_path(month, archive_dir)
+    thaw_database(cold_path, db_path)
+    conn.execute("UPDATE sales_partitions SET storage = 'db', file_name = ?, size_bytes = ? WHERE month = ?",
+                 (os.path.basename(db_path), os.path.getsize(db_path), month))
+    commit_to_disk(conn)
+    os.remove(cold_path)
+
+
+def freeze_old_months(conn=None, keep_months=HOT_MONTHS + WARM_MONTHS, archive_dir=ARCHIVE_DIR, today=None):
+    """
+    Comprime las particiones archivadas anteriores a los keep_months más recientes.
+    Retorna {mes: (bytes antes, bytes después)}.
+    """
+    if conn is None:
+        conn, _ = get_db_connection()
+    if conn.in_transaction:
+        conn.commit()
+    cutoff = first_recent_month(keep_months, today)
+    frozen = {}
+    rows = conn.execute("SELECT month, storage FROM sales_partitions WHERE status = 'archived' AND month < ? ORDER BY month",
+                        (cutoff,)).fetchall()
+    for month, storage in rows:
+        if storage == "db":
+            frozen[month] = freeze_month(conn, month, archive_dir)
+        elif os.path.exists(partition_path(month, archive_dir)):
+            try:
+                os.remove(partition_path(month, archive_dir)) # Quedó de una compresión anterior
+            except OSError:
+                pass
+    return frozen
+
+
+def archive_closed_months(conn=None, hot_months=HOT_MONTHS, archive_dir=ARCHIVE_DIR):
+    """Archiva todos los meses cerrados con ventas en la base principal. Retorna {mes: ventas movidas}."""
+    if conn is None:
+        conn, _ = get_db_connection()
+    return {month: archive_month(conn, month, archive_dir) for month in closed_months(conn, hot_months)}
+
+
+def partitions_in_range(conn, start_date=None, end_date=None):
+    """
+    Particiones [(mes, archivo, estado, moved_until_id, almacenamiento)] de los meses entre dos fechas
+    'AAAA-MM-DD' (None = sin límite).
+    """
+    return conn.execute(
+        "SELECT month, file_name, status, moved_until_id, storage FROM sales_partitions "
+        "WHERE month >= ? AND month <= ? AND moved_until_id > 0 ORDER BY month",
+        ((start_date or "0000-01")[:7], (end_date or "9999-12")[:7]),
+    ).fetchall()
+
+
+def split_date_range(conn, start_date, end_date, max_partitions=MAX_ATTACHED):
+    """
+    Divide [start_date, end_date] en tramos consecutivos que tocan a lo sumo max_partitions particiones
+    cada uno, para recorrer con attached_partitions() rangos más largos que el límite de ATTACH.
+    """
+    months = [row[0] for row in partitions_in_range(conn, start_date, end_date)]
+    ranges = []
+    range_start = start_date
+    for index in range(max_partitions, len(months), max_partitions):
+        next_start = month_bounds(months[index])[0]
+        ranges.append((range_start, (datetime.date.fromisoformat(next_start) - datetime.timedelta(days=1)).isoformat()))
+        range_start = next_start
+    ranges.append((range_start, end_date))
+    return ranges
+
+
+@contextlib.contextmanager
+def attached_partitions(conn, start_date=None, end_date=None, archive_dir=ARCHIVE_DIR):
+    """
+    Adjunta las particiones de los meses entre start_date y end_date ('AAAA-MM-DD', ambas incluidas) y
+    tapa sales, sale_items, sale_item_modifiers y sale_taxes con vistas TEMP que las unen a la base
+    principal. Al salir borra las vistas y separa las particiones. Solo para conexiones de lectura.
+    Las particiones comprimidas se descomprimen la primera vez (ver utils/cold_storage.py).
+    Lanza ValueError si el rango toca más de MAX_ATTACHED particiones (ver split_date_range()).
+    """
+    partitions = [partition for partition in partitions_in_range(conn, start_date, end_date)
+                  if os.path.exists(os.path.join(archive_dir, partition[1]))]
+    if not partitions:
+        yield conn
+        return
+    if len(partitions) > MAX_ATTACHED:
+        raise ValueError(f"El rango abarca {len(partitions)} meses archivados; el máximo por consulta es {MAX_ATTACHED}.")
+    schemas = []
+    try:
+        for month, file_name, status, moved_until_id, storage in partitions:
+            schema = f"partition_{month.replace('-', '_')}"
+            path = os.path.join(archive_dir, file_name)
+            if storage == "cold":
+                path = thawed_path(path, os.path.join(archive_dir, "thawed"))
+            conn.execute("ATTACH DATABASE ? AS " + schema, (path,))
+            schemas.append((schema, status, moved_until_id))
+        for table_name in PARTITIONED_TABLES:
+            columns = ", ".join(table_columns(conn, "main", table_name))
+            selects = [f"SELECT {columns} FROM main.{table_name}"]
+            for schema, status, moved_until_id in schemas:
+                select = f"SELECT {columns} FROM {schema}.{table_name}"
+                if status != "archived":
+                    select += " WHERE " + MOVED_FILTERS[table_name].format(schema=schema, moved=int(moved_until_id))
+                selects.append(select)
+            conn.execute(f"CREATE TEMP VIEW {table_name} AS " + " UNION ALL ".join(selects))
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        for table_name in PARTITIONED_TABLES:
+            conn.execute(f"DROP VIEW IF EXISTS temp.{table_name}")
+        for schema, _, _ in schemas:
+            conn.execute(f"DETACH DATABASE {schema}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("archive", "compress", "list"):
+        print("Uso: python -m utils.partitions archive|compress|list")
+        sys.exit(1)
+    try:
+        claim_database_file()
+    except RuntimeError as e:
+        sys.exit(str(e))
+    create_tables()
+    db_conn, _ = get_db_connection()
+    if sys.argv[1] == "archive":
+        for archived_month, count in archive_closed_months(db_conn).items():
+            print(f"{archived_month}: {count} ventas movidas")
+    elif sys.argv[1] == "compress":
+        for frozen_month, (db_bytes, cold_bytes) in freeze_old_months(db_conn).items():
+            print(f"{frozen_month}: {db_bytes / 1048576:.1f} MB -> {cold_bytes / 1048576:.1f} MB")
+    for row in db_conn.execute(
+            "SELECT month, status, storage, sales, first_sale_date, last_sale_date, file_name, size_bytes FROM sales_partitions ORDER BY month"):
+        print("  ".join(str(value) for value in row))
+    close_db_connection()
@@ -0,0 +1,395 @@
+# utils/pricing.py
+
+import bisect
+import datetime
+import heapq
+
+from models import PricingRule, apply_percent
+
+COMBO_SEARCH_NODES = 40 # Nodos de la búsqueda de combos por evaluación: acota el tiempo en pedidos grandes
+
+
+def parse_time(value):
+    """Convierte 'HH:MM' en minutos desde la medianoche (None si no hay valor)."""
+    if not value:
+        return None
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class CompiledRule:
+    """Regla de precio ya interpretada: ventana horaria en minutos y componentes del combo en un diccionario."""
+    __slots__ = ("rule_id", "name", "rule_type", "category_id", "product_id", "percent", "min_quantity",
+                 "combo_items", "combo_price", "start_minute", "end_minute", "days")
+
+    def __init__(self, rule):
+        self.rule_id = rule.id
+        self.name = rule.name
+        self.rule_type = rule.rule_type
+        self.category_id = rule.category_id
+        self.product_id = rule.product_id
+        self.percent = rule.percent or 0.0
+        self.min_quantity = rule.min_quantity or 1
+        self.combo_items = rule.get_combo_items() if rule.rule_type == "combo" else {}
+        self.combo_price = rule.combo_price.cents if rule.combo_price is not None else 0 # Centavos
+        self.start_minute = parse_time(rule.start_time)
+        self.end_minute = parse_time(rule.end_time)
+        self.days = frozenset(int(day) for day in rule.days_of_week) if rule.days_of_week else None
+
+    def is_active_at(self, weekday, minute):
+        """Indica si la regla aplica en el día (lunes=0) y minuto del día dados."""
+        if self.days is not None and weekday not in self.days:
+            return False
+        if self.start_minute is None or self.end_minute is None:
+            return True
+        if self.start_minute <= self.end_minute:
+            return self.start_minute <= minute < self.end_minute
+        # Ventana que cruza la medianoche (p. ej. 22:00 - 02:00)
+        return minute >= self.start_minute or minute < self.end_minute
+
+
+class PricingResult:
+    """Resultado de evaluar un pedido: descuento por línea, reglas aplicadas y descuento total (en centavos)."""
+    __slots__ = ("line_discounts", "applied_rules", "total_discount")
+
+    def __init__(self):
+        self.line_discounts = {} # {line_id: descuento}
+        self.applied_rules = {} # {rule_id: (nombre, descuento)}
+        self.total_discount = 0
+
+    def add(self, line_id, rule, amount):
+        if amount <= 0:
+            return
+        self.line_discounts[line_id] = self.line_discounts.get(line_id, 0) + amount
+        name, previous = self.applied_rules.get(rule.rule_id, (rule.name, 0))
+        self.applied_rules[rule.rule_id] = (name, previous + amount)
+        self.total_discount += amount
+
+
+class PricingEngine:
+    """
+    Evalúa las reglas de precio sobre un pedido completo.
+    Las reglas se compilan en índices por producto y categoría; el conjunto activo se recalcula
+    solo cuando cambia el minuto, así que evaluar una línea es un puñado de búsquedas en diccionarios.
+    Los descuentos porcentuales no se acumulan: cada línea recibe el mejor porcentaje que le aplique.
+    Los combos se resuelven después, sobre los precios ya descontados, buscando la combinación de mayor ahorro.
+    load() comparte un motor en caché y lo vuelve a crear cuando cambió PricingRule.version, así que las
+    reglas editadas se aplican sin reiniciar la aplicación.
+    """
+    _cached = None
+    _cached_version = None
+
+    def __init__(self, rules):
+        self.rules = [CompiledRule(rule) for rule in rules if rule.is_active]
+        self.active_key = None
+        self.percent_by_product = {} # {product_id: (percent, rule)}
+        self.percent_by_category = {} # {category_id: (percent, rule)}
+        self.global_percent = None # (percent, rule) o None
+        self.breaks_by_product = {} # {product_id: ([min_quantity...], [(percent, rule)...])}
+        self.global_breaks = ([], [])
+        self.combos = [] # [CompiledRule]
+
+    @classmethod
+    def load(cls):
+        """Retorna el motor en caché, leyendo las reglas activas de la base de datos si aún no se cargaron o si cambiaron."""
+        if cls._cached is None or cls._cached_version != PricingRule.version:
+            cls._cached = cls(PricingRule.get_active_rules())
+            cls._cached_version = PricingRule.version
+        return cls._cached
+
+    @classmethod
+    def invalidate(cls):
+        cls._cached = None
+
+    def activate(self, now):
+        """Reconstruye los índices con las reglas vigentes en 'now' (solo si cambió el minuto)."""
+        weekday, minute = now.weekday(), now.hour * 60 + now.minute
+        if self.active_key == (weekday, minute):
+            return
+        self.active_key = (weekday, minute)
+
+        self.percent_by_product = {}
+        self.percent_by_category = {}
+        self.global_percent = None
+        breaks_by_product = {}
+        global_breaks = []
+        self.combos = []
+
+        for rule in self.rules:
+            if not rule.is_active_at(weekday, minute):
+                continue
+            if rule.rule_type == "percent_off":
+                if rule.product_id is not None:
+                    self._keep_best(self.percent_by_product, rule.product_id, rule)
+                elif rule.category_id is not None:
+                    self._keep_best(self.percent_by_category, rule.category_id, rule)
+                elif self.global_percent is None or rule.percent > self.global_percent[0]:
+                    self.global_percent = (rule.percent, rule)
+            elif rule.rule_type == "quantity_break":
+                target = breaks_by_product.setdefault(rule.product_id, []) if rule.product_id is not None else global_breaks
+                target.append(rule)
+            elif rule.rule_type == "combo" and rule.combo_items and rule.combo_price >= 0:
+                self.combos.append(rule)
+
+        self.breaks_by_product = {product_id: self._compile_breaks(rules) for product_id, rules in breaks_by_product.items()}
+        self.global_breaks = self._compile_breaks(global_breaks)
+
+    @staticmethod
+    def _keep_best(index, key, rule):
+        if key not in index or rule.percent > index[key][0]:
+            index[key] = (rule.percent, rule)
+
+    @staticmethod
+    def _compile_breaks(rules):
+        """
+        Ordena los escalones por cantidad mínima y guarda, para cada uno, el mejor porcentaje alcanzable
+        con esa cantidad o menos. Así una búsqueda binaria da directamente el descuento aplicable.
+        """
+        thresholds, best = [], []
+        for rule in sorted(rules, key=lambda r: r.min_quantity):
+            if best and best[-1][0] >= rule.percent:
+                entry = best[-1]
+            else:
+                entry = (rule.percent, rule)
+            thresholds.append(rule.min_quantity)
+            best.append(entry)
+        return thresholds, best
+
+    @staticmethod
+    def _lookup_break(breaks, quantity):
+        thresholds, best = breaks
+        position = bisect.bisect_right(thresholds, quantity)
+        return best[position - 1] if position else None
+
+    def evaluate(self, cart, now=None):
+        """Evalúa todas las reglas sobre el pedido y retorna un PricingResult."""
+        self.activate(now or datetime.datetime.now())
+        result = PricingResult()
+        lines = list(cart)
+        if not lines:
+            return result
+
+        # Unidades por producto (los escalones cuentan todas las líneas del mismo producto)
+        product_quantities = {}
+        for line in lines:
+            product_quantities[line.product.id] = product_quantities.get(line.product.id, 0) + line.quantity
+
+        net_unit_prices = {} # {line_id: precio unitario tras el descuento porcentual, en centavos}
+        for line in lines:
+            product_id = line.product.id
+            candidates = [
+                self.percent_by_product.get(product_id),
+                self.percent_by_category.get(line.product.category_id),
+                self.global_percent,
+            ]
+            if product_id in self.breaks_by_product:
+                candidates.append(self._lookup_break(self.breaks_by_product[product_id], product_quantities[product_id]))
+            if self.global_breaks[0]:
+                candidates.append(self._lookup_break(self.global_breaks, product_quantities[product_id]))
+
+            best = max((candidate for candidate in candidates if candidate), key=lambda c: c[0], default=None)
+            percent = min(best[0], 100.0) if best else 0.0
+            if percent > 0:
+                result.add(line.line_id, best[1], apply_percent(line.line_total, percent))
+            unit_price = line.unit_price + line.modifiers_price
+            net_unit_prices[line.line_id] = unit_price - apply_percent(unit_price, percent)
+
+        if self.combos:
+            self._apply_combos(lines, product_quantities, net_unit_prices, result)
+        return result
+
+    def _apply_combos(self, lines, product_quantities, net_unit_prices, result):
+        """
+        Busca la combinación de combos con mayor ahorro total.
+        Los combos consumen las unidades de cada producto de la más cara a la más barata, así que el
+        ahorro de un plan solo depende de cuántas veces se aplica cada combo. Los combos que no comparten
+        productos se resuelven por separado; en cada grupo se parte del plan voraz (aplicar siempre el
+        combo de mayor ahorro inmediato) y se mejora con una búsqueda por ramificación y poda sobre las
+        cantidades, cortada a los COMBO_SEARCH_NODES nodos con el mejor plan encontrado.
+        """
+        segments = {}
+        for line in lines:
+            segments.setdefault(line.product.id, []).append((net_unit_prices[line.line_id], line.line_id, line.quantity))
+
+        combos = [
+            combo for combo in self.combos
+            if all(product_quantities.get(product_id, 0) >= quantity for product_id, quantity in combo.combo_items.items())
+        ]
+        product_ids = sorted({product_id for combo in combos for product_id in combo.combo_items})
+        slot_of = {product_id: slot for slot, product_id in enumerate(product_ids)}
+        units = [ComboUnits(segments[product_id]) for product_id in product_ids]
+        used = [0] * len(product_ids)
+
+        # Un combo que no ahorra con las unidades más caras tampoco ahorra con las que quedan después
+        compiled = []
+        for combo in combos:
+            components = tuple((slot_of[product_id], quantity) for product_id, quantity in combo.combo_items.items())
+            _, saving = next_application(combo, components, units, used)
+            if saving > 0:
+                compiled.append((saving, combo, components))
+        compiled.sort(key=lambda entry: -entry[0])
+
+        for group in group_by_products([(combo, components) for _, combo, components in compiled]):
+            for combo, components, times in best_combo_plan(group, units, list(used)):
+                line_costs = {}
+                for slot, quantity in components:
+                    units[slot].add_line_costs(used[slot], used[slot] + quantity * times, line_costs)
+                    used[slot] += quantity * times
+                # El ahorro se reparte entre las líneas consumidas en proporción a su costo; la última
+                # recibe el resto para que la suma sea exacta al centavo
+                cost = sum(line_costs.values())
+                saving = cost - combo.combo_price * times
+                if saving <= 0:
+                    continue
+                remaining = saving
+                for position, (line_id, line_cost) in enumerate(line_costs.items()):
+                    share = remaining if position == len(line_costs) - 1 else saving * line_cost // cost
+                    remaining -= share
+                    result.add(line_id, combo, share)
+
+
+class ComboUnits:
+    """
+    Unidades de un producto en el pedido para los combos, de la más cara a la más barata: los tramos
+    (precio neto, line_id, cantidad) y el costo acumulado de las k unidades más caras para cada k.
+    """
+    __slots__ = ("segments", "top_costs", "total")
+
+    def __init__(self, segments):
+        self.segments = sorted(segments, key=lambda segment: -segment[0])
+        self.top_costs = [0]
+        for price, _, quantity in self.segments:
+            for _ in range(quantity):
+                self.top_costs.append(self.top_costs[-1] + price)
+        self.total = len(self.top_costs) - 1
+
+    def value_above(self, first, share):
+        """Suma de (precio - share) de las unidades desde first cuyo precio supera share."""
+        total, start = 0, 0
+        for price, _, quantity in self.segments:
+            if price <= share:
+                break
+            total += (price - share) * max(0, start + quantity - max(first, start))
+            start += quantity
+        return total
+
+    def add_line_costs(self, first, last, line_costs):
+        """Suma a line_costs ({line_id: costo}) el costo de las unidades first..last-1 de cada línea."""
+        start = 0
+        for price, line_id, quantity in self.segments:
+            overlap = min(last, start + quantity) - max(first, start)
+            if overlap > 0:
+                line_costs[line_id] = line_costs.get(line_id, 0) + price * overlap
+            start += quantity
+
+
+def next_application(combo, components, units, used):
+    """(veces que todavía cabe el combo, ahorro de aplicarlo una vez más); (0, 0) si ya no cabe."""
+    capacity, cost = None, 0
+    for slot, quantity in components:
+        start, product_units = used[slot], units[slot]
+        left = (product_units.total - start) // quantity
+        if left == 0:
+            return 0, 0
+        if capacity is None or left < capacity:
+            capacity = left
+        cost += product_units.top_costs[start + quantity] - product_units.top_costs[start]
+    return capacity, cost - combo.combo_price
+
+
+def group_by_products(combos):
+    """Separa los combos [(combo, componentes)] en grupos que no comparten productos, conservando el orden."""
+    parent = list(range(len(combos)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    first_with_slot = {}
+    for index, (_, components) in enumerate(combos):
+        for slot, _ in components:
+            parent[find(index)] = find(first_with_slot.setdefault(slot, index))
+    groups = {}
+    for index, entry in enumerate(combos):
+        groups.setdefault(find(index), []).append(entry)
+    return list(groups.values())
+
+
+def best_combo_plan(combos, units, used):
+    """
+    Mejor plan para un grupo de combos [(combo, componentes)] ordenado por ahorro inicial.
+    Retorna [(combo, componentes, veces)] en el orden en que se aplican.
+    """
+    # Plan voraz. El ahorro de una aplicación nunca sube a medida que se usan unidades, así que el del
+    # montículo es una cota: solo se recalcula el combo de arriba
+    greedy_used, greedy_plan, greedy_saving = list(used), [], 0
+    heap = [(-next_application(combo, components, units, used)[1], index) for index, (combo, components) in enumerate(combos)]
+    heapq.heapify(heap)
+    while heap:
+        _, index = heapq.heappop(heap)
+        combo, components = combos[index]
+        capacity, saving = next_application(combo, components, units, greedy_used)
+        if capacity == 0 or saving <= 0:
+            continue
+        if heap and saving < -heap[0][0]:
+            heapq.heappush(heap, (-saving, index))
+            continue
+        if greedy_plan and greedy_plan[-1][0] == index:
+            greedy_plan[-1] = (index, greedy_plan[-1][1] + 1)
+        else:
+            greedy_plan.append((index, 1))
+        greedy_saving += saving
+        for slot, quantity in components:
+            greedy_used[slot] += quantity
+        heapq.heappush(heap, (-saving, index))
+
+    if len(combos) == 1: # Con un solo combo el plan voraz ya es el mejor
+        return [(*combos[index], times) for index, times in greedy_plan]
+    best = [greedy_saving, greedy_plan]
+    nodes = 0
+    sizes = [sum(quantity for _, quantity in components) for _, components in combos]
+
+    def search(index, used, saving, plan):
+        nonlocal nodes
+        if saving > best[0]:
+            best[0], best[1] = saving, plan
+        if index == len(combos) or nodes >= COMBO_SEARCH_NODES:
+            return
+        nodes += 1
+        # Cotas: cada aplicación futura de un combo ahorra a lo sumo lo que ahorraría la próxima, y cada
+        # unidad que queda ahorra a lo sumo su precio menos la menor parte del precio de un combo que la usa
+        bound, shares = 0, {}
+        for rest in range(index, len(combos)):
+            combo, components = combos[rest]
+            capacity, next_saving = next_application(combo, components, units, used)
+            if capacity == 0 or next_saving <= 0:
+                continue
+            bound += next_saving * capacity
+            share = combo.combo_price / sizes[rest]
+            for slot, _ in components:
+                if share < shares.get(slot, share + 1):
+                    shares[slot] = share
+        if saving + bound <= best[0]:
+            return
+        unit_bound = sum(units[slot].value_above(used[slot], share) for slot, share in shares.items())
+        if saving + int(unit_bound + 1e-6) <= best[0]:
+            return
+        combo, components = combos[index]
+        # Aplicaciones seguidas de este combo que todavía ahorran algo, de más a menos
+        steps = [(0, list(used), saving, plan)]
+        while True:
+            times, step_used, step_saving, _ = steps[-1]
+            capacity, next_saving = next_application(combo, components, units, step_used)
+            if capacity == 0 or next_saving <= 0:
+                break
+            next_used = list(step_used)
+            for slot, quantity in components:
+                next_used[slot] += quantity
+            steps.append((times + 1, next_used, step_saving + next_saving, plan + [(index, times + 1)]))
+        for _, step_used, step_saving, step_plan in reversed(steps):
+            search(index + 1, step_used, step_saving, step_plan)
+
+    search(0, list(used), 0, [])
+    return [(*combos[index], times) for index, times in best[1]]
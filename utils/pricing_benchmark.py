@@ -0,0 +1,93 @@
+# utils/pricing_benchmark.py
+#
+# Mide PricingEngine.evaluate() sobre pedidos y reglas sintéticas y comprueba que se mantenga por debajo
+# de TARGET_MS, el presupuesto por evaluación: SalesModule evalúa el pedido en cada cambio del carrito.
+# Uso: python -m utils.pricing_benchmark [REPETICIONES]
+# Termina con código 1 si la mediana de algún caso supera el presupuesto.
+
+import datetime
+import random
+import statistics
+import sys
+import time
+
+from models import Money, PricingRule, Product
+from utils.order_cart import OrderCart
+from utils.pricing import PricingEngine
+
+TARGET_MS = 1.0
+DEFAULT_REPEATS = 200
+EVALUATION_TIME = datetime.datetime(2026, 1, 5, 13, 30) # Lunes al mediodía: todas las ventanas horarias activas
+
+
+def make_rules(rng, rule_count, combo_count, product_count):
+    """Reglas activas: combo_count combos de 2 o 3 productos y el resto porcentajes y escalones."""
+    rules = []
+    for index in range(combo_count):
+        items = rng.sample(range(1, product_count + 1), rng.choice((2, 2, 3)))
+        rules.append(PricingRule(id=len(rules) + 1, name=f"Combo {index}", rule_type="combo",
+                                 combo_items=",".join(f"{product_id}:{rng.choice((1, 1, 2))}" for product_id in items),
+                                 combo_price=Money.from_cents(rng.randint(300, 1500))))
+    while len(rules) < rule_count:
+        rule_type = rng.choice(("percent_off", "quantity_break"))
+        rules.append(PricingRule(id=len(rules) + 1, name=f"Regla {len(rules)}", rule_type=rule_type,
+                                 product_id=rng.randint(1, product_count), percent=rng.choice((5.0, 10.0, 15.0)),
+                                 min_quantity=rng.randint(2, 6) if rule_type == "quantity_break" else 1,
+                                 start_time="11:00", end_time="16:00"))
+    return rules
+
+
+def make_cart(rng, line_count, product_count, min_quantity, max_quantity):
+    cart = OrderCart()
+    for product_id in rng.sample(range(1, product_count + 1), line_count):
+        product = Product(id=product_id, category_id=product_id % 10 + 1, base_price=Money.from_cents(rng.randint(150, 900)))
+        cart.add_item(product, quantity=rng.randint(min_quantity, max_quantity))
+    return cart
+
+
+def benchmark_cases():
+    """[(nombre, motor, pedido)] de los casos medidos."""
+    rng = random.Random(7)
+    cases = []
+    # Menú de 60 productos: un pedido de 30 líneas completa la mayoría de los combos
+    rules = make_rules(rng, 300, 80, 60)
+    for min_quantity, max_quantity in ((2, 3), (4, 6)):
+        cart = make_cart(rng, 30, 60, min_quantity, max_quantity)
+        cases.append((f"30 líneas x 300 reglas, cantidades {min_quantity}-{max_quantity}", PricingEngine(rules), cart))
+    # Muchos combos de dos productos que se solapan, con precios parecidos: el peor caso de la búsqueda
+    rules = [PricingRule(id=index + 1, name=f"Combo {index}", rule_type="combo",
+                         combo_items=",".join(f"{product_id}:1" for product_id in rng.sample(range(1, 9), 2)),
+                         combo_price=Money.from_cents(300)) for index in range(15)]
+    for quantity in (6, 20):
+        cart = make_cart(rng, 8, 8, quantity, quantity)
+        cases.append((f"8 líneas x 15 combos solapados, cantidad {quantity}", PricingEngine(rules), cart))
+    return cases
+
+
+def run_benchmark(repeats=DEFAULT_REPEATS):
+    """Retorna [(nombre, ms mediana, ms p99, descuento)] de cada caso."""
+    results = []
+    for name, engine, cart in benchmark_cases():
+        result = engine.evaluate(cart, EVALUATION_TIME) # Compila el conjunto activo de reglas
+        times = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            engine.evaluate(cart, EVALUATION_TIME)
+            times.append((time.perf_counter() - started) * 1000)
+        times.sort()
+        results.append((name, statistics.median(times), times[int(len(times) * 0.99) - 1], result.total_discount))
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        print("Uso: python -m utils.pricing_benchmark [REPETICIONES]")
+        sys.exit(1)
+    results = run_benchmark(int(sys.argv[1]) if len(sys.argv) == 2 else DEFAULT_REPEATS)
+    print(f"{'Caso':<48} {'Mediana':>10} {'p99':>10} {'Descuento':>10}")
+    for name, median_ms, p99_ms, discount in results:
+        print(f"{name:<48} {median_ms:>8.3f}ms {p99_ms:>8.3f}ms {Money(discount):>10}")
+    slow = [name for name, median_ms, _, _ in results if median_ms > TARGET_MS]
+    if slow:
+        print(f"Por encima de {TARGET_MS} ms: {', '.join(slow)}")
+        sys.exit(1)
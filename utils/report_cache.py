@@ -0,0 +1,111 @@
+# utils/report_cache.py
+#
+# Caché de resultados de reportes. La clave es (reporte, fecha de inicio, fecha de fin, idioma) y
+# cada entrada guarda la marca de agua de las ventas (MAX(sales.id)) del momento en que se calculó.
+# Las ventas solo se agregan (los rollups se mantienen con triggers AFTER INSERT), así que una entrada
+# sigue siendo válida mientras ninguna venta nueva caiga dentro de su rango de fechas: un reporte del
+# mes pasado no se recalcula por las ventas de hoy, y uno de hoy se recalcula en cuanto entra una venta.
+# La marca de agua se lee de donde leen los reportes (open_read_only_connection: DB_FILE). En modo en
+# memoria ese archivo va hasta una copia a disco atrasado, y la base en memoria tendría ventas que el
+# reporte todavía no ve: una entrada calculada antes de la copia quedaría vigente con cifras viejas.
+
+import contextlib
+import sys
+import threading
+from collections import OrderedDict
+
+from database import open_read_only_connection
+from utils.report_queries import date_range_bounds
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024 # Memoria aproximada máxima de todas las entradas
+
+# No se usa PRAGMA data_version: su valor es propio de cada conexión, y los reportes se calculan
+# con conexiones de solo lectura nuevas. MAX(id) sale del final del índice de la clave primaria.
+WATERMARK_SQL = "SELECT COALESCE(MAX(id), 0) FROM sales"
+# Fecha más antigua entre las ventas que llegaron después de la marca de agua de una entrada
+NEW_SALES_SQL = "SELECT MIN(sale_date) FROM sales WHERE id > ?"
+
+
+def estimate_size(rows):
+    """Tamaño aproximado en bytes de una lista de filas (tuplas de valores simples)."""
+    return sys.getsizeof(rows) + sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in rows)
+
+
+@contextlib.contextmanager
+def reports_connection(conn=None):
+    """conn, o una conexión de solo lectura propia (la misma fuente que run_report) que se cierra al salir."""
+    if conn is not None:
+        yield conn
+        return
+    conn = open_read_only_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def sales_watermark(conn=None):
+    """Retorna la marca de agua actual de las ventas (el id de la última venta, 0 si no hay)."""
+    with reports_connection(conn) as conn:
+        return conn.execute(WATERMARK_SQL).fetchone()[0]
+
+
+class ReportCache:
+    """
+    Resultados de reportes en memoria, con descarte LRU cuando se supera max_bytes.
+    Uso: watermark = sales_watermark() antes de calcular el reporte, y put(..., watermark, filas)
+    al terminar; así, si entran ventas mientras se calcula, la próxima get() las tiene en cuenta.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict() # {clave: [marca de agua, filas, bytes]}, en orden de uso
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, report_name, start_date, end_date, lang, conn=None):
+        """Retorna las filas guardadas si siguen siendo válidas, o None."""
+        key = (report_name, start_date, end_date, lang)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            with reports_connection(conn) as conn:
+                current = sales_watermark(conn)
+                if current != entry[0]:
+                    first_new_sale = conn.execute(NEW_SALES_SQL, (entry[0],)).fetchone()[0] if current > entry[0] else None
+                    # Ventas borradas (current < marca) o ventas nuevas dentro del rango: la entrada ya no sirve
+                    if first_new_sale is None or first_new_sale < date_range_bounds(start_date, end_date)[1]:
+                        self._remove(key)
+                        return None
+                    entry[0] = current # Las ventas nuevas son posteriores al rango
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, report_name, start_date, end_date, lang, watermark, rows):
+        """Guarda las filas de un reporte calculado con los datos hasta la marca de agua dada."""
+        key = (report_name, start_date, end_date, lang)
+        size = estimate_size(rows)
+        with self.lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self.entries[key] = [watermark, rows, size]
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+# Caché compartida por los módulos de la aplicación
+report_cache = ReportCache()
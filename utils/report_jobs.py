@@ -0,0 +1,260 @@
+# utils/report_jobs.py
+#
+# Reportes pesados (cálculo en Python, no solo SQL) ejecutados en un ProcessPoolExecutor para no
+# bloquear la interfaz y aprovechar todos los núcleos. El rango de fechas se parte en tramos de días;
+# cada proceso calcula el resultado parcial de un tramo con su propia conexión de solo lectura y los
+# parciales se combinan a medida que llegan. Uso desde consola (sin procesos, para comparar):
+#   python -m utils.report_jobs REPORTE FECHA_INICIO FECHA_FIN
+
+import datetime
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from database import open_read_only_connection
+from utils import basket_analysis
+from utils.report_queries import date_range_bounds, localized
+
+PARTITIONS_PER_WORKER = 4 # Más tramos que procesos: reparte mejor la carga y el avance se ve más seguido
+INTERRUPT_CHECK_OPS = 10000 # Instrucciones de SQLite entre dos revisiones de la cancelación
+
+_cancel_event = None # Evento de cancelación del trabajo (en cada proceso del pool)
+_worker_conn = None # Conexión de solo lectura del proceso, reutilizada entre tramos
+
+
+class ReportCancelled(Exception):
+    """El trabajo se canceló mientras un proceso calculaba su tramo."""
+
+
+def check_cancelled():
+    """Lanza ReportCancelled si el trabajo de este proceso se canceló."""
+    if _cancel_event is not None and _cancel_event.is_set():
+        raise ReportCancelled()
+
+
+# --- Tramos de fechas ---
+
+def partition_dates(start_date, end_date, parts):
+    """
+    Parte el rango 'YYYY-MM-DD' (ambas incluidas) en hasta parts tramos consecutivos de días.
+    Retorna [(primer_día, día_siguiente_al_último)], con el fin excluido, como cadenas 'YYYY-MM-DD'.
+    """
+    date_range_bounds(start_date, end_date) # Valida las fechas
+    start = datetime.date.fromisoformat(start_date)
+    days = (datetime.date.fromisoformat(end_date) - start).days + 1
+    parts = max(1, min(parts, days))
+    bounds = [start + datetime.timedelta(days=days * index // parts) for index in range(parts + 1)]
+    return [(first.isoformat(), following.isoformat()) for first, following in zip(bounds, bounds[1:])]
+
+
+def previous_year(day):
+    """Mueve un día 'YYYY-MM-DD' al año anterior como cadena (sirve como límite aunque sea 29 de febrero)."""
+    return f"{int(day[:4]) - 1:04d}{day[4:]}"
+
+
+# --- Reportes por tramos ---
+# Cada reporte define:
+#   partial(conn, first_day, next_day, lang) -> resultado parcial de un tramo (se ejecuta en un proceso)
+#   merge(acumulado, parcial) -> acumulado (acumulado empieza en None)
+#   finish(conn, acumulado, lang) -> filas del reporte (tuplas, importes en centavos)
+# Las funciones deben ser de módulo para poder enviarlas a los procesos.
+
+def basket_pairs_partial(conn, first_day, next_day, lang):
+    """Conteos de canasta del tramo (los días ya calculados se leen de sus archivos)."""
+    return basket_analysis.range_counts(conn, first_day, next_day)
+
+
+def basket_pairs_merge(accumulated, partial):
+    return partial if accumulated is None else basket_analysis.combine([accumulated, partial])
+
+
+def basket_pairs_finish(conn, accumulated, lang):
+    """Filas (artículo A, artículo B, tickets, soporte, confianza A→B, confianza B→A, lift) de los pares más frecuentes."""
+    names = dict(conn.execute(f"SELECT p.id, {localized('p')} FROM products p", {"lang": lang}))
+    # Los modificadores tienen código -id (ver utils/basket_analysis.py)
+    names.update(conn.execute(f"SELECT -m.id, '+ ' || {localized('m')} FROM modifiers m", {"lang": lang}))
+    return [
+        (names.get(first, f"#{first}"), names.get(second, f"#{second}"), count,
+         f"{100 * support:.1f}%", f"{100 * confidence_ab:.1f}%", f"{100 * confidence_ba:.1f}%", f"{lift:.2f}")
+        for first, second, count, support, confidence_ab, confidence_ba, lift
+        in basket_analysis.pair_metrics(accumulated or basket_analysis.empty_counts())
+    ]
+
+
+def year_over_year_partial(conn, first_day, next_day, lang):
+    """Tickets y total por mes del tramo y de los mismos días del año anterior (con el mes del año actual)."""
+    query = """
+        SELECT printf('%04d', substr(day, 1, 4) + :years) || substr(day, 5, 3), SUM(tickets), SUM(total_amount)
+        FROM rollup_sales_hourly
+        WHERE day >= :first_day AND day < :next_day
+        GROUP BY 1
+    """
+    current = {month: (tickets, total) for month, tickets, total in
+               conn.execute(query, {"years": 0, "first_day": first_day, "next_day": next_day})}
+    check_cancelled()
+    previous = {month: (tickets, total) for month, tickets, total in
+                conn.execute(query, {"years": 1, "first_day": previous_year(first_day), "next_day": previous_year(next_day)})}
+    return current, previous
+
+
+def year_over_year_merge(accumulated, partial):
+    if accumulated is None:
+        accumulated = ({}, {})
+    for totals, partial_totals in zip(accumulated, partial):
+        for month, (tickets, total) in partial_totals.items():
+            old_tickets, old_total = totals.get(month, (0, 0))
+            totals[month] = (old_tickets + tickets, old_total + total)
+    return accumulated
+
+
+def year_over_year_finish(conn, accumulated, lang):
+    """Filas (mes, tickets, total del año anterior, total, variación %), por mes."""
+    current, previous = accumulated or ({}, {})
+    rows = []
+    for month in sorted(set(current) | set(previous)):
+        tickets, total = current.get(month, (0, 0))
+        _, previous_total = previous.get(month, (0, 0))
+        change = f"{100 * (total - previous_total) / previous_total:+.1f}%" if previous_total else "-"
+        rows.append((month, tickets, previous_total, total, change))
+    return rows
+
+
+# Mismo formato que report_queries.REPORTS (label y columns) para mostrarlos en ReportsModule
+PARTITIONED_REPORTS = {
+    "basket_pairs": {
+        "label": "report_basket_pairs",
+        "columns": [("report_col_item_a", "text"), ("report_col_item_b", "text"), ("report_col_tickets", "int"), ("report_col_support", "text"),
+                    ("report_col_confidence_ab", "text"), ("report_col_confidence_ba", "text"), ("report_col_lift", "text")],
+        "partial": basket_pairs_partial,
+        "merge": basket_pairs_merge,
+        "finish": basket_pairs_finish,
+    },
+    "year_over_year": {
+        "label": "report_year_over_year",
+        "columns": [("report_col_month", "text"), ("report_col_tickets", "int"), ("report_col_previous_total", "money"), ("report_col_total", "money"), ("report_col_change", "text")],
+        "partial": year_over_year_partial,
+        "merge": year_over_year_merge,
+        "finish": year_over_year_finish,
+    },
+}
+
+
+# --- Procesos ---
+
+def init_worker(cancel_event):
+    """Inicializa un proceso: abre su conexión y hace que SQLite aborte la consulta si se cancela."""
+    global _cancel_event, _worker_conn
+    _cancel_event = cancel_event
+    _worker_conn = open_read_only_connection()
+    _worker_conn.set_progress_handler(lambda: 1 if cancel_event.is_set() else 0, INTERRUPT_CHECK_OPS)
+
+
+def run_partition(report_name, first_day, next_day, lang):
+    """Calcula el resultado parcial de un tramo (se ejecuta en un proceso del pool)."""
+    check_cancelled()
+    try:
+        return PARTITIONED_REPORTS[report_name]["partial"](_worker_conn, first_day, next_day, lang)
+    except sqlite3.OperationalError:
+        check_cancelled() # La consulta se interrumpió por la cancelación
+        raise
+
+
+class ReportJob:
+    """
+    Ejecución de un reporte de PARTITIONED_REPORTS en procesos separados.
+    start() reparte los tramos entre los procesos y retorna enseguida; cada tramo terminado se
+    combina con los anteriores y deja un aviso en events, que la interfaz lee con after():
+      ("progress", (tramos_terminados, tramos)), ("done", filas) o ("error", excepción).
+    cancel() descarta los tramos pendientes e interrumpe las consultas en curso.
+    """
+
+    def __init__(self, report_name, start_date, end_date, lang="es", workers=None):
+        self.report = PARTITIONED_REPORTS[report_name]
+        self.report_name = report_name
+        self.lang = lang
+        self.workers = workers or os.cpu_count() or 1
+        self.partitions = partition_dates(start_date, end_date, self.workers * PARTITIONS_PER_WORKER)
+        self.events = queue.Queue()
+        self.cancelled = False
+        self.accumulated = None
+        self.completed = 0
+        self.lock = threading.Lock()
+        self.executor = None
+        self.cancel_event = None
+
+    def start(self):
+        context = multiprocessing.get_context()
+        self.cancel_event = context.Event()
+        self.executor = ProcessPoolExecutor(
+            max_workers=min(self.workers, len(self.partitions)), mp_context=context,
+            initializer=init_worker, initargs=(self.cancel_event,),
+        )
+        for first_day, next_day in self.partitions:
+            future = self.executor.submit(run_partition, self.report_name, first_day, next_day, self.lang)
+            future.add_done_callback(self.on_partition_done)
+        return self
+
+    def on_partition_done(self, future):
+        """Combina un tramo terminado (se llama desde un hilo del executor, no desde Tk)."""
+        if future.cancelled():
+            return
+        with self.lock:
+            if self.cancelled or self.completed < 0:
+                return
+            try:
+                self.accumulated = self.report["merge"](self.accumulated, future.result())
+            except Exception as e: # Un tramo falló: el reporte entero falla
+                self.completed = -1
+                self.events.put(("error", e))
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                return
+            self.completed += 1
+            self.events.put(("progress", (self.completed, len(self.partitions))))
+            if self.completed < len(self.partitions):
+                return
+        try:
+            conn = open_read_only_connection()
+            try:
+                self.events.put(("done", self.report["finish"](conn, self.accumulated, self.lang)))
+            finally:
+                conn.close()
+        except Exception as e:
+            self.events.put(("error", e))
+        self.executor.shutdown(wait=False)
+
+    def cancel(self):
+        with self.lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+        if self.executor is not None:
+            self.cancel_event.set()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_partitioned_report(report_name, start_date, end_date, lang="es", conn=None):
+    """Ejecuta un reporte de PARTITIONED_REPORTS en este proceso, tramo por tramo (sin pool)."""
+    report = PARTITIONED_REPORTS[report_name]
+    own_connection = conn is None
+    if own_connection:
+        conn = open_read_only_connection()
+    try:
+        accumulated = None
+        for first_day, next_day in partition_dates(start_date, end_date, 1):
+            accumulated = report["merge"](accumulated, report["partial"](conn, first_day, next_day, lang))
+        return report["finish"](conn, accumulated, lang)
+    finally:
+        if own_connection:
+            conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in PARTITIONED_REPORTS:
+        print(f"Uso: python -m utils.report_jobs {'|'.join(PARTITIONED_REPORTS)} FECHA_INICIO FECHA_FIN")
+        sys.exit(1)
+    for report_row in run_partitioned_report(*sys.argv[1:4])[:50]:
+        print(*report_row, sep="\t")
@@ -0,0 +1,141 @@
+# utils/report_queries.py
+
+import datetime
+
+from database import open_read_only_connection
+from utils.forecast import forecast_report
+from utils.sales_cube import category_hour_report
+
+
+def localized(alias):
+    """Expresión SQL del nombre localizado de una tabla con name_es/name_en, según el parámetro :lang."""
+    return f"CASE WHEN :lang = 'en' THEN {alias}.name_en ELSE {alias}.name_es END"
+
+
+# Los reportes leen las tablas de resumen (rollup_*), que los triggers de database.py mantienen
+# al día en cada venta: un mes son unos cientos de filas en lugar de todas las líneas de venta.
+# Los parámetros :start y :end son días 'YYYY-MM-DD', ambos incluidos.
+# Tipos de columna: 'text', 'int' o 'money' (centavos)
+# En lugar de 'sql', un reporte puede tener 'function': function(conn, start, end, lang) -> filas.
+REPORTS = {
+    "sales_by_day": {
+        "label": "report_sales_by_day",
+        "columns": [("report_col_date", "text"), ("report_col_tickets", "int"), ("report_col_tax", "money"), ("report_col_total", "money")],
+        "sql": """
+            SELECT day, SUM(tickets), SUM(tax_amount), SUM(total_amount)
+            FROM rollup_sales_hourly
+            WHERE day >= :start AND day <= :end
+            GROUP BY day
+            ORDER BY day
+        """,
+    },
+    "sales_by_hour": {
+        "label": "report_sales_by_hour",
+        "columns": [("report_col_hour", "text"), ("report_col_tickets", "int"), ("report_col_tax", "money"), ("report_col_total", "money")],
+        "sql": """
+            SELECT printf('%02d:00', hour), SUM(tickets), SUM(tax_amount), SUM(total_amount)
+            FROM rollup_sales_hourly
+            WHERE day >= :start AND day <= :end
+            GROUP BY hour
+            ORDER BY hour
+        """,
+    },
+    "sales_by_category": {
+        "label": "report_sales_by_category",
+        "columns": [("report_col_category", "text"), ("report_col_product_qty", "int"), ("report_col_total", "money")],
+        "sql": f"""
+            SELECT COALESCE({localized("c")}, '-'), SUM(r.quantity), SUM(r.revenue) AS revenue
+            FROM rollup_category_daily r
+            LEFT JOIN categories c ON c.id = r.category_id
+            WHERE r.day >= :start AND r.day <= :end
+            GROUP BY r.category_id
+            ORDER BY revenue DESC
+        """,
+    },
+    "sales_by_product": {
+        "label": "report_sales_by_product",
+        "columns": [("report_col_product_name", "text"), ("report_col_product_qty", "int"), ("report_col_total", "money")],
+        "sql": f"""
+            SELECT {localized("p")}, t.quantity, t.revenue
+            FROM (
+                SELECT product_id, SUM(quantity) AS quantity, SUM(revenue) AS revenue
+                FROM rollup_product_daily
+                WHERE day >= :start AND day <= :end
+                GROUP BY product_id
+            ) t
+            JOIN products p ON p.id = t.product_id
+            ORDER BY t.revenue DESC
+        """,
+    },
+    "sales_by_variant": {
+        "label": "report_sales_by_variant",
+        "columns": [("report_col_product_name", "text"), ("report_col_variant_name", "text"), ("report_col_product_qty", "int"), ("report_col_total", "money")],
+        "sql": f"""
+            SELECT {localized("p")}, COALESCE({localized("v")}, '-'), t.quantity, t.revenue
+            FROM (
+                SELECT product_id, variant_id, SUM(quantity) AS quantity, SUM(revenue) AS revenue
+                FROM rollup_product_daily
+                WHERE day >= :start AND day <= :end
+                GROUP BY product_id, variant_id
+            ) t
+            JOIN products p ON p.id = t.product_id
+            LEFT JOIN variants v ON v.id = t.variant_id
+            ORDER BY t.revenue DESC
+        """,
+    },
+    "sales_by_modifier": {
+        "label": "report_sales_by_modifier",
+        "columns": [("report_col_modifier_name", "text"), ("report_col_lines", "int"), ("report_col_product_qty", "int"), ("report_col_total", "money")],
+        "sql": f"""
+            SELECT {localized("m")}, SUM(r.attach_count), SUM(r.quantity), SUM(r.revenue) AS revenue
+            FROM rollup_modifier_daily r
+            JOIN modifiers m ON m.id = r.modifier_id
+            WHERE r.day >= :start AND r.day <= :end
+            GROUP BY r.modifier_id
+            ORDER BY revenue DESC
+        """,
+    },
+    "demand_forecast": {
+        "label": "report_demand_forecast",
+        "columns": [("report_col_product_name", "text"), ("report_col_hour", "text"), ("report_col_forecast_qty", "text")],
+        "function": forecast_report, # Ver utils/forecast.py
+    },
+    "sales_by_category_hour": {
+        "label": "report_sales_by_category_hour",
+        "columns": [("report_col_category", "text"), ("report_col_hour", "text"), ("report_col_product_qty", "int"), ("report_col_total", "money")],
+        "function": category_hour_report, # Ver utils/sales_cube.py
+    },
+}
+
+
+def date_range_bounds(start_date, end_date):
+    """
+    Convierte un rango de fechas 'YYYY-MM-DD' (ambas incluidas) en los límites de sale_date
+    usados por las consultas: [inicio 00:00:00, día siguiente al fin 00:00:00).
+    Lanza ValueError si las fechas no son válidas o el inicio es posterior al fin.
+    """
+    start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+    if start > end:
+        raise ValueError("La fecha de inicio es posterior a la fecha de fin.")
+    return f"{start} 00:00:00", f"{end + datetime.timedelta(days=1)} 00:00:00"
+
+
+def run_report(report_name, start_date, end_date, lang="es", conn=None):
+    """
+    Ejecuta un reporte de REPORTS entre dos fechas 'YYYY-MM-DD' (ambas incluidas).
+    Retorna la lista de filas (tuplas, importes en centavos). Si no se pasa conn, abre una
+    conexión de solo lectura propia, así que se puede llamar desde un hilo secundario.
+    """
+    date_range_bounds(start_date, end_date) # Valida las fechas
+    own_connection = conn is None
+    if own_connection:
+        conn = open_read_only_connection()
+    try:
+        report = REPORTS[report_name]
+        if "function" in report:
+            return report["function"](conn, start_date, end_date, lang)
+        return conn.execute(report["sql"], {"start": start_date, "end": end_date, "lang": lang}).fetchall()
+    finally:
+        if own_connection:
+            conn.close()
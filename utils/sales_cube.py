@@ -0,0 +1,424 @@
+# utils/sales_cube.py
+#
+# Cubo de ventas preagregado para tablas dinámicas: agrupar y filtrar por día, día de la semana, mes,
+# hora, categoría, producto, variante y modificador sin volver a SQLite. Se arma desde los rollups:
+#   - "sales": arreglo denso días × 24 horas × (tickets, impuestos, total).
+#   - "products": hechos dispersos (día, hora, producto, variante) -> (cantidad, líneas, descuento,
+#     importe), ordenados por día; la mayoría de las combinaciones producto×hora nunca se venden.
+#     Además, el arreglo denso días × 24 × categorías × (cantidad, importe) responde sin recorrer los
+#     hechos las consultas que no bajan a producto o variante.
+#   - "modifiers": arreglo denso días × modificadores × (veces agregado, cantidad, importe).
+# La categoría de cada producto es la actual al armar el día (igual que al recalcular los rollups).
+#
+# Cada arreglo se guarda como .npy en CUBE_DIR/<generación>/ y se abre con mmap: reabrir el cubo no
+# lee nada hasta que una consulta toca los datos. Cada actualización solo relee de SQLite los días
+# posteriores al último día cerrado y escribe una generación nueva; CUBE_DIR/CURRENT indica la vigente.
+# Uso desde consola (p. ej. cada noche):
+#   python -m utils.sales_cube update|rebuild
+
+import datetime
+import itertools
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from database import DB_DIR, open_read_only_connection
+
+CUBE_DIR = os.path.join(DB_DIR, "cube")
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+EPOCH = datetime.date(1970, 1, 1)
+DENSE_GROUP_LIMIT = 1 << 22 # Hasta este número de celdas se agrupa con bincount; más, con np.unique
+
+TABLES = {
+    "sales": {
+        "dimensions": ("day", "weekday", "month", "hour"),
+        "measures": ("tickets", "tax_amount", "total_amount"),
+    },
+    "products": {
+        "dimensions": ("day", "weekday", "month", "hour", "category", "product", "variant"),
+        "measures": ("quantity", "lines", "discount_amount", "revenue"),
+    },
+    "modifiers": {
+        "dimensions": ("day", "weekday", "month", "modifier"),
+        "measures": ("attach_count", "quantity", "revenue"),
+    },
+}
+CATEGORY_MEASURES = ("quantity", "revenue") # Medidas del arreglo denso por categoría
+DAY_DIMENSIONS = ("day", "weekday", "month")
+# Filtros de aggregate(): {nombre del argumento: dimensión}
+FILTERS = {"hours": "hour", "weekdays": "weekday", "categories": "category", "products": "product", "variants": "variant", "modifiers": "modifier"}
+
+# Los días se leen como días desde 1970-01-01; el orden de la clave primaria deja los hechos ordenados por día
+EPOCH_DAY_SQL = "CAST(julianday(day) - 2440587.5 AS INTEGER)"
+PRODUCTS_SQL = f"""
+    SELECT {EPOCH_DAY_SQL}, hour, product_id, variant_id, quantity, lines, discount_amount, revenue
+    FROM rollup_product_hourly
+    WHERE day > :after
+"""
+SALES_SQL = f"""
+    SELECT {EPOCH_DAY_SQL}, hour, tickets, tax_amount, total_amount
+    FROM rollup_sales_hourly
+    WHERE day > :after
+"""
+MODIFIERS_SQL = f"""
+    SELECT {EPOCH_DAY_SQL}, modifier_id, attach_count, quantity, revenue
+    FROM rollup_modifier_daily
+    WHERE day > :after
+"""
+PRODUCT_CATEGORIES_SQL = "SELECT id, COALESCE(category_id, 0) FROM products"
+WATERMARK_SQL = "SELECT COALESCE(MAX(id), 0) FROM sales"
+
+
+def epoch_day(day):
+    """Días desde 1970-01-01 de una fecha (date o 'YYYY-MM-DD')."""
+    if isinstance(day, str):
+        day = datetime.date.fromisoformat(day)
+    return (day - EPOCH).days
+
+
+def fetch_array(conn, sql, params, columns):
+    """Resultado de una consulta como arreglo int64 (filas, columns), sin armar la lista de tuplas."""
+    return np.fromiter(itertools.chain.from_iterable(conn.execute(sql, params)), dtype=np.int64).reshape(-1, columns)
+
+
+def remap(old_ids, new_ids):
+    """Posición en new_ids (ordenado) de cada id de old_ids."""
+    return np.searchsorted(new_ids, old_ids)
+
+
+class SalesCube:
+    """
+    Cubo abierto (en general con mmap). Las dimensiones se guardan como índices: el día como días desde
+    first_day y categorías, productos, variantes y modificadores como posición en sus arreglos de ids.
+    """
+
+    ARRAYS = ("fact_day", "fact_hour", "fact_product", "fact_variant", "fact_category", "fact_measures", "sales",
+              "category", "modifier", "product_ids", "variant_ids", "category_ids", "modifier_ids")
+
+    def __init__(self, arrays, meta):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.first_day = meta["first_day"] # Días desde 1970-01-01 del índice de día 0
+        self.complete_until = meta["complete_until"] # Último día cerrado: los siguientes se releen al actualizar
+        self.watermark = meta["watermark"] # MAX(sales.id) al armar el cubo
+        self.days = len(self.sales)
+        calendar = [EPOCH + datetime.timedelta(days=self.first_day + offset) for offset in range(self.days)]
+        self.day_weekday = np.array([day.weekday() for day in calendar], dtype=np.int64)
+        months = [day.year * 12 + day.month - 1 for day in calendar]
+        first_month = months[0] if months else 0
+        self.day_month = np.array(months, dtype=np.int64) - first_month
+        self.month_labels = [f"{month // 12:04d}-{month % 12 + 1:02d}" for month in range(first_month, (months[-1] + 1) if months else 0)]
+
+    @classmethod
+    def empty(cls, first_day, complete_until, watermark=0):
+        empty_int = np.empty(0, dtype=np.int64)
+        arrays = {name: empty_int for name in cls.ARRAYS}
+        arrays["fact_measures"] = np.empty((0, 4), dtype=np.int64)
+        arrays["sales"] = np.empty((0, 24, 3), dtype=np.int64)
+        arrays["category"] = np.empty((0, 24, 0, 2), dtype=np.int64)
+        arrays["modifier"] = np.empty((0, 0, 3), dtype=np.int64)
+        return cls(arrays, {"first_day": first_day, "complete_until": complete_until, "watermark": watermark})
+
+    def size(self, dimension):
+        """Cantidad de valores posibles de una dimensión (tamaño de su espacio de índices)."""
+        return {
+            "day": self.days, "weekday": 7, "month": len(self.month_labels), "hour": 24,
+            "category": len(self.category_ids), "product": len(self.product_ids),
+            "variant": len(self.variant_ids), "modifier": len(self.modifier_ids),
+        }[dimension]
+
+    def labels(self, dimension, indexes):
+        """Valores visibles de una lista de índices: 'AAAA-MM-DD', 0-6 (lunes = 0), 'AAAA-MM', hora o id."""
+        if dimension == "day":
+            return [(EPOCH + datetime.timedelta(days=self.first_day + index)).isoformat() for index in indexes.tolist()]
+        if dimension == "month":
+            return [self.month_labels[index] for index in indexes.tolist()]
+        if dimension in ("weekday", "hour"):
+            return indexes.tolist()
+        ids = {"category": self.category_ids, "product": self.product_ids, "variant": self.variant_ids, "modifier": self.modifier_ids}[dimension]
+        return ids[indexes].tolist()
+
+    def index_filter(self, dimension, values):
+        """Máscara booleana sobre el espacio de índices de una dimensión con los valores pedidos."""
+        mask = np.zeros(self.size(dimension), dtype=bool)
+        values = np.asarray(list(values), dtype=np.int64)
+        if dimension in ("weekday", "hour"):
+            mask[values[(values >= 0) & (values < len(mask))]] = True
+            return mask
+        ids = {"category": self.category_ids, "product": self.product_ids, "variant": self.variant_ids, "modifier": self.modifier_ids}[dimension]
+        positions = np.searchsorted(ids, values)
+        found = positions < len(ids)
+        found[found] = ids[positions[found]] == values[found]
+        mask[positions[found]] = True
+        return mask
+
+    def day_range(self, start_date=None, end_date=None):
+        """Índices [desde, hasta) de los días entre dos fechas 'YYYY-MM-DD' (ambas incluidas; None = sin límite)."""
+        low = epoch_day(start_date) - self.first_day if start_date else 0
+        high = epoch_day(end_date) - self.first_day + 1 if end_date else self.days
+        return min(max(low, 0), self.days), min(max(high, 0), self.days)
+
+    def aggregate(self, table, by=(), measures=None, start_date=None, end_date=None, **filters):
+        """
+        Suma las medidas de una tabla del cubo ("sales", "products" o "modifiers") agrupadas por las dimensiones
+        de by, entre dos fechas 'YYYY-MM-DD' (ambas incluidas). Filtros opcionales: hours, weekdays, categories,
+        products, variants y modifiers (listas de valores o ids). Retorna filas (valores de by..., medidas...)
+        ordenadas por by, solo de los grupos con alguna medida distinta de cero. Ejemplos:
+            cube.aggregate("products", by=("category", "hour"), measures=("revenue",))
+            cube.aggregate("products", by=("product",), start_date="2024-05-01", end_date="2024-05-31", hours=range(12, 16))
+            cube.aggregate("sales", by=("weekday", "hour"))
+        """
+        definition = TABLES[table]
+        measures = tuple(measures or definition["measures"])
+        filter_dimensions = {}
+        for name, values in filters.items():
+            if name not in FILTERS:
+                raise TypeError(f"Filtro desconocido: {name}")
+            filter_dimensions[FILTERS[name]] = self.index_filter(FILTERS[name], values)
+        for dimension in (*by, *filter_dimensions):
+            if dimension not in definition["dimensions"]:
+                raise ValueError(f"La tabla '{table}' no tiene la dimensión '{dimension}'")
+        for measure in measures:
+            if measure not in definition["measures"]:
+                raise ValueError(f"La tabla '{table}' no tiene la medida '{measure}'")
+        low, high = self.day_range(start_date, end_date)
+
+        if table == "products" and not {"product", "variant"} & {*by, *filter_dimensions} and set(measures) <= set(CATEGORY_MEASURES):
+            coordinates, values = self.dense_cells(self.category, ("day", "hour", "category"), CATEGORY_MEASURES, measures, low, high, by, filter_dimensions)
+        elif table == "products":
+            coordinates, values = self.fact_cells(measures, low, high, filter_dimensions)
+        elif table == "sales":
+            coordinates, values = self.dense_cells(self.sales, ("day", "hour"), definition["measures"], measures, low, high, by, filter_dimensions)
+        else:
+            coordinates, values = self.dense_cells(self.modifier, ("day", "modifier"), definition["measures"], measures, low, high, by, filter_dimensions)
+        return self.group(coordinates, values, by)
+
+    def dense_cells(self, array, axes, array_measures, measures, low, high, by, filter_dimensions):
+        """
+        Celdas de un arreglo denso ya filtradas y sumadas en los ejes que la consulta no necesita.
+        Retorna ({dimensión: índices}, medidas (celdas, len(measures))).
+        """
+        array = array[low:high][..., [array_measures.index(measure) for measure in measures]]
+        indexes = {"day": np.arange(low, high)}
+        day_mask = np.ones(high - low, dtype=bool)
+        if "weekday" in filter_dimensions:
+            day_mask &= filter_dimensions["weekday"][self.day_weekday[low:high]]
+        if not day_mask.all():
+            array = array[day_mask]
+            indexes["day"] = indexes["day"][day_mask]
+        for axis, dimension in enumerate(axes[1:], start=1):
+            indexes[dimension] = np.arange(array.shape[axis])
+            if dimension in filter_dimensions:
+                keep = np.flatnonzero(filter_dimensions[dimension])
+                array = array.take(keep, axis=axis)
+                indexes[dimension] = keep
+        # Los ejes que no se agrupan se suman en bloque; el día se conserva si se agrupa por alguna fecha
+        needed = {("day" if dimension in DAY_DIMENSIONS else dimension) for dimension in by}
+        summed = tuple(axis for axis, dimension in enumerate(axes) if dimension not in needed)
+        array = array.sum(axis=summed) if summed else np.asarray(array)
+        kept = [dimension for dimension in axes if dimension in needed]
+        if not kept:
+            return {}, array.reshape(1, -1)
+        cells = np.nonzero(np.any(array != 0, axis=-1))
+        coordinates = {dimension: indexes[dimension][cell] for dimension, cell in zip(kept, cells)}
+        return coordinates, array[cells].reshape(-1, len(measures))
+
+    def fact_cells(self, measures, low, high, filter_dimensions):
+        """Hechos de producto de los días [low, high) que pasan los filtros, con sus coordenadas."""
+        first, last = np.searchsorted(self.fact_day, [low, high]) # Los hechos están ordenados por día
+        coordinates = {
+            "day": self.fact_day[first:last], "hour": self.fact_hour[first:last],
+            "product": self.fact_product[first:last], "variant": self.fact_variant[first:last],
+            "category": self.fact_category[first:last],
+        }
+        values = self.fact_measures[first:last][:, [TABLES["products"]["measures"].index(measure) for measure in measures]]
+        mask = None
+        for dimension, dimension_mask in filter_dimensions.items():
+            index = self.day_weekday[coordinates["day"]] if dimension == "weekday" else coordinates[dimension]
+            mask = dimension_mask[index] if mask is None else mask & dimension_mask[index]
+        if mask is not None:
+            coordinates = {dimension: index[mask] for dimension, index in coordinates.items()}
+            values = values[mask]
+        return coordinates, values
+
+    def group(self, coordinates, values, by):
+        """Suma values por las dimensiones de by y arma las filas del resultado."""
+        if "weekday" in by or "month" in by:
+            coordinates = dict(coordinates, weekday=self.day_weekday[coordinates["day"]], month=self.day_month[coordinates["day"]])
+        if not by:
+            totals = np.asarray(values, dtype=np.int64).sum(axis=0)
+            return [tuple(totals.tolist())] if totals.any() else []
+        sizes = [self.size(dimension) for dimension in by]
+        keys = np.ravel_multi_index([coordinates[dimension] for dimension in by], sizes)
+        if np.prod(sizes, dtype=np.float64) <= DENSE_GROUP_LIMIT:
+            group_keys, inverse = None, keys
+            length = int(np.prod(sizes))
+        else:
+            group_keys, inverse = np.unique(keys, return_inverse=True)
+            length = len(group_keys)
+        sums = np.column_stack([
+            np.rint(np.bincount(inverse, weights=values[:, column], minlength=length)).astype(np.int64)
+            for column in range(values.shape[1])
+        ])
+        present = np.flatnonzero(np.any(sums != 0, axis=1))
+        present_keys = present if group_keys is None else group_keys[present]
+        labels = [self.labels(dimension, index) for dimension, index in zip(by, np.unravel_index(present_keys, sizes))]
+        return [(*key, *row) for key, row in zip(zip(*labels), sums[present].tolist())]
+
+
+def current_generation(cube_dir):
+    try:
+        with open(os.path.join(cube_dir, CURRENT_FILE), encoding="utf-8") as current_file:
+            return current_file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_array(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError: # Un arreglo vacío no se puede mapear
+        return np.load(path)
+
+
+def load_cube(cube_dir=CUBE_DIR):
+    """Abre el cubo vigente con mmap, o retorna None si todavía no se armó."""
+    for _ in range(3): # Otra actualización puede cambiar de generación mientras se abre
+        generation = current_generation(cube_dir)
+        if generation is None:
+            return None
+        path = os.path.join(cube_dir, generation)
+        try:
+            with open(os.path.join(path, META_FILE), encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+            arrays = {name: load_array(os.path.join(path, f"{name}.npy")) for name in SalesCube.ARRAYS}
+        except FileNotFoundError:
+            continue
+        return SalesCube(arrays, meta)
+    return None
+
+
+def save_cube(cube, cube_dir=CUBE_DIR):
+    """Guarda el cubo en una generación nueva, la marca como vigente y borra las anteriores."""
+    generation = f"g{time.time_ns()}-{os.getpid()}"
+    path = os.path.join(cube_dir, generation)
+    os.makedirs(path)
+    for name in SalesCube.ARRAYS:
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(cube, name)))
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as meta_file:
+        json.dump({"first_day": cube.first_day, "complete_until": cube.complete_until, "watermark": cube.watermark}, meta_file)
+    temp_path = os.path.join(cube_dir, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as current_file:
+        current_file.write(generation)
+    os.replace(temp_path, os.path.join(cube_dir, CURRENT_FILE))
+    # Las generaciones viejas que sigan abiertas con mmap se liberan cuando se cierran (en Windows no se
+    # pueden borrar mientras tanto y quedan para la próxima actualización)
+    for entry in os.listdir(cube_dir):
+        if entry != generation and entry.startswith("g"):
+            shutil.rmtree(os.path.join(cube_dir, entry), ignore_errors=True)
+
+
+def extend_cube(cube, conn, complete_until, watermark):
+    """
+    Retorna un cubo nuevo con los días de cube hasta cube.complete_until y los días posteriores releídos de
+    los rollups. Los ids de categorías, productos, variantes y modificadores nuevos se insertan ordenados.
+    """
+    after = (EPOCH + datetime.timedelta(days=cube.complete_until)).isoformat() if cube.complete_until >= 0 else ""
+    products = fetch_array(conn, PRODUCTS_SQL, {"after": after}, 8)
+    sales = fetch_array(conn, SALES_SQL, {"after": after}, 5)
+    modifiers = fetch_array(conn, MODIFIERS_SQL, {"after": after}, 5)
+    product_categories = fetch_array(conn, PRODUCT_CATEGORIES_SQL, {}, 2)
+
+    first_day = cube.first_day
+    if cube.days == 0:
+        starts = [array[:, 0].min() for array in (products, sales, modifiers) if len(array)]
+        first_day = int(min(starts)) if starts else complete_until + 1
+    keep_days = min(max(cube.complete_until - first_day + 1, 0), cube.days)
+    ends = [int(array[:, 0].max()) - first_day + 1 for array in (products, sales, modifiers) if len(array)]
+    days = max([keep_days, *ends])
+
+    # Ids: los ya conocidos más los nuevos, ordenados; los índices guardados se trasladan
+    product_ids = np.union1d(cube.product_ids, products[:, 2])
+    variant_ids = np.union1d(cube.variant_ids, products[:, 3])
+    # Los días nuevos toman la categoría actual de cada producto (0 si no tiene o ya no existe)
+    category_by_product = dict(zip(product_categories[:, 0].tolist(), product_categories[:, 1].tolist()))
+    new_fact_categories = np.array([category_by_product.get(product_id, 0) for product_id in products[:, 2].tolist()], dtype=np.int64)
+    category_ids = np.union1d(cube.category_ids, new_fact_categories)
+    modifier_ids = np.union1d(cube.modifier_ids, modifiers[:, 1])
+
+    kept_facts = np.searchsorted(cube.fact_day, keep_days)
+    new_facts = products[:, 0] - first_day
+    arrays = {
+        "fact_day": np.concatenate([cube.fact_day[:kept_facts], new_facts]),
+        "fact_hour": np.concatenate([cube.fact_hour[:kept_facts], products[:, 1]]),
+        "fact_product": np.concatenate([remap(cube.product_ids, product_ids)[cube.fact_product[:kept_facts]], remap(products[:, 2], product_ids)]),
+        "fact_variant": np.concatenate([remap(cube.variant_ids, variant_ids)[cube.fact_variant[:kept_facts]], remap(products[:, 3], variant_ids)]),
+        "fact_category": np.concatenate([remap(cube.category_ids, category_ids)[cube.fact_category[:kept_facts]], remap(new_fact_categories, category_ids)]),
+        "fact_measures": np.concatenate([cube.fact_measures[:kept_facts], products[:, 4:8]]),
+        "product_ids": product_ids, "variant_ids": variant_ids, "category_ids": category_ids, "modifier_ids": modifier_ids,
+    }
+
+    sales_array = np.zeros((days, 24, 3), dtype=np.int64)
+    sales_array[:keep_days] = cube.sales[:keep_days]
+    sales_array[sales[:, 0] - first_day, sales[:, 1]] = sales[:, 2:5]
+    arrays["sales"] = sales_array
+
+    category_array = np.zeros((days, 24, len(category_ids), 2), dtype=np.int64)
+    category_array[:keep_days, :, remap(cube.category_ids, category_ids)] = cube.category[:keep_days]
+    cells = (new_facts * 24 + products[:, 1]) * len(category_ids) + arrays["fact_category"][kept_facts:]
+    for column, measure_column in enumerate((4, 7)): # Cantidad e importe
+        category_array[..., column] += np.bincount(cells, weights=products[:, measure_column],
+                                                   minlength=category_array[..., column].size).astype(np.int64).reshape(category_array.shape[:3])
+    arrays["category"] = category_array
+
+    modifier_array = np.zeros((days, len(modifier_ids), 3), dtype=np.int64)
+    modifier_array[:keep_days, remap(cube.modifier_ids, modifier_ids)] = cube.modifier[:keep_days]
+    modifier_array[modifiers[:, 0] - first_day, remap(modifiers[:, 1], modifier_ids)] = modifiers[:, 2:5]
+    arrays["modifier"] = modifier_array
+    return SalesCube(arrays, {"first_day": first_day, "complete_until": complete_until, "watermark": watermark})
+
+
+def update_cube(conn=None, full=False, cube_dir=CUBE_DIR):
+    """
+    Actualiza el cubo guardado: relee los días posteriores a su último día cerrado (o todo, si full) y lo
+    guarda. Si no entraron ventas ni cerró un día desde la última actualización, retorna el mismo cubo.
+    Retorna el cubo abierto con mmap.
+    """
+    own_connection = conn is None
+    if own_connection:
+        conn = open_read_only_connection()
+    try:
+        complete_until = epoch_day(datetime.date.today()) - 1 # El día en curso se relee en cada actualización
+        watermark = conn.execute(WATERMARK_SQL).fetchone()[0]
+        cube = None if full else load_cube(cube_dir)
+        if cube is not None and cube.watermark == watermark and cube.complete_until == complete_until:
+            return cube
+        if cube is None or cube.complete_until > complete_until: # Sin cubo, o cambió la fecha del equipo
+            cube = SalesCube.empty(first_day=0, complete_until=-1)
+        save_cube(extend_cube(cube, conn, complete_until, watermark), cube_dir)
+    finally:
+        if own_connection:
+            conn.close()
+    return load_cube(cube_dir)
+
+
+def category_hour_report(conn, start_date, end_date, lang):
+    """Filas (categoría, hora, cantidad, importe) del cubo, para el reporte 'sales_by_category_hour' de REPORTS."""
+    cube = update_cube(conn)
+    rows = cube.aggregate("products", by=("category", "hour"), measures=CATEGORY_MEASURES, start_date=start_date, end_date=end_date)
+    name_column = "name_en" if lang == "en" else "name_es"
+    names = dict(conn.execute(f"SELECT id, {name_column} FROM categories"))
+    return [(names.get(category_id, "-"), f"{hour:02d}:00", quantity, revenue) for category_id, hour, quantity, revenue in rows]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("update", "rebuild"):
+        print("Uso: python -m utils.sales_cube update|rebuild")
+        sys.exit(1)
+    updated = update_cube(full=sys.argv[1] == "rebuild")
+    print(f"Cubo actualizado: {updated.days} días, {len(updated.fact_day)} hechos de producto")
@@ -0,0 +1,211 @@
+# utils/sales_export.py
+#
+# Exportación de ventas (con sus ítems y modificadores) a CSV o JSON Lines comprimidos con gzip.
+# Todo el recorrido es un flujo de generadores sobre cursores con fetchmany: la memoria usada
+# no depende del rango exportado. Uso desde consola:
+#   python -m utils.sales_export ARCHIVO.jsonl.gz|ARCHIVO.csv.gz FECHA_INICIO FECHA_FIN
+
+import csv
+import gzip
+import json
+import sys
+
+from database import open_read_only_connection
+from utils.partitions import attached_partitions, split_date_range
+from utils.report_queries import date_range_bounds, localized
+
+BATCH_SIZE = 1000 # Filas por fetchmany
+PROGRESS_EVERY = 1000 # Ventas entre dos avisos de progreso
+COMPRESS_LEVEL = 6 # Como gzip en consola; el nivel 9 de gzip.open tarda el doble y comprime casi lo mismo
+
+# Las tres consultas recorren el rango en el mismo orden (id de venta, luego id de ítem), así se
+# pueden unir en un solo paso sin guardar más que la venta actual. Importes en centavos.
+SALES_SQL = """
+    SELECT s.id, s.sale_date, s.total_amount, s.tax_amount
+    FROM sales s
+    WHERE s.sale_date >= :start AND s.sale_date < :end
+    ORDER BY s.id
+"""
+
+ITEMS_SQL = f"""
+    SELECT si.sale_id, si.id, si.product_id, {localized("p")}, si.variant_id, {localized("v")},
+           si.quantity, si.price_at_sale, si.discount_amount
+    FROM sales s
+    JOIN sale_items si ON si.sale_id = s.id
+    LEFT JOIN products p ON p.id = si.product_id
+    LEFT JOIN variants v ON v.id = si.variant_id
+    WHERE s.sale_date >= :start AND s.sale_date < :end
+    ORDER BY s.id, si.id
+"""
+
+MODIFIERS_SQL = f"""
+    SELECT si.sale_id, sim.sale_item_id, sim.modifier_id, {localized("m")}, sim.quantity, sim.price_at_sale
+    FROM sales s
+    JOIN sale_items si ON si.sale_id = s.id
+    JOIN sale_item_modifiers sim ON sim.sale_item_id = si.id
+    LEFT JOIN modifiers m ON m.id = sim.modifier_id
+    WHERE s.sale_date >= :start AND s.sale_date < :end
+    ORDER BY s.id, si.id, sim.id
+"""
+
+CSV_COLUMNS = [
+    "sale_id", "sale_date", "total_amount", "tax_amount", "sale_item_id", "product_id", "product_name",
+    "variant_id", "variant_name", "quantity", "price_at_sale", "discount_amount", "modifiers",
+]
+
+
+def iter_rows(cursor, batch_size=BATCH_SIZE):
+    """Genera las filas de un cursor leyendo de a batch_size con fetchmany."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def group_by_key(rows, key_length):
+    """
+    Agrupa filas consecutivas con la misma clave (sus primeras key_length columnas).
+    Genera (clave, [filas]); las filas deben venir ordenadas por la clave.
+    """
+    current_key, group = None, []
+    for row in rows:
+        key = row[:key_length]
+        if key != current_key and group:
+            yield current_key, group
+            group = []
+        current_key = key
+        group.append(row)
+    if group:
+        yield current_key, group
+
+
+def iter_sales(conn, start_date, end_date, lang="es"):
+    """
+    Genera cada venta del rango como un diccionario con sus ítems y los modificadores de cada ítem.
+    Une los tres cursores por id (como un merge join), sin cargar el rango en memoria.
+    """
+    start, end = date_range_bounds(start_date, end_date)
+    params = {"start": start, "end": end, "lang": lang}
+    items_by_sale = group_by_key(iter_rows(conn.execute(ITEMS_SQL, params)), 1)
+    modifiers_by_item = group_by_key(iter_rows(conn.execute(MODIFIERS_SQL, params)), 2)
+    next_items = next(items_by_sale, None)
+    next_modifiers = next(modifiers_by_item, None)
+
+    for sale_id, sale_date, total_amount, tax_amount in iter_rows(conn.execute(SALES_SQL, params)):
+        items = []
+        if next_items is not None and next_items[0] == (sale_id,):
+            for _, item_id, product_id, product_name, variant_id, variant_name, quantity, price, discount in next_items[1]:
+                modifiers = []
+                if next_modifiers is not None and next_modifiers[0] == (sale_id, item_id):
+                    modifiers = [
+                        {"modifier_id": modifier_id, "name": name, "quantity": mod_qty, "price_at_sale": mod_price}
+                        for _, _, modifier_id, name, mod_qty, mod_price in next_modifiers[1]
+                    ]
+                    next_modifiers = next(modifiers_by_item, None)
+                items.append({
+                    "sale_item_id": item_id,
+                    "product_id": product_id,
+                    "product_name": product_name,
+                    "variant_id": variant_id,
+                    "variant_name": variant_name,
+                    "quantity": quantity,
+                    "price_at_sale": price,
+                    "discount_amount": discount,
+                    "modifiers": modifiers,
+                })
+            next_items = next(items_by_sale, None)
+        yield {
+            "sale_id": sale_id,
+            "sale_date": sale_date,
+            "total_amount": total_amount,
+            "tax_amount": tax_amount,
+            "items": items,
+        }
+
+
+def jsonl_lines(sales):
+    """Una línea JSON por venta."""
+    for sale in sales:
+        yield json.dumps(sale, ensure_ascii=False) + "\n"
+
+
+def csv_rows(sales):
+    """
+    Una fila CSV por ítem de venta, con los datos de la venta repetidos. Los modificadores van en una
+    sola columna como 'id:cantidad:precio' separados por ';'. Las ventas sin ítems dan una fila vacía de ítem.
+    """
+    for sale in sales:
+        sale_columns = [sale["sale_id"], sale["sale_date"], sale["total_amount"], sale["tax_amount"]]
+        if not sale["items"]:
+            yield sale_columns + [""] * (len(CSV_COLUMNS) - len(sale_columns))
+        for item in sale["items"]:
+            modifiers = ";".join(f"{m['modifier_id']}:{m['quantity']}:{m['price_at_sale']}" for m in item["modifiers"])
+            yield sale_columns + [
+                item["sale_item_id"], item["product_id"], item["product_name"], item["variant_id"] or "",
+                item["variant_name"] or "", item["quantity"], item["price_at_sale"], item["discount_amount"], modifiers,
+            ]
+
+
+def with_progress(sales, total, progress):
+    """Pasa las ventas sin cambios y llama a progress(exportadas, total) cada PROGRESS_EVERY ventas."""
+    count = 0
+    for sale in sales:
+        yield sale
+        count += 1
+        if count % PROGRESS_EVERY == 0:
+            progress(count, total)
+    progress(count, total)
+
+
+def iter_ranges(conn, ranges, lang):
+    """Ventas de varios tramos de fechas seguidos, cada uno con sus meses archivados adjuntos."""
+    for first_day, last_day in ranges:
+        with attached_partitions(conn, first_day, last_day):
+            yield from iter_sales(conn, first_day, last_day, lang)
+
+
+def export_sales(path, start_date, end_date, lang="es", progress=None):
+    """
+    Exporta las ventas entre dos fechas 'YYYY-MM-DD' (ambas incluidas) a path, comprimido con gzip.
+    El formato sale de la extensión: '.csv.gz' para CSV, cualquier otra para JSON Lines.
+    Usa su propia conexión de solo lectura, así que se puede (y conviene) llamar desde un hilo secundario.
+    Incluye los meses archivados (utils/partitions.py), por tramos de a lo sumo MAX_ATTACHED meses.
+    progress, si se indica, recibe (ventas exportadas, total de ventas). Retorna el número de ventas exportadas.
+    """
+    conn = open_read_only_connection()
+    try:
+        ranges = split_date_range(conn, start_date, end_date)
+        total = 0
+        for first_day, last_day in ranges:
+            start, end = date_range_bounds(first_day, last_day)
+            with attached_partitions(conn, first_day, last_day):
+                total += conn.execute("SELECT COUNT(*) FROM sales WHERE sale_date >= ? AND sale_date < ?", (start, end)).fetchone()[0]
+        exported = 0
+
+        def report(done, total):
+            nonlocal exported
+            exported = done
+            if progress:
+                progress(done, total)
+
+        sales = with_progress(iter_ranges(conn, ranges, lang), total, report)
+        with gzip.open(path, "wt", compresslevel=COMPRESS_LEVEL, encoding="utf-8", newline="") as export_file:
+            if path.lower().endswith(".csv.gz"):
+                writer = csv.writer(export_file)
+                writer.writerow(CSV_COLUMNS)
+                writer.writerows(csv_rows(sales))
+            else:
+                export_file.writelines(jsonl_lines(sales))
+        return exported
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Uso: python -m utils.sales_export ARCHIVO.jsonl.gz|ARCHIVO.csv.gz FECHA_INICIO FECHA_FIN")
+        sys.exit(1)
+    count = export_sales(sys.argv[1], sys.argv[2], sys.argv[3],
+                         progress=lambda done, total: print(f"\r{done}/{total} ventas", end="", flush=True))
+    print(f"\n{count} ventas exportadas a {sys.argv[1]}")
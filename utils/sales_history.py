@@ -0,0 +1,115 @@
+# utils/sales_history.py
+
+import contextlib
+from collections import OrderedDict
+
+from database import get_db_connection, open_read_only_connection
+from utils.partitions import attached_partitions
+from utils.report_queries import date_range_bounds
+
+PAGE_SIZE = 200 # Ventas por página de la consulta
+MAX_CACHED_PAGES = 20 # Páginas que se guardan en memoria (las menos usadas se descartan)
+
+# Una clave de inicio (sale_date, id) cada PAGE_SIZE ventas, de la más reciente a la más antigua.
+# Se calcula sobre el índice de sale_date (que incluye el id), sin leer las filas de sales.
+# Cada fila lleva también el total de ventas del rango, así ambos salen de la misma lectura.
+ANCHORS_SQL = """
+    SELECT sale_date, id, total FROM (
+        SELECT sale_date, id, ROW_NUMBER() OVER (ORDER BY sale_date DESC, id DESC) - 1 AS position, COUNT(*) OVER () AS total
+        FROM sales
+        WHERE sale_date >= :start AND sale_date < :end
+    )
+    WHERE position % :page_size = 0
+    ORDER BY position
+"""
+
+# Una página por keyset: las PAGE_SIZE ventas que siguen a la clave de inicio, sin OFFSET
+PAGE_SQL = """
+    SELECT s.id, s.sale_date, (SELECT COUNT(*) FROM sale_items si WHERE si.sale_id = s.id), s.tax_amount, s.total_amount
+    FROM sales s
+    WHERE s.sale_date >= :start AND s.sale_date < :end AND s.sale_date <= :anchor_date
+      AND (s.sale_date < :anchor_date OR (s.sale_date = :anchor_date AND s.id <= :anchor_id))
+    ORDER BY s.sale_date DESC, s.id DESC
+    LIMIT :page_size
+"""
+
+
+class SalesHistoryPager:
+    """
+    Acceso por posición a las ventas de un rango de fechas (de la más reciente a la más antigua),
+    pensado para una lista con scroll virtual: get_rows(posición, cantidad) solo lee las páginas
+    que cubren esas posiciones. Las páginas se leen por keyset sobre (sale_date, id) a partir de
+    claves de inicio calculadas una vez por filtro, así saltar a cualquier posición cuesta lo mismo.
+    Las filas son tuplas (id, sale_date, líneas, impuestos, total), con importes en centavos.
+    """
+
+    def __init__(self, start_date, end_date, page_size=PAGE_SIZE, conn=None):
+        """
+        Calcula las claves de inicio y el total de ventas del rango. Con muchos tickets tarda algo
+        (~0.6 s por 300.000 ventas), así que se puede crear en un hilo secundario pasando una conexión
+        propia (p. ej. open_read_only_connection()); las páginas se leen luego con la conexión global,
+        o con la del pager si se creó con open().
+        """
+        start, end = date_range_bounds(start_date, end_date)
+        self.params = {"start": start, "end": end, "page_size": page_size}
+        self.page_size = page_size
+        self.pages = OrderedDict() # {número de página: [filas]}, en orden de uso
+        self.conn = None # Conexión propia para las páginas (ver open()); None = la global
+        self.exit_stack = None
+        if conn is None:
+            conn, _ = get_db_connection()
+        rows = conn.execute(ANCHORS_SQL, self.params).fetchall()
+        self.anchors = [(sale_date, sale_id) for sale_date, sale_id, _ in rows]
+        self.count = rows[0][2] if rows else 0
+
+    @classmethod
+    def open(cls, start_date, end_date, page_size=PAGE_SIZE):
+        """
+        Crea el pager con una conexión de solo lectura propia que incluye los meses archivados del
+        rango (utils/partitions.py) y la conserva para leer las páginas. Se puede llamar desde un hilo
+        secundario; hay que cerrarlo con close(). Lanza ValueError si el rango toca demasiados meses archivados.
+        """
+        conn = open_read_only_connection(check_same_thread=False)
+        exit_stack = contextlib.ExitStack()
+        try:
+            exit_stack.callback(conn.close)
+            exit_stack.enter_context(attached_partitions(conn, start_date, end_date))
+            pager = cls(start_date, end_date, page_size, conn=conn)
+        except Exception:
+            exit_stack.close()
+            raise
+        pager.conn, pager.exit_stack = conn, exit_stack
+        return pager
+
+    def close(self):
+        """Separa los meses archivados y cierra la conexión propia (si se creó con open())."""
+        if self.exit_stack is not None:
+            self.exit_stack.close()
+            self.conn = self.exit_stack = None
+
+    def __len__(self):
+        return self.count
+
+    def get_page(self, page_number):
+        """Retorna las filas de una página, leyéndola de la base de datos si no está en caché."""
+        if page_number in self.pages:
+            self.pages.move_to_end(page_number)
+            return self.pages[page_number]
+        anchor_date, anchor_id = self.anchors[page_number]
+        conn = self.conn or get_db_connection()[0]
+        rows = conn.execute(PAGE_SQL, dict(self.params, anchor_date=anchor_date, anchor_id=anchor_id)).fetchall()
+        self.pages[page_number] = rows
+        if len(self.pages) > MAX_CACHED_PAGES:
+            self.pages.popitem(last=False)
+        return rows
+
+    def get_rows(self, position, count):
+        """Retorna hasta count filas a partir de la posición dada (0 = la venta más reciente)."""
+        position = max(0, min(position, self.count))
+        end = min(position + count, self.count)
+        rows = []
+        for page_number in range(position // self.page_size, (end - 1) // self.page_size + 1 if end > position else 0):
+            page_start = page_number * self.page_size
+            page = self.get_page(page_number)
+            rows.extend(page[max(position, page_start) - page_start:end - page_start])
+        return rows
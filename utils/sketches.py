@@ -0,0 +1,277 @@
+# utils/sketches.py
+#
+# Resúmenes aproximados (sketches) de las ventas de cada hora, para tableros en vivo:
+#   - HyperLogLog de los ids de venta: tickets distintos (error típico ~1,6 %).
+#   - Sketch de cuantiles (tipo DDSketch, error relativo del 1 %) del total del ticket y de los
+#     artículos por ticket: mediana, p95, etc.
+# El cobro actualiza el sketch de la hora en curso de esta terminal y lo guarda en sketch_hourly.
+# Los sketches se combinan sin perder precisión (máximo de registros / suma de conteos), así que
+# una ventana de N horas cuesta N filas por terminal, sin importar cuántas ventas haya.
+# Uso desde consola, para llenar sketch_hourly con el historial:
+#   python -m utils.sketches rebuild [FECHA_INICIO [FECHA_FIN]]
+
+import datetime
+import hashlib
+import math
+import os
+import socket
+import sys
+
+import numpy as np
+
+from database import get_db_connection, claim_database_file, create_tables, close_db_connection, first_live_day
+
+HLL_PRECISION = 12 # 2^12 registros de un byte
+RELATIVE_ACCURACY = 0.01
+# Cada terminal escribe sus propias filas; POS_TERMINAL permite distinguir dos instancias en un mismo equipo
+TERMINAL_ID = os.environ.get("POS_TERMINAL") or socket.gethostname()
+HISTORY_TERMINAL = "" # Filas calculadas desde el historial con rebuild_sketches()
+
+
+class HyperLogLog:
+    """Cuenta aproximada de valores distintos en 2^precision bytes."""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def add(self, value):
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1 # Posición del primer bit en 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        size = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / size) * size * size / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros) # Pocos valores: conteo lineal
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        registers = np.frombuffer(data, dtype=np.uint8).copy()
+        return cls(int(math.log2(len(registers))), registers)
+
+
+class QuantileSketch:
+    """
+    Cuantiles aproximados de valores no negativos: cada valor cae en un intervalo logarítmico
+    [gamma^(i-1), gamma^i) y solo se guarda cuántos hay en cada uno. El cuantil retornado
+    está a menos de RELATIVE_ACCURACY del valor exacto.
+    """
+
+    gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    log_gamma = math.log(gamma)
+
+    def __init__(self):
+        self.bins = {} # {índice del intervalo: cantidad}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def merge(self, other):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Valor aproximado del cuantil q (0..1), o None si el sketch está vacío."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1) # Punto medio relativo del intervalo
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_bytes(self):
+        values = [self.zero_count]
+        for index, count in sorted(self.bins.items()):
+            values += [index, count]
+        return np.array(values, dtype=np.int64).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        values = np.frombuffer(data, dtype=np.int64).tolist()
+        sketch = cls()
+        sketch.zero_count = values[0]
+        sketch.bins = dict(zip(values[1::2], values[2::2]))
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        return sketch
+
+
+class SalesSketch:
+    """Los tres sketches de un conjunto de ventas (una hora de una terminal, o la combinación de varias)."""
+
+    def __init__(self, ticket_ids=None, ticket_totals=None, ticket_items=None):
+        self.ticket_ids = ticket_ids or HyperLogLog()
+        self.ticket_totals = ticket_totals or QuantileSketch()
+        self.ticket_items = ticket_items or QuantileSketch()
+
+    def add_sale(self, sale_id, total_amount, item_count):
+        self.ticket_ids.add(sale_id)
+        self.ticket_totals.add(int(total_amount))
+        self.ticket_items.add(item_count)
+
+    def merge(self, other):
+        self.ticket_ids.merge(other.ticket_ids)
+        self.ticket_totals.merge(other.ticket_totals)
+        self.ticket_items.merge(other.ticket_items)
+        return self
+
+    def to_row(self):
+        return self.ticket_ids.to_bytes(), self.ticket_totals.to_bytes(), self.ticket_items.to_bytes()
+
+    @classmethod
+    def from_row(cls, ticket_ids, ticket_totals, ticket_items):
+        return cls(HyperLogLog.from_bytes(ticket_ids), QuantileSketch.from_bytes(ticket_totals), QuantileSketch.from_bytes(ticket_items))
+
+    def summary(self):
+        """{"tickets", "ticket_p50", "ticket_p95" (centavos), "items_p50", "items_p95"}; None donde no hay datos."""
+        return {
+            "tickets": self.ticket_ids.count(),
+            "ticket_p50": self.ticket_totals.quantile(0.5),
+            "ticket_p95": self.ticket_totals.quantile(0.95),
+            "items_p50": self.ticket_items.quantile(0.5),
+            "items_p95": self.ticket_items.quantile(0.95),
+        }
+
+
+UPSERT_SQL = """
+    INSERT INTO sketch_hourly (day, hour, terminal, ticket_ids, ticket_totals, ticket_items)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (day, hour, terminal) DO UPDATE SET
+        ticket_ids = excluded.ticket_ids, ticket_totals = excluded.ticket_totals, ticket_items = excluded.ticket_items
+"""
+
+_current_hour = None # (día, hora, SalesSketch, data_version) de esta terminal, para no releer la fila en cada cobro
+
+
+def record_sale(sale_id, sale_date, total_amount, item_count, conn=None):
+    """
+    Agrega una venta cobrada al sketch de su hora en esta terminal y guarda la fila.
+    Cada terminal es la única que escribe sus filas, así que la copia en memoria es la vigente mientras
+    ninguna otra conexión escriba: si PRAGMA data_version cambió (p. ej. un rebuild_sketches desde la
+    consola, que borra las filas de las terminales), la fila se vuelve a leer antes de sumarle la venta.
+    """
+    global _current_hour
+    day, hour = sale_date[:10], int(sale_date[11:13])
+    if conn is None:
+        conn, _ = get_db_connection()
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if _current_hour is None or _current_hour[:2] != (day, hour) or _current_hour[3] != data_version:
+        row = conn.execute(
+            "SELECT ticket_ids, ticket_totals, ticket_items FROM sketch_hourly WHERE day = ? AND hour = ? AND terminal = ?",
+            (day, hour, TERMINAL_ID),
+        ).fetchone()
+        _current_hour = (day, hour, SalesSketch.from_row(*row) if row else SalesSketch(), data_version)
+    sketch = _current_hour[2]
+    sketch.add_sale(sale_id, total_amount, item_count)
+    conn.execute(UPSERT_SQL, (day, hour, TERMINAL_ID, *sketch.to_row()))
+    conn.commit() # Los commits propios no cambian data_version de esta conexión
+
+
+def load_sketches(start, end, conn=None):
+    """
+    Combina los sketches de todas las terminales entre dos datetime (por hora; end excluido).
+    Retorna un SalesSketch (vacío si no hay ventas en el rango).
+    """
+    if conn is None:
+        conn, _ = get_db_connection()
+    first, last = (start.date().isoformat(), start.hour), (end.date().isoformat(), end.hour)
+    merged = SalesSketch()
+    rows = conn.execute(
+        "SELECT day, hour, ticket_ids, ticket_totals, ticket_items FROM sketch_hourly WHERE day >= ? AND day <= ?",
+        (first[0], last[0]),
+    )
+    for day, hour, *blobs in rows:
+        if first <= (day, hour) < last:
+            merged.merge(SalesSketch.from_row(*blobs))
+    return merged
+
+
+def window_sketches(hours, now=None, conn=None):
+    """Sketch combinado de las últimas hours horas, incluida la hora en curso."""
+    now = now or datetime.datetime.now()
+    end = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+    return load_sketches(end - datetime.timedelta(hours=hours), end, conn)
+
+
+def rebuild_sketches(conn=None, start_date=None, end_date=None):
+    """
+    Recalcula desde las ventas las filas de historial (terminal '') entre dos fechas 'YYYY-MM-DD'
+    (ambas incluidas; None = sin límite) y borra las de las terminales en ese rango, en una transacción.
+    Los meses ya archivados (ver utils/partitions.py) no se tocan.
+    """
+    global _current_hour
+    if conn is None:
+        conn, _ = get_db_connection()
+    start = datetime.date.fromisoformat(start_date).isoformat() if start_date else "0000-01-01"
+    end = (datetime.date.fromisoformat(end_date) + datetime.timedelta(days=1)).isoformat() if end_date else "9999-12-31"
+    start = max(start, first_live_day(conn) or start) # Los meses archivados conservan sus sketches
+    if start >= end:
+        return 0
+    rows = conn.execute(
+        """
+        SELECT s.id, substr(s.sale_date, 1, 10), CAST(substr(s.sale_date, 12, 2) AS INTEGER), s.total_amount,
+               COALESCE((SELECT SUM(si.quantity) FROM sale_items si WHERE si.sale_id = s.id), 0)
+        FROM sales s
+        WHERE s.sale_date >= ? AND s.sale_date < ?
+        """,
+        (start, end),
+    )
+    sketches = {}
+    for sale_id, day, hour, total_amount, item_count in rows:
+        sketch = sketches.get((day, hour))
+        if sketch is None:
+            sketch = sketches[(day, hour)] = SalesSketch()
+        sketch.add_sale(sale_id, total_amount, item_count)
+    if conn.in_transaction:
+        conn.commit()
+    try:
+        conn.execute("BEGIN")
+        conn.execute("DELETE FROM sketch_hourly WHERE day >= ? AND day < ?", (start, end))
+        conn.executemany(UPSERT_SQL, ((day, hour, HISTORY_TERMINAL, *sketch.to_row()) for (day, hour), sketch in sketches.items()))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    _current_hour = None
+    return len(sketches)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild" or len(sys.argv) > 4:
+        print("Uso: python -m utils.sketches rebuild [FECHA_INICIO [FECHA_FIN]]")
+        sys.exit(1)
+    try:
+        claim_database_file()
+    except RuntimeError as e:
+        sys.exit(str(e))
+    create_tables()
+    print(f"{rebuild_sketches(None, *sys.argv[2:])} horas recalculadas")
+    close_db_connection()
@@ -0,0 +1,99 @@
+# utils/tax.py
+
+from models import Category, Product, TaxRate, apply_percent
+
+
+class TaxLine:
+    """Impuesto acumulado de una tasa dentro de un pedido."""
+    __slots__ = ("tax_rate_id", "name", "rate", "is_inclusive", "taxable_amount", "tax_amount")
+
+    def __init__(self, tax_rate_id, name, rate, is_inclusive, taxable_amount, tax_amount):
+        self.tax_rate_id = tax_rate_id
+        self.name = name
+        self.rate = rate # Porcentaje
+        self.is_inclusive = is_inclusive
+        self.taxable_amount = taxable_amount # Base imponible (sin impuesto), en centavos
+        self.tax_amount = tax_amount # En centavos
+
+
+class TaxResult:
+    """Resultado de calcular los impuestos de un pedido."""
+    __slots__ = ("lines", "exclusive_tax", "total_tax")
+
+    def __init__(self, lines):
+        self.lines = lines # {tax_rate_id: TaxLine}
+        # Solo los impuestos no incluidos en el precio se suman al total del pedido
+        self.exclusive_tax = sum(line.tax_amount for line in lines.values() if not line.is_inclusive)
+        self.total_tax = sum(line.tax_amount for line in lines.values())
+
+
+class TaxTable:
+    """
+    Tasas de impuestos precalculadas en memoria.
+    La tasa de cada producto se resuelve en este orden: producto, categoría, tasa por defecto.
+    La tabla se carga una vez y se comparte. load() la vuelve a leer cuando cambió la versión de
+    TaxRate, Category o Product (cada save()/delete() la incrementa), así que las ediciones se ven sin
+    reiniciar; llama a TaxTable.invalidate() si se editan esas tablas sin pasar por los modelos.
+    """
+    _cached = None
+    _cached_version = None
+
+    def __init__(self, tax_rates, category_rates, product_rates):
+        # {tax_rate_id: (nombre, porcentaje, centésimas de punto porcentual, es_incluido)}
+        self.rates = {rate.id: (rate.name, rate.rate, int(round(rate.rate * 100)), bool(rate.is_inclusive)) for rate in tax_rates}
+        self.category_rates = {category_id: rate_id for category_id, rate_id in category_rates.items() if rate_id in self.rates}
+        self.product_rates = {product_id: rate_id for product_id, rate_id in product_rates.items() if rate_id in self.rates}
+        self.default_rate_id = next((rate.id for rate in tax_rates if rate.is_default), None)
+
+    @classmethod
+    def load(cls):
+        """Retorna la tabla en caché, leyéndola de la base de datos si aún no se cargó o si cambió."""
+        version = (TaxRate.version, Category.version, Product.version)
+        if cls._cached is None or cls._cached_version != version:
+            category_rows = Category._execute_query(
+                "SELECT id, tax_rate_id FROM categories WHERE tax_rate_id IS NOT NULL", fetch_result=True) or []
+            product_rows = Product._execute_query(
+                "SELECT id, tax_rate_id FROM products WHERE tax_rate_id IS NOT NULL", fetch_result=True) or []
+            cls._cached = cls(
+                TaxRate.get_all(),
+                {row["id"]: row["tax_rate_id"] for row in category_rows},
+                {row["id"]: row["tax_rate_id"] for row in product_rows},
+            )
+            cls._cached_version = version
+        return cls._cached
+
+    @classmethod
+    def invalidate(cls):
+        cls._cached = None
+
+    def resolve(self, product):
+        """Devuelve el id de la tasa aplicable a un producto (None si no paga impuestos)."""
+        rate_id = self.product_rates.get(product.id)
+        if rate_id is None:
+            rate_id = self.category_rates.get(product.category_id, self.default_rate_id)
+        return rate_id
+
+    def compute(self, cart):
+        """
+        Calcula los impuestos del pedido (en centavos) en una sola pasada: primero suma el importe neto
+        (tras descuentos) de las líneas por tasa, y luego calcula el impuesto una vez por tasa.
+        """
+        net_by_rate = {}
+        for line in cart:
+            rate_id = self.resolve(line.product)
+            if rate_id is not None:
+                net_by_rate[rate_id] = net_by_rate.get(rate_id, 0) + line.line_total - cart.line_discounts.get(line.line_id, 0)
+
+        lines = {}
+        for rate_id, amount in net_by_rate.items():
+            name, percent, basis_points, is_inclusive = self.rates[rate_id]
+            if is_inclusive:
+                # El precio ya incluye el impuesto: se desglosa la base imponible (redondeo mitad hacia arriba)
+                divisor = 10000 + basis_points
+                taxable_amount = (amount * 10000 * 2 + divisor) // (2 * divisor)
+                tax_amount = amount - taxable_amount
+            else:
+                taxable_amount = amount
+                tax_amount = apply_percent(amount, percent)
+            lines[rate_id] = TaxLine(rate_id, name, percent, is_inclusive, taxable_amount, tax_amount)
+        return TaxResult(lines)